@@ -5,7 +5,7 @@
 function(_qi_add_test_internal test_name target_name)
   cmake_parse_arguments(ARG
     "NO_INSTALL;NO_ADD_TEST;NIGHTLY;PERF_TEST;GTEST_TEST"
-    "TIMEOUT;WORKING_DIRECTORY"
+    "TIMEOUT;WORKING_DIRECTORY;SHARDS"
     "SRC;DEPENDS;SUBMODULE;ARGUMENTS;ENVIRONMENT" ${ARGN})
 
   set(_srcs ${ARG_SRC} ${ARG_UNPARSED_ARGUMENTS})
@@ -103,6 +103,10 @@ function(_qi_add_test_internal test_name target_name)
     list(APPEND _qi_add_test_args "--timeout" ${ARG_TIMEOUT})
   endif()
 
+  if(ARG_SHARDS)
+    list(APPEND _qi_add_test_args "--shard" ${ARG_SHARDS})
+  endif()
+
   if(ARG_NIGHTLY)
     list(APPEND _qi_add_test_args "--nightly")
   endif()
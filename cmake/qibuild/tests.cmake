@@ -27,6 +27,8 @@ include(qibuild/internal/tests)
 # \param:TIMEOUT the timeout of the test.
 # \param:WORKING_DIRECTORY working directory used when running the test:
 #                          default: ``<build>/sdk>/bin``
+# \param:SHARDS for gtest only: number of shards the test is split into
+#               when running ``qitest run -j N --shard-large-tests``
 # \flag: NIGHTLY: only compiled (and thus run) if QI_WITH_NIGHTLY_TESTS is ON
 # \flag: PERF: only compiled (and thus run) if QI_WITH_PERF_TESTS is ON
 #              It is assumed that the executable will understand an option
@@ -0,0 +1,32 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+# Generated by qisys.script.write_action_index(). Do not edit.
+
+ACTIONS = [
+    ('add_config', 'Add a build configuration'),
+    ('clean', 'Clean build directories.'),
+    ('config', 'Display the current config'),
+    ('configure', 'Configure a project'),
+    ('convert', 'Convert an existing project to a qiBuild project'),
+    ('depends', 'Display dependencies of projects'),
+    ('deploy', 'Deploy project(s) on a remote target'),
+    ('find', 'Find a package'),
+    ('foreach', 'Run the same command on each buildable project.'),
+    ('gen_cmake_module', 'Generate a -config.cmake file from the contents of a directory'),
+    ('init', 'Initialize a new qibuild worktree'),
+    ('install', 'Install a project and its dependencies'),
+    ('list', 'List the name and path of every buildable project'),
+    ('list_binaries', 'List every all the binaries in the given worktree.'),
+    ('list_configs', 'List all the known configs'),
+    ('make', 'Build a project'),
+    ('open', 'Open a project with an IDE'),
+    ('package', 'Generate a binary package, ready to be added in a toolchain'),
+    ('rm_config', 'Remove the given build config'),
+    ('run', 'Run a package found with qibuild find'),
+    ('set_default', 'Set the default build config for the given worktree'),
+    ('sourceme', "Generate and return the path to a suitable 'sourceme' file"),
+    ('status', 'Display the status of each project'),
+    ('test', 'Launch automatic tests -- deprecated, use `qitest run` instead'),
+]
@@ -22,6 +22,10 @@ def configure_parser(parser):
 Note:
     if CMAKE_INSTALL_PREFIX is set during configure, it will be necessary to
     repeat it at install (for further details, see: qibuild install --help).
+
+    with -j N, up to N independent projects are configured at the same
+    time. The output of cmake is then written to a configure.log file in
+    each build directory.
 """
 
 @ui.timer("qibuild configure")
@@ -39,4 +43,6 @@ def do(args):
                             debug_trycompile=args.debug_trycompile,
                             trace_cmake=args.trace_cmake,
                             profiling=args.profiling,
-                            summarize_options=args.summarize_options)
+                            summarize_options=args.summarize_options,
+                            force=args.force,
+                            num_jobs=args.num_jobs)
@@ -6,6 +6,8 @@
 
 """
 
+import operator
+
 import qisys.ui
 import qibuild.deps
 import qibuild.parsers
@@ -16,7 +18,7 @@ def configure_parser(parser):
     qibuild.parsers.project_parser(parser)
     group = parser.add_argument_group("depends arguments",
         description="Shows project and package dependencies."
-            "\nUse --runtime, --direct, and --reverse to control "
+            "\nUse --runtime, --direct, --reverse and --transitive to control "
             "the dependencies to examine. Default usage shows "
             "compressed, recursive, build time dependencies. "
             "\nUse --tree or --graph to control the output format."
@@ -33,6 +35,10 @@ def configure_parser(parser):
                         "graphing tool")
     group.add_argument("--direct", action="store_true", default=False,
                        help="only display direct dependencies")
+    group.add_argument("--transitive", action="store_true", default=False,
+                       help="with --reverse, display each project depending "
+                            "directly or indirectly on the current project "
+                            "only once")
 
 class DependencyRelationship:
     """ helper class to separate dependency search from display """
@@ -53,11 +59,23 @@ class DependencyRelationship:
         return (other.from_name == self.from_name and
             other.to_name == self.to_name)
 
-def get_deps(build_worktree, project, single, runtime, reverse):
+def get_deps(build_worktree, project, single, runtime, reverse,
+             transitive=False):
     """ create a list of DependencyRelationship objects ready for display """
     deps_solver = qibuild.deps.DepsSolver(build_worktree)
     if reverse:
-        (packages, projects) =  (set(), build_worktree.build_projects)
+        if runtime:
+            dep_types = ["runtime"]
+        else:
+            dep_types = ["build"]
+        if transitive and not single:
+            dependents = deps_solver.get_reverse_dep_projects([project],
+                                                              dep_types)
+            return collect_transitive_dependencies_reverse(project,
+                                                           dependents)
+        reverse_index = deps_solver.get_reverse_deps_index(dep_types)
+        return collect_dependencies_reverse(project, build_worktree,
+                                            reverse_index, single)
     else:
         if runtime:
             dep_types = ["build"]
@@ -69,12 +87,8 @@ def get_deps(build_worktree, project, single, runtime, reverse):
     # Remove self from projects
     projects = [x for x in projects if x.name is not project.name]
 
-    if reverse:
-        collected_dependencies = collect_dependencies_reverse(
-            project, projects, single, runtime)
-    else:
-        collected_dependencies = collect_dependencies(
-            project, projects, packages, single, runtime)
+    collected_dependencies = collect_dependencies(
+        project, projects, packages, single, runtime)
 
     return collected_dependencies
 
@@ -182,30 +196,55 @@ def print_deps_graph(root_name, label, dependency_relationships):
                 qisys.ui.reset, line_type)
     qisys.ui.info(qisys.ui.reset, "}")
 
-def collect_dependencies_reverse(project, projects, single, runtime, depth=0):
-    """ recursively collects projects that depends on the current project """
+def collect_dependencies_reverse(project, build_worktree, reverse_index,
+                                 single, depth=0, seen=None):
+    """ recursively collects projects that depends on the current project
+
+    reverse_index is a dict name -> names of the projects directly
+    depending on it.
+
+    """
+    if seen is None:
+        seen = set([project.name])
     collected_dependencies = list()
-    for proj in projects:
-        dependency = None
-        depends = list()
-        if runtime:
-            depends = proj.run_depends
-        else:
-            depends = proj.build_depends
-        if project.name in depends:
-            print "%s on %s" % (project.name, proj.name)
-            dependency = DependencyRelationship(project.name, proj.name)
-            dependency.is_known = True
-            dependency.path = proj.path
-            dependency.depth = depth
-            collected_dependencies.append(dependency)
-            if not single:
-                sub = collect_dependencies_reverse(
-                    proj, projects, False, runtime, depth+1)
-                collected_dependencies.extend(sub)
+    dependents = list()
+    for name in reverse_index.get(project.name, list()):
+        proj = build_worktree.get_build_project(name, raises=False)
+        if proj:
+            dependents.append(proj)
+    dependents.sort(key=operator.attrgetter("src"))
+    for proj in dependents:
+        # Protects against circular dependencies
+        if proj.name in seen:
+            continue
+        seen.add(proj.name)
+        dependency = DependencyRelationship(project.name, proj.name)
+        dependency.is_known = True
+        dependency.path = proj.path
+        dependency.depth = depth
+        collected_dependencies.append(dependency)
+        if not single:
+            sub = collect_dependencies_reverse(
+                proj, build_worktree, reverse_index, False,
+                depth=depth+1, seen=seen)
+            collected_dependencies.extend(sub)
+        seen.remove(proj.name)
 
     return collected_dependencies
 
+def collect_transitive_dependencies_reverse(project, dependents):
+    """ collects each project depending directly or indirectly on the
+    current project once, in build order
+
+    """
+    collected_dependencies = list()
+    for proj in dependents:
+        dependency = DependencyRelationship(project.name, proj.name)
+        dependency.is_known = True
+        dependency.path = proj.path
+        collected_dependencies.append(dependency)
+    return collected_dependencies
+
 def package_names_first(dependency_names, package_names):
     """ put package names first """
     dep_packages = sorted(
@@ -263,10 +302,13 @@ def collect_dependencies(project, projects, packages, single, runtime, depth=0):
 
 def do(args):
     """Main entry point for depends action"""
+    if args.transitive and not args.reverse:
+        raise Exception("--transitive can only be used with --reverse")
     build_worktree = qibuild.parsers.get_build_worktree(args, verbose=(not args.graph))
     project = qibuild.parsers.get_one_build_project(build_worktree, args)
     collected_dependencies = get_deps(
-        build_worktree, project, args.direct, args.runtime, args.reverse)
+        build_worktree, project, args.direct, args.runtime, args.reverse,
+        transitive=args.transitive)
 
     # create title
     label = project.name
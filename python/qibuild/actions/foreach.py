@@ -7,9 +7,14 @@
 Use -- to separate qibuild arguments from the arguments of the command.
 For instance
   qibuild --ignore-errors -- ls -l
+
+With -j, the command is run on several projects at the same time.
+With --in-dependency-order, the command is only started in a project
+once it is done in all the build dependencies of the project.
 """
 
 import qisys.actions
+import qisys.parsers
 import qibuild.parsers
 
 
@@ -20,11 +25,23 @@ def configure_parser(parser):
     parser.add_argument("command", metavar="COMMAND", nargs="+")
     parser.add_argument("--continue", "--ignore-errors", dest="ignore_errors",
                         action="store_true", help="continue on error")
+    qisys.parsers.foreach_parser(parser)
+    parser.add_argument("--in-dependency-order", dest="in_dependency_order",
+                        action="store_true",
+                        help="only start the command in a project once it "
+                             "is done in all its build dependencies")
 
 def do(args):
     """Main entry point"""
     build_worktree = qibuild.parsers.get_build_worktree(args)
     projects = qibuild.parsers.get_build_projects(build_worktree, args,
                                                  default_all=True)
+    depends = None
+    if args.in_dependency_order:
+        by_name = dict((x.name, x) for x in projects)
+        def depends(project):
+            return [by_name[x] for x in project.build_depends if x in by_name]
     qisys.actions.foreach(projects, args.command,
-                          ignore_errors=args.ignore_errors)
+                          ignore_errors=args.ignore_errors,
+                          num_jobs=args.num_jobs, live=args.live,
+                          depends=depends)
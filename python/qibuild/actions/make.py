@@ -19,6 +19,10 @@ def configure_parser(parser):
     group.add_argument("--coverity", action="store_true", default=False,
                        help="Build using cov-build. Ensure you have "
                        "cov-analysis installed on your machine.")
+    group.add_argument("--parallel", action="store_true", default=False,
+                       help="Build independent projects at the same time, "
+                       "sharing the -j budget. Build output is written "
+                       "to a build.log file in each build directory")
 
 @ui.timer("qibuild make")
 def do(args):
@@ -26,4 +30,4 @@ def do(args):
 
     cmake_builder = qibuild.parsers.get_cmake_builder(args)
     cmake_builder.build(num_jobs=args.num_jobs, rebuild=args.rebuild,
-                        coverity=args.coverity)
+                        coverity=args.coverity, parallel=args.parallel)
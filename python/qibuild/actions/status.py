@@ -12,6 +12,7 @@ import datetime
 
 from qisys import ui
 import qisys.parsers
+import qibuild.cmake
 import qibuild.parsers
 
 def usage():
@@ -27,14 +28,25 @@ def configure_parser(parser):
 def do(args):
     """Main entry point"""
     build_worktree = qibuild.parsers.get_build_worktree(args)
-    for project in build_worktree.build_projects:
+    projects = build_worktree.build_projects
+    bdirs = dict()
+    for project in projects:
+        bdirs[project.path] = glob.glob(os.path.join(project.path, "build-*"))
+    all_bdirs = [x for project_bdirs in bdirs.values() for x in project_bdirs]
+    build_types = qibuild.cmake.get_cached_var_in_dirs(all_bdirs,
+                                                       "CMAKE_BUILD_TYPE")
+    for project in projects:
         ui.info(project.src)
-        list_build_dir(project.path)
+        list_build_dir(project.path, bdirs=bdirs[project.path],
+                       build_types=build_types)
 
 
-def list_build_dir(path):
+def list_build_dir(path, bdirs=None, build_types=None):
     """ list all buildable directory """
-    bdirs = glob.glob(os.path.join(path, "build-*"))
+    if bdirs is None:
+        bdirs = glob.glob(os.path.join(path, "build-*"))
+    if build_types is None:
+        build_types = dict()
     max_len = 0
     for bdir in bdirs:
         if len(bdir) > max_len:
@@ -54,5 +66,8 @@ def list_build_dir(path):
                 todisplay = "%d hours" % (ddelta.seconds / 3600)
             else:
                 todisplay = "%d minutes" % (ddelta.seconds / 60)
+            build_type = build_types.get(bdir)
+            if build_type:
+                todisplay += ", %s" % build_type
             pad = " " * (max_len - len(bdir))
             ui.info(" %s%s: (%s)" % (os.path.basename(bdir), pad, todisplay))
@@ -0,0 +1,291 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" Build or configure several projects at the same time
+
+When building, a project is started as soon as all its build
+dependencies have been built. The number of jobs given to the build
+tool is shared between the projects being built, so that the total
+never exceeds the global budget.
+
+When configuring, the projects are grouped by level in the dependency
+graph, and the projects of the same level are configured at the same
+time.
+
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import Queue
+
+from qisys import ui
+import qibuild.cmake
+
+
+class BuildScheduler(object):
+    """ Build the given projects in parallel, respecting their build
+    dependencies.
+
+    :param builder: used to call ``pre_build()`` before each build
+    :param projects: the projects to build, sorted in build order
+    :param num_jobs: the global job budget, defaults to the number of CPUs
+
+    """
+    def __init__(self, builder, projects, num_jobs=None):
+        self.builder = builder
+        self.projects = projects
+        if not num_jobs:
+            num_jobs = multiprocessing.cpu_count()
+        self.num_jobs = num_jobs
+        names = set(x.name for x in projects)
+        self.deps = dict()
+        for project in projects:
+            deps = set(project.build_depends) & names
+            deps.discard(project.name)
+            self.deps[project.name] = deps
+        self.failures = list()
+        self.elapsed = dict()
+        self._pending = list()
+        self._running = dict()
+        self._done = set()
+        self._events = Queue.Queue()
+        self._num_started = 0
+
+    @staticmethod
+    def log_file(project):
+        """ Path to the file containing the build output of the project """
+        return os.path.join(project.build_directory, "build.log")
+
+    def run(self, **kwargs):
+        """ Build every project.
+
+        ``kwargs`` are passed to ``project.build()``, except for
+        ``num_jobs`` which is computed for each project.
+
+        Once a build fails, no other project is started. The builds
+        already running are waited for, then the first error is raised.
+
+        """
+        self._pending = list(self.projects)
+        self._running = dict()
+        self._done = set()
+        self.failures = list()
+        self._num_started = 0
+        try:
+            while self._pending or self._running:
+                if not self.failures:
+                    self._start_ready(kwargs)
+                if not self._running:
+                    break
+                project, exc_info = self._wait_for_event()
+                self._on_finished(project, exc_info)
+        except KeyboardInterrupt:
+            # Our children got the SIGINT too, just make sure
+            # nothing else is started
+            self._pending = list()
+            raise
+        if self.failures:
+            self._report_failures()
+            # pylint: disable-msg=E0702
+            exc_type, exc_value, exc_tb = self.failures[0][1]
+            raise exc_type, exc_value, exc_tb
+
+    def _start_ready(self, kwargs):
+        """ Start the projects whose dependencies are all built,
+        as long as there are jobs left in the budget
+
+        """
+        ready = [x for x in self._pending if self.deps[x.name] <= self._done]
+        if not ready and not self._running and self._pending:
+            # Circular dependencies: fall back to the build order
+            ready = self._pending[:1]
+        available = self.num_jobs - sum(self._running.values())
+        if not self._running:
+            available = max(available, 1)
+        if not ready or available <= 0:
+            return
+        to_start = ready[:available]
+        share, extra = divmod(available, len(to_start))
+        for i, project in enumerate(to_start):
+            num_jobs = share
+            if i < extra:
+                num_jobs += 1
+            self._start(project, num_jobs, kwargs)
+
+    def _start(self, project, num_jobs, kwargs):
+        self._pending.remove(project)
+        self._running[project.name] = num_jobs
+        ui.info_count(self._num_started, len(self.projects),
+                      ui.green, "Building",
+                      ui.blue, project.name,
+                      ui.reset, "(-j%i)" % num_jobs,
+                      update_title=True)
+        self._num_started += 1
+        build_kwargs = kwargs.copy()
+        build_kwargs["num_jobs"] = num_jobs
+        build_kwargs["log_file"] = self.log_file(project)
+        thread = threading.Thread(target=self._build,
+                                  args=(project, build_kwargs),
+                                  name="Build-%s" % project.name)
+        thread.daemon = True
+        thread.start()
+
+    def _build(self, project, build_kwargs):
+        """ Called in a worker thread """
+        start = time.time()
+        exc_info = None
+        try:
+            self.builder.pre_build(project)
+            project.build(**build_kwargs)
+        except Exception:
+            exc_info = sys.exc_info()
+        self.elapsed[project.name] = time.time() - start
+        self._events.put((project, exc_info))
+
+    def _wait_for_event(self):
+        # Using a timeout so that the main thread stays
+        # responsive to KeyboardInterrupt
+        while True:
+            try:
+                return self._events.get(True, 0.1)
+            except Queue.Empty:
+                pass
+
+    def _on_finished(self, project, exc_info):
+        del self._running[project.name]
+        elapsed = self.elapsed[project.name]
+        if exc_info:
+            self.failures.append((project, exc_info))
+            ui.error("Building", project.name, "failed",
+                     "(see %s)" % self.log_file(project))
+        else:
+            self._done.add(project.name)
+            ui.info(ui.green, "*", ui.reset, "Built", ui.blue, project.name,
+                    ui.reset, "in %.1fs" % elapsed)
+        if self._running:
+            ui.info(ui.green, "*", ui.reset, "Running:",
+                    ui.blue, ", ".join(sorted(self._running)))
+
+    def _report_failures(self, num_lines=20):
+        """ Display the end of the log of each failed project """
+        for project, _ in self.failures:
+            log_file = self.log_file(project)
+            if not os.path.exists(log_file):
+                continue
+            with open(log_file, "r") as fp:
+                lines = fp.readlines()[-num_lines:]
+            ui.info(ui.red, "Last lines of", log_file)
+            ui.info("".join(lines), end="")
+        not_built = len(self.projects) - len(self._done) - len(self.failures)
+        if not_built:
+            ui.error(not_built, "project(s) were not built")
+
+
+def get_levels(projects):
+    """ Group the projects by level in the graph of build dependencies.
+
+    The projects of a level only depend on projects of the previous
+    levels. ``projects`` must be sorted in build order, and so is each
+    level.
+
+    """
+    levels = list()
+    level_of = dict()
+    for project in projects:
+        # Dependencies not seen yet are part of a cycle and ignored,
+        # so that we keep the build order in this case
+        dep_levels = [level_of[x] for x in project.build_depends
+                      if x in level_of]
+        level = max(dep_levels) + 1 if dep_levels else 0
+        level_of[project.name] = level
+        if level == len(levels):
+            levels.append(list())
+        levels[level].append(project)
+    return levels
+
+
+def configure_log_file(project):
+    """ Path to the file containing the cmake output of the project """
+    return os.path.join(project.build_directory, "configure.log")
+
+
+def configure_in_parallel(projects, num_jobs, **kwargs):
+    """ Configure the projects, ``num_jobs`` at a time, level by level.
+    (see :py:func:`get_levels`)
+
+    ``kwargs`` are passed to ``project.configure()``. The output
+    of cmake is written to a ``configure.log`` file in each build
+    directory, and displayed when the configuration fails.
+
+    The whole level is configured even if a project fails. Errors are
+    then reported in build order, and the first one is raised, so
+    that the result does not depend on which project finished first.
+
+    """
+    summarize_options = kwargs.pop("summarize_options", False)
+    num_projects = len(projects)
+    num_done = 0
+    for level in get_levels(projects):
+        ui.info(ui.green, "Configuring", ui.reset,
+                ", ".join(x.name for x in level))
+        errors = _configure_level(level, num_jobs, kwargs)
+        for project in level:
+            if project.name in errors:
+                ui.info_count(num_done, num_projects,
+                              ui.red, "Failed to configure",
+                              ui.blue, project.name)
+                log_file = configure_log_file(project)
+                if os.path.exists(log_file):
+                    with open(log_file, "r") as fp:
+                        ui.info(fp.read(), end="")
+            else:
+                ui.info_count(num_done, num_projects,
+                              ui.green, "Configured",
+                              ui.blue, project.name)
+                if summarize_options:
+                    qibuild.cmake.display_options(project.build_directory)
+            num_done += 1
+        for project in level:
+            if project.name in errors:
+                # pylint: disable-msg=E0702
+                exc_type, exc_value, exc_tb = errors[project.name]
+                raise exc_type, exc_value, exc_tb
+
+
+def _configure_level(level, num_jobs, kwargs):
+    """ Configure the projects of a level using a pool of threads.
+    Return a dict project name -> exc_info for the projects that failed
+
+    """
+    tasks = Queue.Queue()
+    for project in level:
+        tasks.put(project)
+    errors = dict()
+    def target():
+        while True:
+            try:
+                project = tasks.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                project.configure(log_file=configure_log_file(project),
+                                  **kwargs)
+            except Exception:
+                errors[project.name] = sys.exc_info()
+
+    workers = list()
+    for i in range(min(num_jobs, len(level))):
+        worker = threading.Thread(target=target, name="Configure#%i" % i)
+        worker.daemon = True
+        worker.start()
+        workers.append(worker)
+    for worker in workers:
+        # Using a timeout so that the main thread stays
+        # responsive to KeyboardInterrupt
+        while worker.is_alive():
+            worker.join(0.1)
+    return errors
@@ -76,12 +76,31 @@ def get_cached_var(build_dir, var, default=None):
     if not os.path.exists(cmakecache):
         mess  = "Could not find CMakeCache.txt in %s" % build_dir
         raise Exception(mess)
-    res = read_cmake_cache(cmakecache)
-    return res.get(var, default)
+    return load_cmake_cache(cmakecache).get(var, default)
+
+def get_cached_var_in_dirs(build_dirs, var, default=None):
+    """ Get the same variable from the cmake cache of several
+    build directories.
+
+    Build directories without a CMakeCache.txt are not an error,
+    ``default`` is used for them.
+
+    :return: a dict build directory -> value
+
+    """
+    res = dict()
+    for build_dir in build_dirs:
+        cmakecache = os.path.join(build_dir, "CMakeCache.txt")
+        cache = load_cmake_cache(cmakecache, raises=False)
+        if cache is None:
+            res[build_dir] = default
+        else:
+            res[build_dir] = cache.get(var, default)
+    return res
 
 def cmake(source_dir, build_dir, cmake_args, env=None,
           clean_first=True, profiling=False, debug_trycompile=False,
-          trace_cmake=False, summarize_options=False):
+          trace_cmake=False, summarize_options=False, log_file=None):
     """Call cmake with from a build dir for a source dir.
     cmake_args are added on the command line.
 
@@ -89,6 +108,8 @@ def cmake(source_dir, build_dir, cmake_args, env=None,
                 ``os.environ`` will remain unchanged
     :param clean_first: Clean the cmake cache
     :param summarize_options: Whether to call :py:func:`display_options` at the end
+    :param log_file: Write the output of ``cmake`` to this file instead
+                     of the console
 
     For qibuild/CMake hackers:
 
@@ -131,7 +152,8 @@ def cmake(source_dir, build_dir, cmake_args, env=None,
     # the current working dir.
     cmake_args += [source_dir]
     if not profiling and not trace_cmake:
-        qisys.command.call(["cmake"] + cmake_args, cwd=build_dir, env=env)
+        qisys.command.call(["cmake"] + cmake_args, cwd=build_dir, env=env,
+                           log_file=log_file)
         if summarize_options:
             display_options(build_dir)
         return
@@ -181,23 +203,112 @@ def read_cmake_cache(cache_path):
     name -> value
 
     """
-    with open(cache_path, "r") as fp:
-        lines = fp.readlines()
-    res = dict()
-    for line in lines:
-        if line.startswith("//"):
-            continue
-        if line.startswith("#"):
-            continue
-        if not line:
-            continue
-        match = re.match(r"([a-zA-Z0-9-_]+):(\w+)=(.*)", line)
-        if not match:
-            continue
-        else:
-            (key, _type, value) = match.groups()
-            res[key] = value
-    return res
+    return load_cmake_cache(cache_path).as_dict()
+
+# path -> (stamp, CMakeCache)
+_CMAKE_CACHES = dict()
+
+def load_cmake_cache(cache_path, raises=True):
+    """ Get a :py:class:`CMakeCache` for the given CMakeCache.txt file.
+
+    The file is only parsed again if it changed since the last call.
+
+    :param raises: when False, return None if the file does not exist
+
+    """
+    try:
+        stat = os.stat(cache_path)
+    except OSError:
+        _CMAKE_CACHES.pop(cache_path, None)
+        if raises:
+            raise IOError("No such file: %s" % cache_path)
+        return None
+    stamp = (stat.st_mtime, stat.st_size)
+    cached = _CMAKE_CACHES.get(cache_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    cache = CMakeCache(cache_path)
+    cache.read()
+    _CMAKE_CACHES[cache_path] = (stamp, cache)
+    return cache
+
+def clear_cmake_caches():
+    """ Forget about every CMakeCache.txt file read so far """
+    _CMAKE_CACHES.clear()
+
+class CMakeCache(object):
+    """ The entries of a CMakeCache.txt file, with their types """
+
+    # Values CMake considers false (case insensitive), see
+    # the documentation of the if() command
+    FALSE_VALUES = ("", "0", "OFF", "NO", "FALSE", "N", "IGNORE", "NOTFOUND")
+    _LINE_RE = re.compile(r"([a-zA-Z0-9-_]+):(\w+)=(.*)")
+
+    def __init__(self, path):
+        self.path = path
+        # name -> (type, value)
+        self.entries = dict()
+
+    def read(self):
+        """ Parse the CMakeCache.txt file """
+        entries = dict()
+        match_line = self._LINE_RE.match
+        with open(self.path, "r") as fp:
+            for line in fp:
+                if line.startswith(("//", "#")):
+                    continue
+                match = match_line(line)
+                if not match:
+                    continue
+                (key, type_, value) = match.groups()
+                entries[key] = (type_, value.rstrip("\r\n"))
+        self.entries = entries
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def keys(self):
+        return self.entries.keys()
+
+    def get(self, name, default=None):
+        """ The value of an entry, as a string """
+        entry = self.entries.get(name)
+        if entry is None:
+            return default
+        return entry[1]
+
+    def get_type(self, name):
+        """ The type of an entry (BOOL, PATH, FILEPATH, STRING, INTERNAL,
+        STATIC or UNINITIALIZED), or None
+
+        """
+        entry = self.entries.get(name)
+        if entry is None:
+            return None
+        return entry[0]
+
+    def get_bool(self, name, default=False):
+        """ The value of an entry, as a boolean, following CMake rules """
+        value = self.get(name)
+        if value is None:
+            return default
+        value = value.upper()
+        return not (value in self.FALSE_VALUES or value.endswith("-NOTFOUND"))
+
+    def get_list(self, name, default=None):
+        """ The value of an entry, as a list """
+        value = self.get(name)
+        if value is None:
+            if default is None:
+                return list()
+            return default
+        if not value:
+            return list()
+        return value.split(";")
+
+    def as_dict(self):
+        """ A new dict name -> value """
+        return dict((key, entry[1]) for (key, entry) in self.entries.iteritems())
 
 def get_cmake_qibuild_dir():
     """Get the path to cmake modules.
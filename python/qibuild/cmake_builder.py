@@ -9,6 +9,7 @@ import operator
 from qisys import ui
 import qisys.sh
 import qisys.remote
+import qibuild.build_scheduler
 import qibuild.deploy
 import qibuild.deps
 from qisys.abstractbuilder import AbstractBuilder
@@ -73,6 +74,16 @@ class CMakeBuilder(AbstractBuilder):
             return res
         return new_func
 
+    def get_reverse_dep_projects(self, transitive=True):
+        """ Get the projects of the worktree that depend on the projects
+        of this builder, in build order. Those are the projects to rebuild
+        after the projects of this builder have changed
+
+        """
+        return self.deps_solver.get_reverse_dep_projects(self.projects,
+                                                         self.dep_types,
+                                                         transitive=transitive)
+
     def bootstrap_projects(self):
         """ Write the dependencies.cmake and the qi/path.conf files for
         every project
@@ -126,10 +137,26 @@ class CMakeBuilder(AbstractBuilder):
         project.fix_shared_libs(paths)
 
     def configure(self, *args, **kwargs):
-        """ Configure the projects in the correct order """
+        """ Configure the projects in the correct order
+
+        If ``num_jobs`` is greater than one, projects of the same level
+        in the dependency graph are configured at the same time.
+        See :py:func:`qibuild.build_scheduler.configure_in_parallel`
+
+        """
+        num_jobs = kwargs.pop("num_jobs", None)
         self.bootstrap_projects()
         projects = self.deps_solver.get_dep_projects(self.projects, self.dep_types)
 
+        # cmake output is parsed when profiling or tracing, so keep
+        # those runs sequential
+        can_run_in_parallel = not kwargs.get("profiling") and \
+                              not kwargs.get("trace_cmake")
+        if num_jobs > 1 and can_run_in_parallel:
+            qibuild.build_scheduler.configure_in_parallel(projects, num_jobs,
+                                                          **kwargs)
+            return
+
         for i, project in enumerate(projects):
             ui.info_count(i, len(projects),
                           ui.green, "Configuring",
@@ -138,8 +165,21 @@ class CMakeBuilder(AbstractBuilder):
 
     @need_configure
     def build(self, *args, **kwargs):
-        """ Build the projects in the correct order """
+        """ Build the projects in the correct order
+
+        If ``parallel`` is True, independent projects are built at the
+        same time, sharing the ``num_jobs`` budget.
+        See :py:class:`qibuild.build_scheduler.BuildScheduler`
+
+        """
+        parallel = kwargs.pop("parallel", False)
         projects = self.deps_solver.get_dep_projects(self.projects, self.dep_types)
+        if parallel:
+            num_jobs = kwargs.pop("num_jobs", None) or self.build_config.num_jobs
+            scheduler = qibuild.build_scheduler.BuildScheduler(self, projects,
+                                                               num_jobs=num_jobs)
+            scheduler.run(**kwargs)
+            return
         for i, project in enumerate(projects):
             ui.info_count(i, len(projects),
                           ui.green, "Building",
@@ -10,9 +10,53 @@ class DepsSolver(object):
     """ Solve dependencies across projects in a build worktree
     and packages in a toolchain
 
+    Results are cached, keyed on the list of projects, the
+    dependency types and the direction of the resolution.
+    The cache is cleared as soon as projects are added to or removed
+    from the build worktree, or when the toolchain changes.
+
     """
     def __init__(self, build_worktree):
         self.build_worktree = build_worktree
+        self._cache = dict()
+        self._cache_context = None
+
+    def clear_cache(self):
+        """ Forget every result computed so far """
+        self._cache = dict()
+        self._cache_context = None
+
+    def _get_cache_context(self):
+        """ What the cached results depend on.
+
+        BuildWorkTree creates a new list of build projects each
+        time a project is added or removed, so the identity of the
+        list is enough.
+
+        """
+        toolchain = self.build_worktree.toolchain
+        package_names = None
+        if toolchain:
+            package_names = tuple(x.name for x in toolchain.packages)
+        return (self.build_worktree.build_projects, toolchain, package_names)
+
+    def _memoize(self, kind, projects, dep_types, reverse, compute):
+        """ Return the result of ``compute()``, computing it only if
+        it is not in the cache yet
+
+        """
+        context = self._get_cache_context()
+        old_context = self._cache_context
+        if old_context is None or \
+                context[0] is not old_context[0] or \
+                context[1] is not old_context[1] or \
+                context[2] != old_context[2]:
+            self._cache = dict()
+            self._cache_context = context
+        key = (kind, tuple(x.name for x in projects), tuple(dep_types), reverse)
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
 
     def get_dep_projects(self, projects, dep_types, reverse=False):
         """ Solve the dependencies of the list of projects
@@ -22,6 +66,12 @@ class DepsSolver(object):
         :return: a list of projects in the build worktree
 
         """
+        res = self._memoize("projects", projects, dep_types, reverse,
+            lambda: self._get_dep_projects(projects, dep_types,
+                                           reverse=reverse))
+        return res[:]
+
+    def _get_dep_projects(self, projects, dep_types, reverse=False):
         sorted_names = self._get_sorted_names(projects, dep_types,
                                               reverse=reverse)
 
@@ -42,12 +92,17 @@ class DepsSolver(object):
         :return: a list of packages in the build worktree's toolchain
 
         """
+        res = self._memoize("packages", projects, dep_types, False,
+            lambda: self._get_dep_packages(projects, dep_types))
+        return res[:]
+
+    def _get_dep_packages(self, projects, dep_types):
         sorted_names = self._get_sorted_names(projects, dep_types)
         toolchain = self.build_worktree.toolchain
         if not toolchain:
             return list()
-        build_project_names = [x.name for x in
-            self.build_worktree.build_projects]
+        build_project_names = set(x.name for x in
+            self.build_worktree.build_projects)
 
         dep_packages = list()
         for name in sorted_names:
@@ -75,35 +130,84 @@ class DepsSolver(object):
     def _get_sorted_names(self, projects, dep_types, reverse=False):
         """ Helper for get_dep_* functions """
         if reverse:
+            reverse_index = self.get_reverse_deps_index(dep_types)
             reverse_deps = set()
-            for project in self.build_worktree.build_projects:
-                if "build" in dep_types:
-                    if any(x.name in project.build_depends for x in projects):
-                        reverse_deps.add(project.name)
-                if "runtime" in dep_types:
-                    if any(x.name in project.run_depends for x in projects):
-                        reverse_deps.add(project.name)
-                if "test" in dep_types:
-                    if any(x.name in project.test_depends for x in projects):
-                        reverse_deps.add(project.name)
-            return sorted(list(reverse_deps))
+            for project in projects:
+                reverse_deps.update(reverse_index.get(project.name, list()))
+            return sorted(reverse_deps)
+
+        to_sort = self._get_all_deps(dep_types)
+        return qisys.sort.topological_sort(to_sort, [x.name for x in projects])
+
+    def get_reverse_deps_index(self, dep_types):
+        """ Return a dict name -> names of the projects in the worktree
+        that *directly* depend on it
+
+        """
+        return self._memoize("reverse_index", list(), dep_types, True,
+            lambda: gen_reverse_deps(self.build_worktree.build_projects,
+                                     dep_types))
 
+    def get_reverse_dep_projects(self, projects, dep_types, transitive=True):
+        """ Get the projects that depend on the list of projects,
+        i.e. the projects that must be rebuilt when one of them changes.
+
+        :param: transitive Also include the projects depending on them
+                indirectly
+        :return: a list of projects in the build worktree, the
+                 given projects excluded, sorted in build order
+
+        """
+        kind = "reverse_transitive" if transitive else "reverse_direct"
+        res = self._memoize(kind, projects, dep_types, True,
+            lambda: self._get_reverse_dep_projects(projects, dep_types,
+                                                   transitive=transitive))
+        return res[:]
+
+    def _get_reverse_dep_projects(self, projects, dep_types, transitive=True):
+        reverse_index = self.get_reverse_deps_index(dep_types)
+        names = set(x.name for x in projects)
+        res = set()
+        to_visit = list(names)
+        while to_visit:
+            name = to_visit.pop()
+            for dependent in reverse_index.get(name, list()):
+                if dependent in res:
+                    continue
+                res.add(dependent)
+                if transitive:
+                    to_visit.append(dependent)
+        res.difference_update(names)
+        sorted_names = qisys.sort.topological_sort(self._get_all_deps(dep_types),
+                                                   sorted(res))
+        return [self.build_worktree.get_build_project(x)
+                for x in sorted_names if x in res]
+
+    def _get_all_deps(self, dep_types):
+        """ Return a dict name -> dependencies for every package
+        in the toolchain and every project in the worktree
+
+        """
+        return self._memoize("all_deps", list(), dep_types, False,
+            lambda: self._gen_all_deps(dep_types))
+
+    def _gen_all_deps(self, dep_types):
         to_sort = dict()
 
         # first, fill up dict with packages dependencies ...
         toolchain = self.build_worktree.toolchain
         if toolchain:
-            for package in toolchain.packages:
+            packages = toolchain.packages
+            for package in packages:
                 package.load_deps()
-            package_deps = gen_deps(toolchain.packages, dep_types)
+            package_deps = gen_deps(packages, dep_types)
             to_sort.update(package_deps)
 
         # then with project dependencies
         project_deps = gen_deps(self.build_worktree.build_projects, dep_types)
 
         to_sort.update(project_deps)
-
-        return qisys.sort.topological_sort(to_sort, [x.name for x in projects])
+        return to_sort
 
 
 def read_deps_from_xml(target, xml_elem):
@@ -143,6 +247,19 @@ def dump_deps_to_xml(subject, xml_elem):
         test_dep_elem.set("names", " ".join(subject.test_depends))
 
 
+def gen_reverse_deps(objects_with_dependencies, dep_types):
+    """ Generate a dictionary name -> names of the objects
+    depending on it (reverse of :py:func:`gen_deps`)
+
+    """
+    res = dict()
+    deps = gen_deps(objects_with_dependencies, dep_types)
+    for name, dep_names in deps.iteritems():
+        for dep_name in dep_names:
+            res.setdefault(dep_name, set()).add(name)
+    return res
+
+
 def gen_deps(objects_with_dependencies, dep_types):
     """ Generate a dictionary name -> dependencies for the objects
     passed as parameters (projects or packages)
@@ -35,6 +35,9 @@ def cmake_configure_parser(parser):
     group.add_argument("--no-clean-first", dest="clean_first",
         action="store_false",
         help="do not clean CMake cache")
+    group.add_argument("--force", dest="force",
+        action="store_true",
+        help="run cmake even if nothing changed since the last configuration")
     group.add_argument("--debug-trycompile", dest="debug_trycompile",
         action="store_true",
         help="pass --debug-trycompile to CMake call")
@@ -3,6 +3,7 @@
 ## found in the COPYING file.
 
 import argparse
+import hashlib
 import json
 import os
 import platform
@@ -26,6 +27,7 @@ import qisrc.git
 import qitoolchain.toolchain
 import qitest.conf
 import qitest.project
+import qitest.timings
 
 
 def read_install_manifest(filepath):
@@ -56,6 +58,18 @@ def write_qi_path_conf(directory, sdk_dirs, sdk_layout=True):
         fp.write(to_write)
 
 
+# Environment variables that can change the result of a cmake run
+CONFIGURE_ENV_VARS = ["PATH", "CC", "CXX", "CFLAGS", "CXXFLAGS", "CPPFLAGS",
+                      "LDFLAGS", "CMAKE_PREFIX_PATH", "PKG_CONFIG_PATH",
+                      "LD_LIBRARY_PATH", "DYLD_LIBRARY_PATH", "INCLUDE", "LIB",
+                      "LIBPATH"]
+
+def _file_sha1(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "rb") as fp:
+        return hashlib.sha1(fp.read()).hexdigest()
+
 class BuildProject(object):
     def __init__(self, build_worktree, worktree_project):
         self.build_worktree = build_worktree
@@ -223,8 +237,14 @@ set(QIBUILD_PYTHON_PATH "%s" CACHE STRING "" FORCE)
         dep_cmake = os.path.join(self.build_directory, "dependencies.cmake")
         qisys.sh.write_file_if_different(to_write, dep_cmake)
 
-    def configure(self, **kwargs):
-        """ Delegate to :py:func:`qibuild.cmake.cmake` """
+    def configure(self, force=False, **kwargs):
+        """ Delegate to :py:func:`qibuild.cmake.cmake`
+
+        cmake is not called if nothing that can change the result
+        of the configuration changed since the last successful run
+        (see :py:meth:`configure_fingerprint`), unless ``force`` is True
+
+        """
         qisys.sh.mkdir(self.sdk_directory, recursive=True)
         cmake_args = self.cmake_args
         # only required the first time, afterwards this setting is
@@ -233,12 +253,83 @@ set(QIBUILD_PYTHON_PATH "%s" CACHE STRING "" FORCE)
         cmake_qibuild_dir = os.path.join(cmake_qibuild_dir, "qibuild")
         cmake_qibuild_dir = qisys.sh.to_posix_path(cmake_qibuild_dir)
         cmake_args.append("-Dqibuild_DIR=%s" % cmake_qibuild_dir)
+        build_env = self.build_env
+
+        # Those are used to debug cmake, so always run it
+        debugging = kwargs.get("profiling") or kwargs.get("trace_cmake") or \
+                    kwargs.get("debug_trycompile")
+        fingerprint = self.configure_fingerprint(cmake_args, build_env)
+        if not force and not debugging and os.path.exists(self.cmake_cache) \
+                and fingerprint == self.read_configure_fingerprint():
+            ui.info(ui.green, "-- Configuration is up to date, skipping cmake",
+                    ui.reset, "(use --force to run it anyway)")
+            if kwargs.get("summarize_options"):
+                qibuild.cmake.display_options(self.build_directory)
+            return
+
+        self.remove_configure_fingerprint()
         try:
+            # cmake() modifies the list of arguments
             qibuild.cmake.cmake(self.path, self.build_directory,
-                                cmake_args, env=self.build_env, **kwargs)
+                                cmake_args[:], env=build_env, **kwargs)
         except qisys.command.CommandFailedException as error:
             raise qibuild.build.ConfigureFailed(self, error)
         self.generate_qitest_json()
+        self.write_configure_fingerprint(fingerprint)
+
+    @property
+    def configure_fingerprint_path(self):
+        return os.path.join(self.build_directory, "qibuild-configure.json")
+
+    def configure_fingerprint(self, cmake_args, build_env):
+        """ Gather everything that feeds a configuration of the project:
+        the cmake arguments, the build profiles, the generator, the toolchain
+        file and packages, the content of the generated dependencies.cmake
+        and of the custom cmake file, and the relevant environment variables
+
+        """
+        build_config = self.build_config
+        toolchain = build_config.toolchain
+        toolchain_file = None
+        packages = list()
+        if toolchain:
+            toolchain_file = toolchain.toolchain_file
+            packages = sorted([x.name, x.version, x.path]
+                              for x in toolchain.packages)
+        env = dict((key, build_env.get(key))
+                   for key in CONFIGURE_ENV_VARS if key in build_env)
+        return {
+            "version" : 1,
+            "cmake_args" : cmake_args,
+            "profiles" : list(build_config.profiles),
+            "generator" : build_config.cmake_generator,
+            "toolchain_file" : toolchain_file,
+            "toolchain_file_sha1" : _file_sha1(toolchain_file),
+            "packages" : packages,
+            "dependencies_cmake_sha1" : _file_sha1(
+                os.path.join(self.build_directory, "dependencies.cmake")),
+            "local_cmake_sha1" : _file_sha1(build_config.local_cmake),
+            "env" : env,
+        }
+
+    def read_configure_fingerprint(self):
+        """ The fingerprint of the last successful configuration,
+        or None
+
+        """
+        try:
+            with open(self.configure_fingerprint_path, "r") as fp:
+                return json.load(fp)
+        except (IOError, ValueError):
+            return None
+
+    def write_configure_fingerprint(self, fingerprint):
+        with open(self.configure_fingerprint_path, "w") as fp:
+            json.dump(fingerprint, fp, indent=2, sort_keys=True)
+
+    def remove_configure_fingerprint(self):
+        """ Make sure cmake runs during the next configuration """
+        qisys.sh.rm(self.configure_fingerprint_path)
 
     def generate_qitest_json(self):
         """ The qitest.cmake is written from CMake """
@@ -255,6 +346,8 @@ set(QIBUILD_PYTHON_PATH "%s" CACHE STRING "" FORCE)
         parser.add_argument("--gtest", action="store_true",
                             help="Tell qitest this is a test using gtest")
         parser.add_argument("--timeout", type=int)
+        parser.add_argument("--shard", type=int,
+                            help="Number of shards of the gtest")
         parser.add_argument("--nightly", action="store_true")
         parser.add_argument("--perf", action="store_true")
         parser.add_argument("--working-directory")
@@ -283,8 +376,15 @@ set(QIBUILD_PYTHON_PATH "%s" CACHE STRING "" FORCE)
 
 
     def build(self, num_jobs=None, rebuild=False, target=None,
-              coverity=False, env=None):
-        """ Build the project """
+              coverity=False, env=None, log_file=None):
+        """ Build the project
+
+        :param num_jobs: number of jobs to use, defaults to the
+                         number of jobs of the build config
+        :param log_file: if set, write the output of the build
+                         to this file instead of the console
+
+        """
         timer = ui.timer("make %s" % self.name)
         timer.start()
 
@@ -305,7 +405,9 @@ set(QIBUILD_PYTHON_PATH "%s" CACHE STRING "" FORCE)
         if rebuild:
             cmd += ["--clean-first"]
         cmd += [ "--" ]
-        cmd += self.parse_num_jobs(self.build_config.num_jobs)
+        if num_jobs is None:
+            num_jobs = self.build_config.num_jobs
+        cmd += self.parse_num_jobs(num_jobs)
 
         if not env:
             build_env = self.build_env.copy()
@@ -319,7 +421,7 @@ set(QIBUILD_PYTHON_PATH "%s" CACHE STRING "" FORCE)
                 if self.cmake_generator == "Ninja":
                     cmd.append("-v")
         try:
-            qisys.command.call(cmd, env=build_env)
+            qisys.command.call(cmd, env=build_env, log_file=log_file)
         except qisys.command.CommandFailedException:
             raise qibuild.build.BuildFailed(self)
 
@@ -355,7 +457,7 @@ set(QIBUILD_PYTHON_PATH "%s" CACHE STRING "" FORCE)
         return list()
 
 
-    def install(self, destdir, prefix="/", components=None, num_jobs=1,
+    def install(self, destdir, prefix="/", components=None, num_jobs=None,
                 split_debug=False):
         """ Install the project
 
@@ -386,6 +488,8 @@ set(QIBUILD_PYTHON_PATH "%s" CACHE STRING "" FORCE)
         cprefix = qibuild.cmake.get_cached_var(self.build_directory,
                                                "CMAKE_INSTALL_PREFIX")
         if cprefix != prefix:
+            # The cache will no longer match the last configuration
+            self.remove_configure_fingerprint()
             qibuild.cmake.cmake(self.path, self.build_directory,
                 ['-DCMAKE_INSTALL_PREFIX=%s' % prefix],
                 clean_first=False,
@@ -439,6 +543,8 @@ set(QIBUILD_PYTHON_PATH "%s" CACHE STRING "" FORCE)
     def run_tests(self, **kwargs):
         test_project = self.to_test_project()
         test_runner = qibuild.test_runner.ProjectTestRunner(test_project)
+        test_runner.timings_path = \
+            qitest.timings.get_timings_path(self.build_worktree.worktree)
         for key, value in kwargs.iteritems():
             if hasattr(test_runner, key):
                 setattr(test_runner, key, value)
@@ -0,0 +1,174 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+import os
+import threading
+import time
+
+import qibuild.build
+import qibuild.build_scheduler
+import qibuild.cmake_builder
+
+import mock
+import pytest
+
+class FakeProject(object):
+    def __init__(self, name, build_depends=None, fail=False, duration=0.05):
+        self.name = name
+        self.build_depends = set(build_depends or list())
+        self.build_directory = "/nonexistent"
+        self.fail = fail
+        self.duration = duration
+        self.num_jobs = None
+
+    def __repr__(self):
+        return "<FakeProject %s>" % self.name
+
+    def build(self, num_jobs=None, log_file=None):
+        self.num_jobs = num_jobs
+        time.sleep(self.duration)
+        if self.fail:
+            raise qibuild.build.BuildFailed(self)
+
+class Recorder(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = list()
+        self.running_jobs = 0
+        self.max_running_jobs = 0
+
+    def wrap(self, project):
+        build = project.build
+        def new_build(num_jobs=None, log_file=None):
+            with self.lock:
+                self.events.append(("start", project.name))
+                self.running_jobs += num_jobs
+                self.max_running_jobs = max(self.max_running_jobs,
+                                            self.running_jobs)
+            try:
+                build(num_jobs=num_jobs, log_file=log_file)
+            finally:
+                with self.lock:
+                    self.running_jobs -= num_jobs
+                    self.events.append(("end", project.name))
+        project.build = new_build
+
+    def index(self, event, name):
+        return self.events.index((event, name))
+
+def run_scheduler(projects, num_jobs):
+    recorder = Recorder()
+    for project in projects:
+        recorder.wrap(project)
+    scheduler = qibuild.build_scheduler.BuildScheduler(mock.Mock(), projects,
+                                                       num_jobs=num_jobs)
+    return scheduler, recorder
+
+def test_starts_when_deps_are_built():
+    world = FakeProject("world")
+    hello = FakeProject("hello", build_depends=["world"])
+    other = FakeProject("other", duration=0.2)
+    scheduler, recorder = run_scheduler([world, other, hello], num_jobs=4)
+    scheduler.run()
+    assert recorder.index("end", "world") < recorder.index("start", "hello")
+    # hello does not wait for other:
+    assert recorder.index("start", "hello") < recorder.index("end", "other")
+
+def test_respects_job_budget():
+    projects = [FakeProject("p%i" % i) for i in range(10)]
+    scheduler, recorder = run_scheduler(projects, num_jobs=3)
+    scheduler.run()
+    assert recorder.max_running_jobs == 3
+    assert all(x.num_jobs == 1 for x in projects)
+
+def test_single_project_gets_whole_budget():
+    world = FakeProject("world")
+    hello = FakeProject("hello", build_depends=["world"])
+    scheduler, _ = run_scheduler([world, hello], num_jobs=8)
+    scheduler.run()
+    assert world.num_jobs == 8
+    assert hello.num_jobs == 8
+
+def test_stops_on_first_failure():
+    world = FakeProject("world", fail=True)
+    other = FakeProject("other", duration=0.2)
+    hello = FakeProject("hello", build_depends=["world"])
+    last = FakeProject("last", build_depends=["other"])
+    scheduler, recorder = run_scheduler([world, other, hello, last],
+                                        num_jobs=2)
+    # pylint: disable-msg=E1101
+    with pytest.raises(qibuild.build.BuildFailed) as e:
+        scheduler.run()
+    assert e.value.project == world
+    # running builds are waited for, but nothing else is started
+    assert ("end", "other") in recorder.events
+    assert ("start", "hello") not in recorder.events
+    assert ("start", "last") not in recorder.events
+
+def test_circular_deps_do_not_hang():
+    foo = FakeProject("foo", build_depends=["bar"])
+    bar = FakeProject("bar", build_depends=["foo"])
+    scheduler, recorder = run_scheduler([foo, bar], num_jobs=2)
+    scheduler.run()
+    assert recorder.events == [("start", "foo"), ("end", "foo"),
+                               ("start", "bar"), ("end", "bar")]
+
+def test_parallel_build(build_worktree):
+    world_proj = build_worktree.create_project("world")
+    hello_proj = build_worktree.create_project("hello", build_depends=["world"])
+    cmake_builder = qibuild.cmake_builder.CMakeBuilder(build_worktree,
+                                                       [hello_proj])
+    cmake_builder.configure()
+    cmake_builder.build(parallel=True, num_jobs=2)
+    for project in [world_proj, hello_proj]:
+        log_file = qibuild.build_scheduler.BuildScheduler.log_file(project)
+        assert os.path.exists(log_file)
+
+class FakeConfigureProject(FakeProject):
+    def __init__(self, name, build_depends=None, fail=False, duration=0.05):
+        super(FakeConfigureProject, self).__init__(name,
+                                                   build_depends=build_depends,
+                                                   fail=fail,
+                                                   duration=duration)
+        self.configured = False
+
+    def configure(self, log_file=None, **kwargs):
+        time.sleep(self.duration)
+        if self.fail:
+            raise qibuild.build.ConfigureFailed(self)
+        self.configured = True
+
+def test_get_levels():
+    world = FakeProject("world")
+    foo = FakeProject("foo")
+    hello = FakeProject("hello", build_depends=["world"])
+    bar = FakeProject("bar", build_depends=["foo", "hello"])
+    levels = qibuild.build_scheduler.get_levels([world, foo, hello, bar])
+    assert levels == [[world, foo], [hello], [bar]]
+
+def test_configure_in_parallel_reports_errors_in_build_order():
+    # 'first' fails after 'second', but is reported first
+    first = FakeConfigureProject("first", fail=True, duration=0.2)
+    second = FakeConfigureProject("second", fail=True)
+    other = FakeConfigureProject("other")
+    hello = FakeConfigureProject("hello", build_depends=["other"])
+    # pylint: disable-msg=E1101
+    with pytest.raises(qibuild.build.ConfigureFailed) as e:
+        qibuild.build_scheduler.configure_in_parallel(
+            [first, second, other, hello], 2)
+    assert e.value.project == first
+    # the whole level is configured, but not the next one
+    assert other.configured
+    assert not hello.configured
+
+def test_parallel_configure(build_worktree):
+    world_proj = build_worktree.create_project("world")
+    hello_proj = build_worktree.create_project("hello", build_depends=["world"])
+    cmake_builder = qibuild.cmake_builder.CMakeBuilder(build_worktree,
+                                                       [hello_proj])
+    cmake_builder.configure(num_jobs=2)
+    for project in [world_proj, hello_proj]:
+        assert os.path.exists(project.cmake_cache)
+        log_file = qibuild.build_scheduler.configure_log_file(project)
+        assert os.path.exists(log_file)
@@ -94,3 +94,11 @@ def test_set_pythonhome(toolchains, cd_to_tmpdir):
     env = build_worktree.get_env()
     assert env["PYTHONHOME"] == python_package.path
 
+
+def test_get_build_project_after_changes(build_worktree):
+    world = build_worktree.create_project("world")
+    build_worktree.create_project("hello", build_depends=["world"])
+    assert build_worktree.get_build_project("world") == world
+    build_worktree.worktree.remove_project("world")
+    assert build_worktree.get_build_project("world", raises=False) is None
+    assert build_worktree.get_build_project("hello")
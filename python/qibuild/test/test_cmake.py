@@ -7,6 +7,8 @@ import py
 
 import qibuild.cmake
 
+import mock
+
 from qisys.test.conftest import skip_on_win
 
 def test_get_cmake_qibuild_dir_no_worktree():
@@ -32,3 +34,67 @@ def test_pip_debian_install(tmpdir):
     cmake_dir.ensure("qibuild", "qibuild-config.cmake", file=True)
     res = qibuild.cmake.find_installed_cmake_qibuild_dir(python_dir.strpath)
     assert res == cmake_dir.strpath
+
+CMAKE_CACHE = """\
+# This is the CMakeCache file.
+//Choose the type of build
+CMAKE_BUILD_TYPE:STRING=Debug
+//Build the tests
+WITH_TESTS:BOOL=ON
+WITH_DOC:BOOL=OFF
+FOO_LIBRARY:FILEPATH=FOO_LIBRARY-NOTFOUND
+BAR_DEPENDS:INTERNAL=EGGS;SPAM
+EMPTY:STRING=
+"""
+
+def write_cmake_cache(build_dir, contents=CMAKE_CACHE):
+    build_dir.ensure(dir=True)
+    cache_path = build_dir.join("CMakeCache.txt")
+    cache_path.write(contents)
+    return cache_path
+
+def test_typed_access(tmpdir):
+    cache_path = write_cmake_cache(tmpdir)
+    cache = qibuild.cmake.load_cmake_cache(cache_path.strpath)
+    assert cache.get("CMAKE_BUILD_TYPE") == "Debug"
+    assert cache.get_type("CMAKE_BUILD_TYPE") == "STRING"
+    assert cache.get("NO_SUCH_VAR", "default") == "default"
+    assert cache.get_bool("WITH_TESTS") is True
+    assert cache.get_bool("WITH_DOC") is False
+    assert cache.get_bool("FOO_LIBRARY") is False
+    assert cache.get_bool("EMPTY") is False
+    assert cache.get_list("BAR_DEPENDS") == ["EGGS", "SPAM"]
+    assert cache.get_list("EMPTY") == list()
+    assert "WITH_TESTS" in cache
+    assert qibuild.cmake.read_cmake_cache(cache_path.strpath)["WITH_DOC"] == "OFF"
+
+def test_cache_is_parsed_once(tmpdir):
+    cache_path = write_cmake_cache(tmpdir)
+    with mock.patch.object(qibuild.cmake.CMakeCache, "read",
+                           autospec=True) as read_mock:
+        for _ in range(3):
+            qibuild.cmake.get_cached_var(tmpdir.strpath, "CMAKE_BUILD_TYPE")
+        assert read_mock.call_count == 1
+
+def test_cache_is_parsed_again_when_changed(tmpdir):
+    cache_path = write_cmake_cache(tmpdir)
+    assert qibuild.cmake.get_cached_var(tmpdir.strpath,
+                                        "CMAKE_BUILD_TYPE") == "Debug"
+    cache_path.write(CMAKE_CACHE.replace("Debug", "Release"))
+    assert qibuild.cmake.get_cached_var(tmpdir.strpath,
+                                        "CMAKE_BUILD_TYPE") == "Release"
+
+def test_get_cached_var_in_dirs(tmpdir):
+    foo_build = tmpdir.join("foo", "build")
+    bar_build = tmpdir.join("bar", "build")
+    write_cmake_cache(foo_build)
+    write_cmake_cache(bar_build, CMAKE_CACHE.replace("Debug", "Release"))
+    not_configured = tmpdir.join("baz", "build")
+    res = qibuild.cmake.get_cached_var_in_dirs(
+        [foo_build.strpath, bar_build.strpath, not_configured.strpath],
+        "CMAKE_BUILD_TYPE", default="<none>")
+    assert res == {
+        foo_build.strpath : "Debug",
+        bar_build.strpath : "Release",
+        not_configured.strpath : "<none>",
+    }
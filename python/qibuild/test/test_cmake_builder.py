@@ -17,6 +17,12 @@ def test_check_configure_has_been_called_before_building(build_worktree):
     with pytest.raises(qibuild.cmake_builder.NotConfigured):
         cmake_builder.build()
 
+def test_reverse_cmake_builder(build_worktree):
+    world = build_worktree.create_project("world")
+    hello = build_worktree.create_project("hello", build_depends=["world"])
+    cmake_builder = qibuild.cmake_builder.CMakeBuilder(build_worktree, [world])
+    assert cmake_builder.get_reverse_dep_projects() == [hello]
+
 def test_check_configure_called_on_runtime_deps(build_worktree):
     hello_proj = build_worktree.create_project("hello", run_depends=["bar"])
     build_worktree.create_project("bar")
@@ -5,7 +5,11 @@
 
 """
 
+import mock
+
+import qisys.sort
 import qibuild.config
+import qitoolchain.qipackage
 from qibuild.deps import DepsSolver
 
 
@@ -132,3 +136,55 @@ def test_complex_reverse_deps(build_worktree):
 
     assert deps_solver.get_dep_projects([libworld], ["build", "runtime"],
         reverse=True) == [hello, libhello]
+
+def test_resolution_is_cached(build_worktree):
+    world = build_worktree.create_project("world")
+    hello = build_worktree.create_project("hello", build_depends=["world"])
+    deps_solver = DepsSolver(build_worktree)
+    with mock.patch("qisys.sort.topological_sort",
+                    wraps=qisys.sort.topological_sort) as sort_mock:
+        for _ in range(3):
+            assert deps_solver.get_dep_projects([hello], ["build"]) == \
+                [world, hello]
+        assert sort_mock.call_count == 1
+        deps_solver.get_dep_projects([hello], ["build", "runtime"])
+        assert sort_mock.call_count == 2
+
+def test_cache_cleared_when_projects_change(build_worktree):
+    world = build_worktree.create_project("world")
+    hello = build_worktree.create_project("hello", build_depends=["world", "foo"])
+    deps_solver = DepsSolver(build_worktree)
+    assert deps_solver.get_dep_projects([hello], ["build"]) == [world, hello]
+    foo = build_worktree.create_project("foo")
+    assert deps_solver.get_dep_projects([hello], ["build"]) == \
+        [world, foo, hello]
+
+def test_cache_cleared_when_toolchain_changes(build_worktree, toolchains):
+    toolchains.create("foo")
+    qibuild.config.add_build_config("foo", toolchain="foo")
+    world_package = toolchains.add_package("foo", "world")
+    hello = build_worktree.create_project("hello", build_depends=["world", "bar"])
+    build_worktree.set_active_config("foo")
+    deps_solver = DepsSolver(build_worktree)
+    assert deps_solver.get_dep_packages([hello], ["build"]) == [world_package]
+    bar_package = qitoolchain.qipackage.QiPackage("bar", "r1")
+    bar_package.path = build_worktree.tmpdir.mkdir("bar-package").strpath
+    build_worktree.toolchain.add_package(bar_package)
+    assert deps_solver.get_dep_packages([hello], ["build"]) == \
+        [world_package, bar_package]
+
+def test_transitive_reverse_deps(build_worktree):
+    libworld = build_worktree.create_project("libworld")
+    libhello = build_worktree.create_project("libhello", build_depends=["libworld"])
+    hello = build_worktree.create_project("hello", build_depends=["libhello"])
+    top_world = build_worktree.create_project("top_world", run_depends=["hello"])
+    build_worktree.create_project("other")
+    deps_solver = DepsSolver(build_worktree)
+    assert deps_solver.get_reverse_dep_projects([libworld], ["build"]) == \
+        [libhello, hello]
+    assert deps_solver.get_reverse_dep_projects([libworld],
+        ["build", "runtime"]) == [libhello, hello, top_world]
+    assert deps_solver.get_reverse_dep_projects([libworld], ["build"],
+        transitive=False) == [libhello]
+    assert deps_solver.get_reverse_dep_projects([top_world],
+        ["build", "runtime"]) == list()
@@ -14,6 +14,7 @@ import qisrc.git
 import qitoolchain
 
 from qibuild.test.conftest import TestBuildWorkTree
+import mock
 import pytest
 
 
@@ -35,6 +36,14 @@ def test_deps(qibuild_action):
     # As should `qibuild configure --all`
     qibuild_action("configure", "-a")
 
+def test_parallel_deps(qibuild_action):
+    world_proj = qibuild_action.add_test_project("world")
+    hello_proj = qibuild_action.add_test_project("hello")
+    qibuild_action("configure", "hello", "-j", "2")
+    assert os.path.exists(hello_proj.cmake_cache)
+    assert os.path.exists(os.path.join(world_proj.build_directory,
+                                       "configure.log"))
+
 
 def test_qi_use_lib(qibuild_action):
     use_lib_proj = qibuild_action.add_test_project("uselib")
@@ -270,3 +279,44 @@ def test_relwithdebinfo(qibuild_action):
     cmake_build_type = qibuild.cmake.get_cached_var(world_proj.build_directory,
                                                     "CMAKE_BUILD_TYPE")
     assert cmake_build_type == "RelWithDebInfo"
+
+def test_skip_when_nothing_changed(qibuild_action):
+    world_proj = qibuild_action.add_test_project("world")
+    qibuild_action("configure", "world")
+    assert os.path.exists(world_proj.configure_fingerprint_path)
+    with mock.patch("qibuild.cmake.cmake") as cmake_mock:
+        qibuild_action("configure", "world")
+        assert not cmake_mock.called
+        qibuild_action("configure", "world", "--force")
+        assert cmake_mock.called
+
+def test_reconfigure_when_flags_change(qibuild_action):
+    world_proj = qibuild_action.add_test_project("world")
+    qibuild_action("configure", "world")
+    qibuild_action("configure", "world", "-DFOO=BAR")
+    assert qibuild.cmake.get_cached_var(world_proj.build_directory,
+                                        "FOO") == "BAR"
+    with mock.patch("qibuild.cmake.cmake") as cmake_mock:
+        qibuild_action("configure", "world", "--build-type", "Release")
+        assert cmake_mock.called
+
+def test_reconfigure_when_deps_change(qibuild_action):
+    qibuild_action.add_test_project("world")
+    qibuild_action.add_test_project("hello")
+    qibuild_action("configure", "hello")
+    # dependencies.cmake of hello no longer contains the path to world
+    qibuild_action.build_worktree.worktree.remove_project("world")
+    with mock.patch("qibuild.cmake.cmake") as cmake_mock:
+        qibuild_action("configure", "hello", "-s")
+        assert cmake_mock.called
+
+def test_failed_configure_is_not_skipped(qibuild_action):
+    world_proj = qibuild_action.add_test_project("world")
+    qibuild_action("configure", "world")
+    with mock.patch("qibuild.cmake.cmake") as cmake_mock:
+        cmake_mock.side_effect = qisys.command.CommandFailedException(
+            ["cmake"], 1)
+        # pylint: disable-msg=E1101
+        with pytest.raises(qibuild.build.ConfigureFailed):
+            qibuild_action("configure", "world", "--force")
+    assert not os.path.exists(world_proj.configure_fingerprint_path)
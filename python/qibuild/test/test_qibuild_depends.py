@@ -1,8 +1,25 @@
 ## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
 ## Use of this source code is governed by a BSD-style license that can be
 ## found in the COPYING file.
+
+import qisys.ui
+
 def test_simple(qibuild_action, record_messages):
     # More complex tests should be written at a lower level
     qibuild_action.create_project("world")
     qibuild_action.create_project("hello", build_depends=["world"])
     qibuild_action("depends", "hello")
+
+def test_reverse_transitive(qibuild_action, record_messages):
+    qibuild_action.create_project("world")
+    qibuild_action.create_project("hello", build_depends=["world"])
+    qibuild_action.create_project("hello-plugin", build_depends=["world", "hello"])
+    qibuild_action("depends", "world", "--reverse", "--transitive", "--tree")
+    assert record_messages.find("hello-plugin")
+    messages = [x for x in qisys.ui._MESSAGES if "hello-plugin" in x]
+    assert len(messages) == 1
+
+def test_transitive_without_reverse(qibuild_action):
+    qibuild_action.create_project("world")
+    error = qibuild_action("depends", "world", "--transitive", raises=True)
+    assert "--reverse" in error
@@ -1,6 +1,8 @@
 ## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
 ## Use of this source code is governed by a BSD-style license that can be
 ## found in the COPYING file.
+from qisys import ui
+
 def test_simple(qibuild_action, record_messages):
     qibuild_action.add_test_project("nested")
     # only command we can be sure will always be there, even on
@@ -8,3 +10,42 @@ def test_simple(qibuild_action, record_messages):
     qibuild_action("foreach", "--", "python", "--version")
     assert record_messages.find("nested")
     assert record_messages.find("nested/foo")
+
+def write_name_cmd(log, delays):
+    """ A command writing the name of the project to ``log`` after
+    sleeping for the delay of the project
+
+    """
+    code = """\
+import os, time
+name = os.path.basename(os.getcwd())
+time.sleep(%s.get(name, 0))
+with open(%r, "a") as fp:
+    fp.write(name + "\\n")
+""" % (delays, log.strpath)
+    return ["python", "-c", code]
+
+def test_in_dependency_order(qibuild_action, tmpdir):
+    qibuild_action.create_project("a")
+    qibuild_action.create_project("b", build_depends=["a"])
+    qibuild_action.create_project("c")
+    log = tmpdir.join("log.txt")
+    cmd = write_name_cmd(log, {"a": 0.5})
+    qibuild_action("foreach", "-j", "3", "--in-dependency-order", "--", *cmd)
+    order = log.read().splitlines()
+    assert sorted(order) == ["a", "b", "c"]
+    assert order.index("a") < order.index("b")
+    assert order[0] == "c"
+
+def test_parallel_output_in_project_order(qibuild_action, tmpdir,
+                                          record_messages):
+    qibuild_action.create_project("a")
+    qibuild_action.create_project("b")
+    log = tmpdir.join("log.txt")
+    cmd = write_name_cmd(log, {"a": 0.5})
+    cmd[-1] += "print('done in ' + name)\n"
+    qibuild_action("foreach", "-j", "2", "--", *cmd)
+    # b was done first, but its output comes second
+    assert log.read().splitlines() == ["b", "a"]
+    out = "".join(ui._MESSAGES)
+    assert out.index("done in a") < out.index("done in b")
@@ -19,6 +19,15 @@ def test_running_from_build_dir(qibuild_action):
     hello = qibuild.find.find_bin([hello_proj.sdk_directory], "hello")
     qisys.command.call([hello])
 
+def test_parallel_make(qibuild_action):
+    world_proj = qibuild_action.add_test_project("world")
+    hello_proj = qibuild_action.add_test_project("hello")
+    qibuild_action("configure", "hello")
+    qibuild_action("make", "hello", "--parallel", "-j", "2")
+    hello = qibuild.find.find_bin([hello_proj.sdk_directory], "hello")
+    qisys.command.call([hello])
+    assert os.path.exists(os.path.join(world_proj.build_directory, "build.log"))
+
 def test_make_without_configure(qibuild_action):
     qibuild_action.add_test_project("world")
     qibuild_action.add_test_project("hello")
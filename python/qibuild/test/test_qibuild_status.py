@@ -9,3 +9,10 @@ def test_simple(qibuild_action, record_messages):
     qibuild_action("status")
     assert record_messages.find("world")
     assert record_messages.find("hello")
+
+def test_build_type(qibuild_action, record_messages):
+    qibuild_action.add_test_project("world")
+    qibuild_action("configure", "world", "--release")
+    record_messages.reset()
+    qibuild_action("status")
+    assert record_messages.find("Release")
@@ -1,7 +1,9 @@
 ## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
 ## Use of this source code is governed by a BSD-style license that can be
 ## found in the COPYING file.
+import json
 import os
+import re
 import sys
 
 import xml.etree.ElementTree as etree
@@ -42,6 +44,9 @@ def test_various_outcomes(qibuild_action, record_messages):
     result = os.path.join(result_dir, "spam.xml")
     with open(result, "r") as f:
         assert len(f.read()) < 17000
+    # The whole output is in the log file
+    spam_log = os.path.join(result_dir, "spam.log")
+    assert os.path.getsize(spam_log) == 1000 * len("spamming like a madman\n")
 
     if qisys.command.find_program("valgrind"):
         # Test one file descriptor leak with --valgrind
@@ -114,3 +119,99 @@ def test_setting_output_dir_without_project(qitest_action, qibuild_action, tmpdi
                   "--qitest-json", qitest_json.strpath,
                   "--root-output-dir", out.strpath)
     assert out.join("test-results", "ok.xml").check(file=True)
+
+def test_timings_are_recorded(qitest_action, qibuild_action, record_messages):
+    qibuild_action.add_test_project("testme")
+    qibuild_action("configure", "testme")
+    qibuild_action("make", "testme")
+    qitest_action("run", "testme", "-k", "ok", "-j", "2")
+    timings_path = os.path.join(qibuild_action.build_worktree.dot_qi,
+                                "test-timings.json")
+    with open(timings_path, "r") as fp:
+        estimates = json.load(fp)["estimates"]
+    assert "testme/ok" in estimates
+    assert record_messages.find(r"Predicted: \d+\.\ds, actual: \d+\.\ds")
+
+FAKE_GTEST = """
+import os
+import re
+import sys
+
+shard_index = int(os.environ["GTEST_SHARD_INDEX"])
+total_shards = int(os.environ["GTEST_TOTAL_SHARDS"])
+output = sys.argv[-1].split("xml:")[1]
+names = ["one", "two", "three", "four"][shard_index::total_shards]
+cases = ""
+for name in names:
+    cases += '<testcase name="%s" status="run" time="0"/>' % name
+with open(output, "w") as fp:
+    fp.write('<testsuites tests="%i" failures="0" name="AllTests">'
+             '<testsuite name="Fake" tests="%i" failures="0" time="0">'
+             '%s</testsuite></testsuites>' % (len(names), len(names), cases))
+"""
+
+def test_shard_large_tests(qitest_action, tmpdir):
+    fake_gtest = tmpdir.join("fake_gtest.py")
+    fake_gtest.write(FAKE_GTEST)
+    qitest_json = tmpdir.join("qitest.json")
+    qitest_json.write(json.dumps([{
+        "name" : "big",
+        "gtest" : True,
+        "shard" : 3,
+        "timeout" : 10,
+        "cmd" : [sys.executable, fake_gtest.strpath],
+    }]))
+    qitest_action("run", "--qitest-json", qitest_json.strpath,
+                  "-j", "4", "--shard-large-tests")
+    test_results = tmpdir.join("test-results")
+    assert sorted(os.listdir(test_results.strpath)) == ["big.log", "big.xml"]
+    root = etree.parse(test_results.join("big.xml").strpath).getroot()
+    assert root.get("tests") == "4"
+    names = [x.get("name") for x in root.iter("testcase")]
+    assert sorted(names) == ["four", "one", "three", "two"]
+
+def test_shard_output_points_to_merged_log(qitest_action, tmpdir,
+                                           record_messages):
+    qitest_json = tmpdir.join("qitest.json")
+    qitest_json.write(json.dumps([{
+        "name" : "big",
+        "gtest" : True,
+        "shard" : 2,
+        "timeout" : 10,
+        "cmd" : [sys.executable, "-c",
+                 "import sys; print 'spam' * 10000; sys.exit(1)"],
+    }]))
+    rc = qitest_action("run", "--qitest-json", qitest_json.strpath,
+                       "-j", "2", "--shard-large-tests", retcode=True)
+    assert rc == 1
+    test_results = tmpdir.join("test-results")
+    big_log = test_results.join("big.log").strpath
+    assert record_messages.find("bytes skipped, see %s" % big_log)
+    assert not record_messages.find(r"big_shard\d\.log")
+    with open(test_results.join("big.xml").strpath, "r") as fp:
+        xml = fp.read()
+    assert "see %s" % big_log in xml
+    assert not re.search(r"big_shard\d\.log", xml)
+
+def test_single_queue_for_several_projects(qitest_action, tmpdir, record_messages):
+    fake_gtest = tmpdir.join("fake_gtest.py")
+    fake_gtest.write(FAKE_GTEST)
+    qitest_jsons = list()
+    for name in ["a", "b"]:
+        qitest_json = tmpdir.join(name, "qitest.json")
+        qitest_json.ensure(file=True)
+        qitest_json.write(json.dumps([
+            {"name" : "ok", "timeout" : 10,
+             "cmd" : [sys.executable, "-c", "print 'ok'"]},
+            {"name" : "big", "gtest" : True, "shard" : 2, "timeout" : 10,
+             "cmd" : [sys.executable, fake_gtest.strpath]},
+        ]))
+        qitest_jsons.extend(["--qitest-json", qitest_json.strpath])
+    qitest_action("run", "-j", "3", "--shard-large-tests", *qitest_jsons)
+    assert record_messages.find("Running tests in 2 projects")
+    assert record_messages.find("Ran 4 tests")
+    assert record_messages.find("a/big_shard1")
+    for name in ["a", "b"]:
+        test_results = tmpdir.join(name, "test-results")
+        assert sorted(os.listdir(test_results.strpath)) == \
+            ["big.log", "big.xml", "ok.log", "ok.xml"]
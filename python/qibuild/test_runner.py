@@ -5,6 +5,7 @@ import datetime
 import multiprocessing
 import os
 import re
+import shutil
 import sys
 
 import qisys.sh
@@ -13,6 +14,11 @@ from qisys.qixml import etree
 import qisys.command
 import qitest.conf
 import qitest.runner
+import qitest.shard
+
+# Only the end of the output of the tests is kept in memory and in the
+# XML files (~700 lines), the whole output is written in a log file
+OUTPUT_TAIL_SIZE = 16384
 
 
 class ProjectTestRunner(qitest.runner.TestSuiteRunner):
@@ -101,6 +107,7 @@ class ProcessTestLauncher(qitest.runner.TestLauncher):
         self.suite_runner = project_runner
         self.project = self.suite_runner.project
         self.verbose = self.suite_runner.verbose
+        self.supervisor = None
         # Make sure output dirs exist and are empty:
         for directory in self.suite_runner.perf_results_dir, \
                          self.suite_runner.test_results_dir:
@@ -111,6 +118,10 @@ class ProcessTestLauncher(qitest.runner.TestLauncher):
         return  os.path.join(self.suite_runner.test_results_dir,
                              test["name"] + "_valgrind.log")
 
+    def output_log(self, test):
+        return os.path.join(self.suite_runner.test_results_dir,
+                            test["name"] + ".log")
+
     def test_out(self, test):
         return os.path.join(self.suite_runner.test_results_dir,
                             test["name"] + ".xml")
@@ -133,14 +144,25 @@ class ProcessTestLauncher(qitest.runner.TestLauncher):
         timeout = test["timeout"]
         env = test["env"]
         cwd = test["working_directory"]
-        process = qisys.command.Process(cmd, cwd=cwd, env=env)
+        process = qisys.command.Process(cmd, cwd=cwd, env=env,
+                                        log_file=self.output_log(test),
+                                        tail_size=OUTPUT_TAIL_SIZE)
         start = datetime.datetime.now()
-        process.run(timeout)
+        process.run(timeout, supervisor=self.supervisor)
         end = datetime.datetime.now()
         delta = end - start
 
         res.time = float(delta.microseconds) / 10 ** 6 + delta.seconds
         res.out = process.out
+        res.log_file = process.log_file
+        skipped = process.out_size - len(process.out)
+        if skipped:
+            mess = "[%i bytes skipped" % skipped
+            if process.log_file:
+                # The logs of the shards end up in the log of the test
+                mess += ", see %s" % self.output_log(
+                    test.get("sharded_from") or test)
+            res.out = mess + "]\n" + res.out
         # Sometimes the process did not have any output,
         # but we still want to let the user know it ran
         if not process.out:
@@ -150,19 +172,52 @@ class ProcessTestLauncher(qitest.runner.TestLauncher):
         if process.return_type == qisys.command.Process.OK:
             res.ok = True
             if self.verbose:
-                ui.info("\n", process.out)
+                ui.info("\n", res.out)
             message = (ui.green, message)
         elif process.return_type == qisys.command.Process.INTERRUPTED:
             res.ok = None
             message = (ui.brown, "interrupted")
         else:
-            ui.info("\n", process.out)
+            ui.info("\n", res.out)
             message = (ui.red, message)
 
         res.message = message
         self._post_run(process, res, test)
         return res
 
+    def merge_shards(self, test, shards):
+        """ Implements :py:func:`qitest.runner.TestLauncher.merge_shards`
+
+        Also merge the XML files of the shards into the XML file of the
+        test. The XML of a shard that cannot be read is replaced by the
+        one that would have been written if it had crashed.
+        The log files of the shards are concatenated.
+
+        """
+        res = super(ProcessTestLauncher, self).merge_shards(test, shards)
+        res.log_file = self.output_log(test)
+        with open(res.log_file, "wb") as fp:
+            for shard, _ in shards:
+                shard_log = self.output_log(shard)
+                if not os.path.exists(shard_log):
+                    continue
+                with open(shard_log, "rb") as shard_fp:
+                    shutil.copyfileobj(shard_fp, fp)
+                qisys.sh.rm(shard_log)
+        roots = list()
+        for shard, shard_res in shards:
+            shard_out = self.test_out(shard)
+            try:
+                tree = etree.parse(shard_out)
+            except (IOError, etree.ParseError):
+                self._write_xml(shard_res, shard, shard_out)
+                tree = etree.parse(shard_out)
+            roots.append(tree.getroot())
+            qisys.sh.rm(shard_out)
+        merged = qitest.shard.merge_junit_xml(roots)
+        qisys.qixml.write(merged, self.test_out(test), encoding="UTF-8")
+        return res
+
     def _update_test(self, test):
         """ Update the test given the settings on the test suite """
         self._update_test_cmd_for_project(test)
@@ -276,9 +331,12 @@ class ProcessTestLauncher(qitest.runner.TestLauncher):
             self._write_xml(res, test, test_out)
 
     def _write_xml(self, res, test, out_xml):
-        """ Make sure a Junit XML compatible file is written """
-        # Arbitrary limit output (~700 lines) to prevent from crashing on read
-        res.out = res.out[-16384:]
+        """ Make sure a Junit XML compatible file is written.
+        Only the end of the output of the test is used
+
+        """
+        # Leave room for the note about the skipped output
+        res.out = res.out[-(OUTPUT_TAIL_SIZE + 1024):]
         res.out = re.sub('\x1b[^m]*m', "", res.out)
 
         message_as_string = " ".join(str(x) for x in res.message
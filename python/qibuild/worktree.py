@@ -23,6 +23,7 @@ class BuildWorkTree(qisys.worktree.WorkTreeObserver):
         self.root = self.worktree.root
         self.build_config = qibuild.build_config.CMakeBuildConfig(self)
         self.build_projects = list()
+        self._build_projects_by_name = dict()
         self._load_build_projects()
         worktree.register(self)
 
@@ -144,9 +145,9 @@ class BuildWorkTree(qisys.worktree.WorkTreeObserver):
 
     def get_build_project(self, name, raises=True):
         """ Get a :py:class:`.BuildProject` given its name """
-        for build_project in self.build_projects:
-            if build_project.name == name:
-                return build_project
+        build_project = self._build_projects_by_name.get(name)
+        if build_project:
+            return build_project
         if raises:
             mess = ui.did_you_mean("No such qibuild project: %s" % name,
                                    name, [x.name for x in self.build_projects])
@@ -169,11 +170,13 @@ class BuildWorkTree(qisys.worktree.WorkTreeObserver):
 
         """
         self.build_projects = list()
+        self._build_projects_by_name = dict()
         for wt_project in self.worktree.projects:
             build_project = new_build_project(self, wt_project)
             if build_project:
                 self.check_unique_name(build_project)
                 self.build_projects.append(build_project)
+                self._build_projects_by_name[build_project.name] = build_project
 
     def configure_build_profile(self, name, flags):
         """ Configure a build profile for the worktree """
@@ -199,9 +202,9 @@ class BuildWorkTree(qisys.worktree.WorkTreeObserver):
         self.build_config.set_active_config(active_config)
 
     def check_unique_name(self, new_project):
-        for project in self.build_projects:
-            if project.name == new_project.name:
-                raise Exception("""\
+        project = self._build_projects_by_name.get(new_project.name)
+        if project:
+            raise Exception("""\
 Found two projects with the same name ({project.name})
 In:
 * {project.path}
@@ -0,0 +1,14 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+# Generated by qisys.script.write_action_index(). Do not edit.
+
+ACTIONS = [
+    ('build', 'Build a doc project and its dependencies'),
+    ('clean', 'Clean the build-doc directory'),
+    ('convert', 'Fix a qidoc2 worktree.'),
+    ('install', 'Install a doc project and its depencies.'),
+    ('list', 'List the qidoc projects'),
+    ('open', 'Open the current documentation in a web browser.'),
+]
@@ -19,16 +19,19 @@ class DocWorkTree(qisys.worktree.WorkTreeObserver):
         self.worktree = worktree
         self.root = worktree.root
         self.doc_projects = list()
+        self._doc_projects_by_name = dict()
         self._load_doc_projects()
         worktree.register(self)
 
     def _load_doc_projects(self):
         self.doc_projects = list()
+        self._doc_projects_by_name = dict()
         for worktree_project in self.worktree.projects:
             doc_project = new_doc_project(self, worktree_project)
             if doc_project:
                 if not isinstance(doc_project, TemplateProject):
                     self.check_unique_name(doc_project)
+                    self._doc_projects_by_name[doc_project.name] = doc_project
                 self.doc_projects.append(doc_project)
 
     @property
@@ -56,11 +59,9 @@ class DocWorkTree(qisys.worktree.WorkTreeObserver):
         self._load_doc_projects()
 
     def get_doc_project(self, name, raises=False):
-        for project in self.doc_projects:
-            if isinstance(project, TemplateProject):
-                continue
-            if project.name == name:
-                return project
+        project = self._doc_projects_by_name.get(name)
+        if project:
+            return project
         if raises:
             mess = ui.did_you_mean("No such qidoc project: %s\n" % name,
                                    name, [x.name for x in self.doc_projects])
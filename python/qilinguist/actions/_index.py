@@ -0,0 +1,12 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+# Generated by qisys.script.write_action_index(). Do not edit.
+
+ACTIONS = [
+    ('install', 'Install binary translations files'),
+    ('list', 'List translatable projects'),
+    ('release', 'Compile binary translations files'),
+    ('update', 'Update translations sources from source code'),
+]
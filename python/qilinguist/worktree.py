@@ -14,16 +14,20 @@ class LinguistWorkTree(qisys.worktree.WorkTreeObserver):
         self.worktree = worktree
         self.root = worktree.root
         self.linguist_projects = list()
+        self._linguist_projects_by_name = dict()
         self._load_linguist_projects()
         worktree.register(self)
 
     def _load_linguist_projects(self):
         self.linguist_projects = list()
+        self._linguist_projects_by_name = dict()
         for worktree_project in self.worktree.projects:
             linguist_project = new_linguist_project(self, worktree_project)
             if linguist_project:
                 self.check_unique_name(linguist_project)
                 self.linguist_projects.append(linguist_project)
+                self._linguist_projects_by_name[linguist_project.name] = \
+                        linguist_project
 
     def on_project_added(self, project):
         """ Called when a new project has been registered """
@@ -38,9 +42,9 @@ class LinguistWorkTree(qisys.worktree.WorkTreeObserver):
         self._load_linguist_projects()
 
     def get_linguist_project(self, name, raises=False):
-        for project in self.linguist_projects:
-            if project.name == name:
-                return project
+        project = self._linguist_projects_by_name.get(name)
+        if project:
+            return project
         if raises:
             mess = ui.did_you_mean("No such linguist project: %s" % name,
                                    name, [x.name for x in self.linguist_projects])
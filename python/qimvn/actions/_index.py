@@ -0,0 +1,13 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+# Generated by qisys.script.write_action_index(). Do not edit.
+
+ACTIONS = [
+    ('deploy', 'Deploy package using Maven.'),
+    ('find', 'Find an runable jar in target/ projects directories.'),
+    ('jar', 'Create a jar with files found in build directories.'),
+    ('package', 'Package project using Maven.'),
+    ('run', 'Run a package found with qimvn find'),
+]
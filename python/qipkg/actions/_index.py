@@ -0,0 +1,17 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+# Generated by qisys.script.write_action_index(). Do not edit.
+
+ACTIONS = [
+    ('build', 'Build all the projects of the given pml file'),
+    ('bump_version', 'Bump the version number of a given package'),
+    ('configure', 'Configure all the projects of the given pml file'),
+    ('deploy', 'Deploy a complete package on the robot. This use rsync to be fast'),
+    ('deploy_package', 'Deploy and install a package to a target'),
+    ('extract_package', 'Extract the contents of a package'),
+    ('install', 'Install all the projects to the given dest'),
+    ('ls_package', 'List the contents of a package'),
+    ('make_package', 'Generate a binary package, ready to be used for a behavior'),
+]
@@ -0,0 +1,16 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+# Generated by qisys.script.write_action_index(). Do not edit.
+
+ACTIONS = [
+    ('bootstrap', 'Make all python projects available in the current build configuration'),
+    ('clean', 'Remove a complete virtualenv'),
+    ('deploy', 'Deploy python projects to a remote location'),
+    ('install', 'Install the given python project'),
+    ('list', 'List all known python projects'),
+    ('pip', 'Run pip from the correct virtualenv'),
+    ('run', 'Run a python script from the virtualenv'),
+    ('sourceme', 'Return the path to the activate file in the virtualenv'),
+]
@@ -16,6 +16,7 @@ class PythonWorkTree(qisys.worktree.WorkTreeObserver):
     def __init__(self, worktree, config="system"):
         self.worktree = worktree
         self.python_projects = list()
+        self._python_projects_by_name = dict()
         self._load_python_projects()
         self.config = "default"
         worktree.register(self)
@@ -36,6 +37,7 @@ class PythonWorkTree(qisys.worktree.WorkTreeObserver):
     def _load_python_projects(self):
         seen_names = dict()
         self.python_projects = list()
+        self._python_projects_by_name = dict()
         for project in self.worktree.projects:
             qiproject_xml = os.path.join(project.path, "qiproject.xml")
             if not os.path.exists(qiproject_xml):
@@ -51,13 +53,14 @@ Found two projects with the same name. (%s)
 """ % (new_project.name, seen_names[new_project.name], new_project.src)
                 raise Exception(mess)
             self.python_projects.append(new_project)
+            self._python_projects_by_name[new_project.name] = new_project
             seen_names[new_project.name] = new_project.src
 
     def get_python_project(self, name, raises=False):
         """ Get a Python project given its name """
-        for project in self.python_projects:
-            if project.name == name:
-                return project
+        project = self._python_projects_by_name.get(name)
+        if project:
+            return project
         if raises:
             mess = ui.did_you_mean("No such python project",
                                          name, [x.name for x in self.python_projects])
@@ -0,0 +1,32 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+# Generated by qisys.script.write_action_index(). Do not edit.
+
+ACTIONS = [
+    ('add', 'Add a new project to a worktree'),
+    ('add_group', 'Add a group to the current worktree'),
+    ('check_manifest', 'Apply changes from a manifest xml path.'),
+    ('checkout', 'Change the branch of the manifest'),
+    ('create', 'Create a new project'),
+    ('diff', 'Display diff with an other branch of the worktree'),
+    ('foreach', 'Run the same command on each source project.'),
+    ('grep', 'Run git grep on every project'),
+    ('index', 'Build or update the code search index used by `qisrc grep --indexed`'),
+    ('info', 'Display info about the current git worktree'),
+    ('init', 'Init a new qisrc workspace'),
+    ('list', 'List the names and paths of every project, or those matching a pattern'),
+    ('list_groups', 'List the available groups'),
+    ('log', 'Display log between current branch and an other branch of the worktree'),
+    ('maintainers', 'Manage the list of maintainers.'),
+    ('mirror', 'Manage the mirrors of the remote repositories shared by the worktrees'),
+    ('push', 'Push changes for review'),
+    ('rebase', 'Rebase repositories on top of an other branch of the manifest'),
+    ('remove', 'Remove a project from a worktree'),
+    ('reset', 'Reset repositories to a clean state'),
+    ('rm_group', 'Remove a group from the current worktree'),
+    ('snapshot', 'Generate a snapshot of all the git projects'),
+    ('status', 'List the state of all git repositories and exit'),
+    ('sync', 'Synchronize the given worktree with its manifest'),
+]
@@ -24,6 +24,7 @@ def configure_parser(parser):
     parser.add_argument("command", metavar="COMMAND", nargs="+")
     parser.add_argument("-c", "--ignore-errors", "--continue",
         action="store_true", help="continue on error")
+    qisys.parsers.foreach_parser(parser)
     parser.set_defaults(git_only=True)
 
 def do(args):
@@ -36,4 +37,5 @@ def do(args):
         projects = worktree.projects
 
     qisys.actions.foreach(projects, args.command,
-                          ignore_errors=args.ignore_errors)
+                          ignore_errors=args.ignore_errors,
+                          num_jobs=args.num_jobs, live=args.live)
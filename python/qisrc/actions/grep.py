@@ -8,12 +8,21 @@ Options are the same as in git grep, e.g.:
 
   qisrc grep -- -niC2 foo
 
+Projects are searched in parallel, but the matches are still displayed
+in the order of the projects.
+
+With --indexed, the code search index (see `qisrc index`) is updated,
+and only the files that may match are searched.
+
 """
 
+import multiprocessing
 import os
 import sys
 
 from qisys import ui
+import qisys.parallel
+import qisrc.code_index
 import qisrc.git
 import qisrc.parsers
 import qibuild.parsers
@@ -24,6 +33,16 @@ def configure_parser(parser):
     qibuild.parsers.project_parser(parser, positional=False)
     parser.add_argument("--path", help="type of patch to print",
             default="project", choices=['none', 'absolute', 'worktree', 'project'])
+    parser.add_argument("-j", "--jobs", dest="num_jobs", type=int,
+                        default=multiprocessing.cpu_count(),
+                        help="Search up to NUM_JOBS projects at the same time. "
+                             "Defaults to the number of CPUs")
+    parser.add_argument("--max-count", dest="max_count", type=int,
+                        help="Stop after NUM lines of matches in total, "
+                             "across all projects")
+    parser.add_argument("--indexed", action="store_true",
+                        help="Use the code search index to only search "
+                             "the files that may match")
     parser.add_argument("git_grep_opts", metavar="-- git grep options", nargs="+",
                         help="git grep options preceded with -- to escape the leading '-'")
 
@@ -47,28 +66,76 @@ def do(args):
         qisrc.worktree.on_no_matching_projects(git_worktree, groups=args.groups)
         sys.exit(0)
 
+    query = None
+    if args.indexed:
+        query = qisrc.code_index.parse_git_grep_opts(git_grep_opts)
+        if query is None:
+            ui.warning("Cannot use the index with these git grep options, "
+                       "searching every file")
+    if query:
+        candidates = get_candidates(git_worktree, git_projects, query)
+
+    def grep(project):
+        git = qisrc.git.Git(project.path)
+        if query:
+            return qisrc.code_index.grep(git, query, candidates[project.src])
+        return git.call("grep", *git_grep_opts, raises=False)
+
     max_src = max(len(x.src) for x in git_projects)
     retcode = 1
-    for i, project in enumerate(git_projects):
+    num_lines = 0
+    out = ""
+    # Keep the results of at most a few projects in memory while
+    # waiting for a slow project to be done
+    results = qisys.parallel.imap_ordered(grep, git_projects,
+                                          num_jobs=args.num_jobs,
+                                          max_ahead=2 * args.num_jobs)
+    for i, (project, (status, out)) in enumerate(results):
         ui.info_count(i, len(git_projects),
                       ui.green, "Looking in",
                       ui.blue, project.src.ljust(max_src),
                       end="\r")
-        git = qisrc.git.Git(project.path)
-        (status, out) = git.call("grep", *git_grep_opts, raises=False)
         if out != "":
+            lines = out.splitlines()
+            if args.max_count is not None:
+                lines = lines[:args.max_count - num_lines]
+                num_lines += len(lines)
             if args.path == 'absolute' or args.path == 'worktree':
-                lines = out.splitlines()
                 out_lines = list()
                 for line in lines:
                     line_split = line.split('\0')
                     prepend = project.src if args.path == 'worktree' else project.path
                     line_split[0] = os.path.join(prepend, line_split[0])
                     out_lines.append(":".join(line_split))
-                out = '\n'.join(out_lines)
+                lines = out_lines
+            out = '\n'.join(lines)
             ui.info("\n", ui.reset, out)
         if status == 0:
             retcode = 0
+        if args.max_count is not None and num_lines >= args.max_count:
+            # Stops the greps not started yet
+            results.close()
+            break
     if not out:
         ui.info(ui.reset)
     sys.exit(retcode)
+
+def get_candidates(git_worktree, git_projects, query):
+    """ Update the index, and return the files of each project
+    that may match the query
+
+    """
+    code_index = qisrc.code_index.CodeIndex(git_worktree.code_index_path)
+    files = dict()
+    for project in git_projects:
+        files[project.src] = qisrc.code_index.list_files(project.path)
+        code_index.update(project.path, files=files[project.src])
+    code_index.save()
+    matching = code_index.search(query)
+    res = dict()
+    for project in git_projects:
+        res[project.src] = code_index.get_candidates(files[project.src],
+                                                     matching)
+    ui.debug("Searching", sum(len(x) for x in res.values()), "of",
+             sum(len(x) for x in files.values()), "files")
+    return res
@@ -0,0 +1,54 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" Build or update the code search index used by `qisrc grep --indexed`
+
+Only the files that changed since the last run are read again.
+The index is stored in .qi/code-index
+
+"""
+
+import time
+
+from qisys import ui
+import qisys.parsers
+import qisrc.code_index
+import qisrc.parsers
+
+
+def configure_parser(parser):
+    """Configure parser for this action """
+    qisys.parsers.worktree_parser(parser)
+    qisys.parsers.project_parser(parser)
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Discard the index and index every file again")
+
+def do(args):
+    """Main entry point"""
+    git_worktree = qisrc.parsers.get_git_worktree(args)
+    git_projects = qisrc.parsers.get_git_projects(git_worktree, args,
+                                                  default_all=True)
+    start = time.time()
+    code_index = qisrc.code_index.CodeIndex(git_worktree.code_index_path)
+    if args.rebuild:
+        code_index.clear()
+    num_added = 0
+    live_sha1s = set()
+    for (i, git_project) in enumerate(git_projects):
+        ui.info_count(i, len(git_projects), ui.green, "Indexing",
+                      ui.blue, git_project.src)
+        files = qisrc.code_index.list_files(git_project.path)
+        live_sha1s.update(x[1] for x in files)
+        num_added += code_index.update(git_project.path, files=files)
+    num_removed = 0
+    if len(git_projects) == len(git_worktree.git_projects):
+        # Only forget about the blobs of the projects not indexed
+        # when every project was indexed
+        num_removed = code_index.gc(live_sha1s)
+    code_index.save()
+    ui.info(ui.green, "Added", ui.reset, num_added, "file(s),",
+            ui.green, "removed", ui.reset, num_removed, "file(s)",
+            "in %.2fs" % (time.time() - start))
+    ui.info("Index contains", code_index.num_blobs, "file(s) and",
+            code_index.num_trigrams, "trigrams")
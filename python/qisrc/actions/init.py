@@ -18,12 +18,20 @@ def configure_parser(parser):
     """Configure parser for this action """
     qisys.parsers.worktree_parser(parser)
     qisrc.parsers.groups_parser(parser)
+    qisrc.parsers.clone_parser(parser)
     parser.add_argument("manifest_url", nargs="?")
     parser.add_argument("-b", "--branch", dest="branch",
         help="Use this branch for the manifest")
     parser.add_argument("--no-review", dest="review", action="store_false",
         default=True, help="Do not sync the review remotes")
-    parser.set_defaults(branch="master")
+    parser.add_argument("-j", "--jobs", dest="num_jobs", type=int, default=1,
+        help="Clone up to NUM_JOBS projects at the same time")
+    parser.add_argument("--mirror", action="store_true",
+        help="Borrow objects from mirrors of the remote repositories, shared by "
+             "all the worktrees (see `qisrc mirror`)")
+    parser.add_argument("--no-mirror", dest="mirror", action="store_false",
+        help="Do not use the shared mirrors")
+    parser.set_defaults(branch="master", mirror=None)
 
 def do(args):
     """Main entry point"""
@@ -35,7 +43,11 @@ def do(args):
         ok = git_worktree.configure_manifest(args.manifest_url,
                                         groups=args.groups,
                                         branch=args.branch,
-                                        review=args.review)
+                                        review=args.review,
+                                        num_jobs=args.num_jobs,
+                                        mirror=args.mirror,
+                                        depth=args.depth,
+                                        clone_filter=args.clone_filter)
         if not ok:
             sys.exit(1)
 
@@ -0,0 +1,55 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" Manage the mirrors of the remote repositories shared by the worktrees
+
+The mirrors are used by worktrees created with `qisrc init --mirror`.
+They are stored in ~/.cache/qi/git-mirrors, unless the QISRC_MIRRORS_DIR
+environment variable is set.
+
+ * list: display the mirrors and the projects using them
+ * gc: forget about the projects that no longer exist, and remove the
+   mirrors no longer used by any project when --force is given.
+   Worktrees moved or copied since they were cloned still borrow objects
+   from the mirrors: run `qisrc sync` in them first.
+
+"""
+
+from qisys import ui
+import qisys.parsers
+import qisrc.mirror
+
+
+def configure_parser(parser):
+    """Configure parser for this action """
+    qisys.parsers.default_parser(parser)
+    parser.add_argument("command", choices=["list", "gc"])
+    parser.add_argument("-n", "--dry-run", dest="dry_run", action="store_true",
+                        help="With gc, only display the mirrors that would be removed")
+    parser.add_argument("--force", action="store_true",
+                        help="With gc, remove the unused mirrors")
+
+def do(args):
+    """Main entry point"""
+    mirror_cache = qisrc.mirror.MirrorCache()
+    if args.command == "list":
+        mirrors = mirror_cache.get_mirrors()
+        if not mirrors:
+            ui.info("No mirror in", mirror_cache.root)
+        for (path, url, users) in mirrors:
+            ui.info(ui.green, "*", ui.blue, url, ui.reset, "in", path)
+            for user in users:
+                ui.info(ui.tabs(1), user)
+        return
+    unused = mirror_cache.gc(dry_run=args.dry_run, force=args.force)
+    if args.dry_run or not args.force:
+        message = "Would remove"
+    else:
+        message = "Removed"
+    for path in unused:
+        ui.info(ui.green, "*", ui.reset, message, ui.blue, path)
+    ui.info(message, len(unused), "unused mirror(s)")
+    if unused and not args.force:
+        ui.info("Worktrees moved or copied elsewhere may still use them. "
+                "Use --force to remove them")
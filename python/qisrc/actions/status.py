@@ -5,10 +5,13 @@
 """ List the state of all git repositories and exit
 """
 
+import multiprocessing
 import sys
+import time
 
 from qisys import ui
 import qisys
+import qisys.parallel
 import qisrc.parsers
 import qisrc.status
 
@@ -22,6 +25,10 @@ def configure_parser(parser):
         dest="untracked_files",
         action="store_true",
         help="display untracked files")
+    group.add_argument("-j", "--jobs", dest="num_jobs", type=int,
+        default=multiprocessing.cpu_count(),
+        help="Check up to NUM_JOBS projects at the same time. "
+             "Defaults to the number of CPUs")
 
 def do(args):
     """Main method."""
@@ -37,7 +44,13 @@ def do(args):
     max_len = max(len(p.src) for p in git_projects)
     state_projects = list()
 
-    for (i, git_project) in enumerate(git_projects, start = 1):
+    def check_state(git_project):
+        return qisrc.status.check_state(git_project, args.untracked_files)
+
+    start = time.time()
+    results = qisys.parallel.imap_ordered(check_state, git_projects,
+                                          num_jobs=args.num_jobs)
+    for (i, (git_project, state_project)) in enumerate(results, start = 1):
         if sys.stdout.isatty():
             src = git_project.src
             to_write = "Checking (%d/%d) " % (i, num_projs)
@@ -45,15 +58,16 @@ def do(args):
             sys.stdout.write(to_write + "\r")
             sys.stdout.flush()
 
-        state_project = qisrc.status.check_state(git_project, args.untracked_files)
         state_projects.append(state_project)
+    elapsed = time.time() - start
 
     if sys.stdout.isatty():
         ui.info("Checking (%d/%d):" % (num_projs, num_projs), "done",
                 " " * max_len)
 
     dirty = [x for x in state_projects if not x.sync_and_clean]
-    ui.info("\n", ui.brown, "Dirty projects", len(dirty), "/", num_projs)
+    ui.info("\n", ui.brown, "Dirty projects", len(dirty), "/", num_projs,
+            ui.reset, "(checked in %.2fs)" % elapsed)
 
     for git_project in state_projects:
         qisrc.status.print_state(git_project, max_len)
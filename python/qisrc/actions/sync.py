@@ -12,6 +12,7 @@
 import sys
 
 from qisys import ui
+import qisys.parallel
 import qisys.parsers
 import qisrc.git
 import qisrc.sync
@@ -22,12 +23,16 @@ def configure_parser(parser):
     """Configure parser for this action """
     qisys.parsers.worktree_parser(parser)
     qisys.parsers.project_parser(parser)
+    qisrc.parsers.clone_parser(parser)
 
     group = parser.add_argument_group("qisrc sync options")
     group.add_argument("--rebase-devel", action="store_true",
                        help="Rebase development branches. Advanced users only")
     group.add_argument("--reset", action="store_true",
                        help="Do the same as `qisrc reset --all --force` after the fetch")
+    group.add_argument("-j", "--jobs", dest="num_jobs", type=int, default=1,
+                       help="Clone and synchronize up to NUM_JOBS projects at the same time. "
+                            "Output is still displayed in the order of the manifest")
 
 def print_overview(total, skipped, failed):
     out = [ ui.green, "Success:", ui.white, total - skipped - failed ]
@@ -48,7 +53,8 @@ def do(args):
     """Main entry point"""
     reset = args.reset
     git_worktree = qisrc.parsers.get_git_worktree(args)
-    sync_ok = git_worktree.sync()
+    sync_ok = git_worktree.sync(num_jobs=args.num_jobs, depth=args.depth,
+                                clone_filter=args.clone_filter)
     if not sync_ok:
         sys.exit(1)
 
@@ -63,14 +69,20 @@ def do(args):
     failed = list()
     ui.info(ui.green, ":: Syncing projects ...")
     max_src = max(len(x.src) for x in git_projects)
-    for (i, git_project) in enumerate(git_projects):
-        ui.info_count(i, len(git_projects),
-                      ui.blue, git_project.src.ljust(max_src), end="\r")
 
+    def sync_project(git_project):
         if reset:
-            (status, out) = git_project.reset()
+            return git_project.reset()
         else:
-            (status, out) = git_project.sync(rebase_devel=args.rebase_devel)
+            return git_project.sync(rebase_devel=args.rebase_devel)
+
+    # Projects are synchronized in parallel, but their results are
+    # displayed in order: the counter shows the project we are waiting for
+    results = qisys.parallel.imap_ordered(sync_project, git_projects,
+                                          num_jobs=args.num_jobs)
+    ui.info_count(0, len(git_projects),
+                  ui.blue, git_projects[0].src.ljust(max_src), end="\r")
+    for (i, (git_project, (status, out))) in enumerate(results):
         if status is None:
             ui.info("\n", ui.brown, "  [skipped]")
             skipped.append((git_project.src, out))
@@ -79,6 +91,10 @@ def do(args):
             failed.append((git_project.src, out))
         if out:
             print ui.indent(out + "\n\n", num=2)
+        if i + 1 < len(git_projects):
+            ui.info_count(i + 1, len(git_projects),
+                          ui.blue, git_projects[i + 1].src.ljust(max_src),
+                          end="\r")
     #clean the screen
     ui.info_count(i, len(git_projects), ui.blue, " ".ljust(max_src), end="\r")
     print_overview(len(git_projects), len(skipped), len(failed))
@@ -0,0 +1,667 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" A trigram index of the files tracked by the git projects, used by
+``qisrc grep --indexed`` to only search the files that may match
+
+The index maps every sequence of three bytes to the list of git blobs
+containing it. Since it is keyed by blob SHA1, a file only needs to be
+read again when its contents change, and identical files in several
+projects are indexed once.
+
+Contents are lower-cased before being indexed, so that the same index
+can be used for case-insensitive searches.
+
+A search never misses a match: files the index knows nothing about
+(binary or big files, symlinks, files modified in the working tree)
+are always searched, and patterns too complex to be analyzed
+are searched in every file.
+
+"""
+
+import array
+import binascii
+import marshal
+import os
+import re
+import subprocess
+import sys
+import threading
+import zlib
+
+from qisys import ui
+import qisys.command
+import qisys.sh
+
+# Bigger files are not indexed, and always searched
+MAX_FILE_SIZE = 1024 * 1024
+
+# Maximum number of files given to a single git grep command
+MAX_FILES_PER_GREP = 1000
+
+# git grep options followed by a value
+_SHORT_OPTS_WITH_VALUE = "efABCm"
+_LONG_OPTS_WITH_VALUE = ["--max-depth", "--threads", "--context",
+                         "--after-context", "--before-context", "--max-count"]
+
+# git grep options for which the index cannot be used
+_UNSUPPORTED_OPTS = ["-v", "--invert-match", "--not", "--untracked",
+                     "--no-index", "--recurse-submodules", "-f", "--file",
+                     "-L", "--files-without-match"]
+
+
+class GrepQuery(object):
+    """ The git grep options and patterns, split in a form the index can
+    use
+
+    A file may match if it contains every trigram of at least one of the
+    ``branches``
+
+    """
+    def __init__(self):
+        self.options = list()
+        self.pathspecs = list()
+        self.branches = list()
+
+    def __repr__(self):
+        return "<GrepQuery %s %s>" % (self.options, self.branches)
+
+
+def get_trigrams(text):
+    """ The set of the lower-cased trigrams of the given text """
+    res = set()
+    # Patterns never match across lines, so trigrams spanning two
+    # lines are useless
+    for line in set(text.lower().split("\n")):
+        res.update(line[i:i+3] for i in xrange(len(line) - 2))
+    return res
+
+
+def parse_git_grep_opts(opts):
+    """ Split the arguments of git grep into options, patterns
+    and pathspecs
+
+    :returns: a :py:class:`GrepQuery`, or None if the index cannot be
+              used with these options
+
+    """
+    res = GrepQuery()
+    patterns = list()
+    fixed = False
+    positionals = list()
+    i = 0
+    while i < len(opts):
+        opt = opts[i]
+        i += 1
+        if opt == "--":
+            res.pathspecs = opts[i:]
+            break
+        if opt in _UNSUPPORTED_OPTS or opt in ["(", ")"]:
+            return None
+        if opt.startswith("--file="):
+            return None
+        if opt.startswith("--"):
+            res.options.append(opt)
+            if opt == "--regexp":
+                if i == len(opts):
+                    return None
+                res.options.append(opts[i])
+                patterns.append(opts[i])
+                i += 1
+            elif opt.startswith("--regexp="):
+                patterns.append(opt[len("--regexp="):])
+            elif opt in ["--fixed-strings"]:
+                fixed = True
+            elif opt in ["--basic-regexp", "--extended-regexp",
+                         "--perl-regexp"]:
+                fixed = False
+            elif opt in _LONG_OPTS_WITH_VALUE:
+                if i == len(opts):
+                    return None
+                res.options.append(opts[i])
+                i += 1
+            continue
+        if opt.startswith("-") and len(opt) > 1:
+            res.options.append(opt)
+            for (j, letter) in enumerate(opt[1:], start=1):
+                if letter in "vL":
+                    return None
+                if letter == "F":
+                    fixed = True
+                elif letter in "EGP":
+                    fixed = False
+                if letter == "O":
+                    # -O[<pager>]
+                    break
+                if letter in _SHORT_OPTS_WITH_VALUE:
+                    if letter == "f":
+                        return None
+                    value = opt[j+1:]
+                    if not value:
+                        if i == len(opts):
+                            return None
+                        value = opts[i]
+                        res.options.append(value)
+                        i += 1
+                    if letter == "e":
+                        patterns.append(value)
+                    break
+            continue
+        positionals.append(opt)
+
+    if not patterns:
+        if not positionals:
+            return None
+        patterns.append(positionals.pop(0))
+        res.options.append(patterns[0])
+    if positionals:
+        # Could be either revisions or paths
+        return None
+    for pattern in patterns:
+        if fixed:
+            branches = fixed_literals(pattern)
+        else:
+            branches = required_literals(pattern)
+        if branches is None:
+            return None
+        res.branches.extend(branches)
+    return res
+
+
+def fixed_literals(pattern):
+    """ Same as :py:func:`required_literals`, for a fixed string pattern
+
+    Return None if a line of the pattern is too short to have trigrams,
+    or contains non-ASCII characters (their case folding depends on
+    the locale)
+
+    """
+    res = list()
+    for line in pattern.split("\n"):
+        if len(line) < 3 or any(ord(x) > 127 for x in line):
+            return None
+        res.append([line.lower()])
+    return res
+
+
+def required_literals(pattern):
+    """ Analyze a regular expression, and return a list of branches,
+    each branch being a list of strings a line must contain to match
+    the branch.
+
+    The analysis is conservative, and works with basic, extended
+    and Perl regular expressions: characters special in any of them
+    are never part of the strings, and ``|`` always splits branches.
+
+    Like git grep, each line of the pattern is a separate branch.
+
+    Return None if nothing can be deduced from the pattern
+
+    """
+    res = list()
+    for line in pattern.split("\n"):
+        line_branches = _required_literals(line)
+        if line_branches is None:
+            return None
+        res.extend(line_branches)
+    return res
+
+
+def _required_literals(pattern):
+    if re.search(r"\(\?(?!:)", pattern):
+        # Perl extensions, including inline options such as (?x) or (?i)
+        # which change the meaning of the rest of the pattern
+        return None
+    branches = list()
+    atoms = list()
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        i += 1
+        escaped = False
+        if char == "\\":
+            if i == len(pattern):
+                return None
+            char = pattern[i]
+            i += 1
+            escaped = True
+            if char.isdigit() or char in "xopPNcgkQEu":
+                # Back-references, and Perl escapes followed by
+                # arbitrary characters
+                return None
+            if char.isalnum():
+                # Character classes, anchors
+                atoms.append(None)
+                continue
+        if char == "|":
+            branches.append(atoms)
+            atoms = list()
+        elif char == "(" or char == ")" and escaped:
+            if char == ")":
+                return None
+            # Groups are not analyzed
+            i = _skip_group(pattern, i)
+            if i is None:
+                return None
+            atoms.append(None)
+        elif char == "[" and not escaped:
+            i = _skip_bracket(pattern, i)
+            if i is None:
+                return None
+            atoms.append(None)
+        elif char in "?*{":
+            # The previous atom is optional
+            if atoms:
+                atoms[-1] = None
+            if char == "{":
+                end = pattern.find("}", i)
+                if end != -1:
+                    i = end + 1
+        elif char == "+":
+            atoms.append(None)
+        elif char in ".^$)}]" and not escaped:
+            atoms.append(None)
+        elif ord(char) > 127 or char == "\r":
+            # Case folding of non-ASCII characters depends on the locale
+            atoms.append(None)
+        else:
+            atoms.append(char.lower())
+    branches.append(atoms)
+
+    res = list()
+    for atoms in branches:
+        literals = list()
+        literal = ""
+        for atom in atoms + [None]:
+            if atom is None:
+                if len(literal) >= 3:
+                    literals.append(literal)
+                literal = ""
+            else:
+                literal += atom
+        if not literals:
+            return None
+        res.append(literals)
+    return res
+
+
+def _skip_group(pattern, i):
+    """ Return the index following the parenthesis closing the group
+    started just before ``i``
+
+    """
+    depth = 1
+    while i < len(pattern):
+        char = pattern[i]
+        i += 1
+        if char == "\\":
+            if i == len(pattern):
+                return None
+            char = pattern[i]
+            i += 1
+        if char == "[":
+            i = _skip_bracket(pattern, i)
+            if i is None:
+                return None
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    return None
+
+
+def _skip_bracket(pattern, i):
+    """ Return the index following the end of the bracket expression
+    started just before ``i``
+
+    """
+    if pattern[i:i+1] == "^":
+        i += 1
+    if pattern[i:i+1] == "]":
+        i += 1
+    while i < len(pattern):
+        if pattern[i:i+2] in ["[:", "[=", "[."]:
+            end = pattern.find(pattern[i+1] + "]", i + 2)
+            if end == -1:
+                return None
+            i = end + 2
+            continue
+        if pattern[i] == "]":
+            return i + 1
+        i += 1
+    return None
+
+
+def list_files(repo):
+    """ The files tracked by the git repository
+
+    :returns: a list of (path, blob_sha1) tuples. ``blob_sha1`` is None
+              when the file in the working tree may not match the blob
+              in the git index
+
+    """
+    git = qisys.command.find_program("git", raises=True)
+    out = _git_output([git, "ls-files", "-s", "-z"], repo)
+    modified = _git_output([git, "diff", "--name-only", "-z"], repo)
+    modified = set(modified.split("\0"))
+    res = list()
+    seen = set()
+    for entry in out.split("\0"):
+        if not entry:
+            continue
+        (info, path) = entry.split("\t", 1)
+        (mode, sha1, stage) = info.split()
+        if mode == "160000":
+            # submodules are not searched by git grep
+            continue
+        if path in seen:
+            # unmerged path
+            res = [(x, y) if x != path else (x, None) for (x, y) in res]
+            continue
+        seen.add(path)
+        if stage != "0" or path in modified or mode == "120000":
+            sha1 = None
+        res.append((path, sha1))
+    return res
+
+
+def _git_output(cmd, repo):
+    process = subprocess.Popen(cmd, cwd=repo, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE)
+    (out, err) = process.communicate()
+    if process.returncode != 0:
+        raise qisys.command.CommandFailedException(cmd, process.returncode,
+                                                   cwd=repo, stdout=out,
+                                                   stderr=err)
+    return out
+
+
+class CodeIndex(object):
+    """ The trigram index stored in a single file
+
+    The file is a zlib-compressed, marshaled dict, in which blobs are
+    stored as 20-byte binary SHA1s, and each trigram is mapped to the
+    sorted array of the numbers of the blobs containing it.
+
+    """
+    version = 1
+
+    def __init__(self, path):
+        self.path = path
+        self._blobs = list()
+        self._blob_ids = dict()
+        # blobs that could not be indexed, and must always be searched
+        self._unindexed = set()
+        self._postings = dict()
+        self._dirty = False
+        self.load()
+
+    @property
+    def num_blobs(self):
+        """ Number of blobs known to the index """
+        return len(self._blobs)
+
+    @property
+    def num_trigrams(self):
+        """ Number of distinct trigrams in the index """
+        return len(self._postings)
+
+    def load(self):
+        """ Read the index from disk. Discard it if it is unreadable """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as fp:
+                data = marshal.loads(zlib.decompress(fp.read()))
+        except (IOError, EOFError, ValueError, TypeError, zlib.error):
+            ui.debug("Could not read code index from", self.path)
+            return
+        if not isinstance(data, dict) or \
+                data.get("version") != self.version or \
+                data.get("byteorder") != sys.byteorder:
+            return
+        blobs = data["blobs"]
+        self._blobs = [blobs[i:i+20] for i in xrange(0, len(blobs), 20)]
+        self._blob_ids = dict((x, i) for (i, x) in enumerate(self._blobs))
+        self._unindexed = set(_to_array(data["unindexed"]))
+        # Arrays are only built for the trigrams actually used
+        self._postings = data["postings"]
+
+    def save(self):
+        """ Write the index to disk if it has changed """
+        if not self._dirty:
+            return
+        data = {
+            "version": self.version,
+            "byteorder": sys.byteorder,
+            "blobs": "".join(self._blobs),
+            "unindexed": array.array("I", sorted(self._unindexed)).tostring(),
+            "postings": dict((k, _to_string(v)) for (k, v)
+                             in self._postings.iteritems()),
+        }
+        qisys.sh.mkdir(os.path.dirname(self.path), recursive=True)
+        to_write = self.path + ".tmp"
+        with open(to_write, "wb") as fp:
+            fp.write(zlib.compress(marshal.dumps(data), 1))
+        qisys.sh.mv(to_write, self.path)
+        self._dirty = False
+
+    def clear(self):
+        """ Forget about every blob """
+        self._blobs = list()
+        self._blob_ids = dict()
+        self._unindexed = set()
+        self._postings = dict()
+        self._dirty = True
+
+    def update(self, repo, files=None):
+        """ Index the blobs of the given git repository not already
+        in the index
+
+        :param files: the result of :py:func:`list_files`, if already
+                      known
+        :returns: the number of blobs added
+
+        """
+        if files is None:
+            files = list_files(repo)
+        to_add = list()
+        seen = set()
+        for (_, sha1) in files:
+            if sha1 is None or sha1 in seen:
+                continue
+            seen.add(sha1)
+            if binascii.unhexlify(sha1) not in self._blob_ids:
+                to_add.append(sha1)
+        if not to_add:
+            return 0
+        for (sha1, contents) in _read_blobs(repo, to_add):
+            self._add_blob(sha1, contents)
+        return len(to_add)
+
+    def _add_blob(self, sha1, contents):
+        blob_id = len(self._blobs)
+        key = binascii.unhexlify(sha1)
+        self._blobs.append(key)
+        self._blob_ids[key] = blob_id
+        self._dirty = True
+        if contents is None or "\0" in contents:
+            self._unindexed.add(blob_id)
+            return
+        for trigram in get_trigrams(contents):
+            postings = self._postings.get(trigram)
+            if postings is None:
+                postings = self._postings[trigram] = array.array("I")
+            elif not isinstance(postings, array.array):
+                postings = self._postings[trigram] = _to_array(postings)
+            postings.append(blob_id)
+
+    def gc(self, live_sha1s):
+        """ Remove the blobs not in ``live_sha1s``
+
+        :returns: the number of blobs removed
+
+        """
+        live = set(binascii.unhexlify(x) for x in live_sha1s if x)
+        new_ids = dict()
+        blobs = list()
+        for (blob_id, key) in enumerate(self._blobs):
+            if key in live:
+                new_ids[blob_id] = len(blobs)
+                blobs.append(key)
+        removed = len(self._blobs) - len(blobs)
+        if not removed:
+            return 0
+        postings = dict()
+        for (trigram, ids) in self._postings.iteritems():
+            ids = array.array("I", (new_ids[x] for x in _to_array(ids)
+                                    if x in new_ids))
+            if ids:
+                postings[trigram] = ids
+        self._unindexed = set(new_ids[x] for x in self._unindexed
+                              if x in new_ids)
+        self._blobs = blobs
+        self._blob_ids = dict((x, i) for (i, x) in enumerate(blobs))
+        self._postings = postings
+        self._dirty = True
+        return removed
+
+    def search(self, query):
+        """ The set of the numbers of the blobs that may match the query """
+        res = set(self._unindexed)
+        for literals in query.branches:
+            trigrams = set()
+            for literal in literals:
+                trigrams.update(get_trigrams(literal))
+            if not trigrams:
+                # Any blob may match
+                res.update(self._blob_ids.itervalues())
+                continue
+            postings = [self._postings.get(x) for x in trigrams]
+            if None in postings:
+                continue
+            postings.sort(key=len)
+            candidates = set(_to_array(postings[0]))
+            for ids in postings[1:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(_to_array(ids))
+            res.update(candidates)
+        return res
+
+    def get_candidates(self, files, matching):
+        """ The paths of the ``files`` that may match
+
+        :param files: the result of :py:func:`list_files`
+        :param matching: the result of :py:meth:`search`
+
+        """
+        res = list()
+        for (path, sha1) in files:
+            if sha1 is None:
+                res.append(path)
+                continue
+            blob_id = self._blob_ids.get(binascii.unhexlify(sha1))
+            if blob_id is None or blob_id in matching:
+                res.append(path)
+        return res
+
+
+def _to_array(value):
+    if isinstance(value, array.array):
+        return value
+    res = array.array("I")
+    res.fromstring(value)
+    return res
+
+
+def _to_string(value):
+    if isinstance(value, array.array):
+        return value.tostring()
+    return value
+
+
+def _read_blobs(repo, sha1s):
+    """ Yield (sha1, contents) for each blob, contents being None
+    for the blobs bigger than MAX_FILE_SIZE
+
+    """
+    git = qisys.command.find_program("git", raises=True)
+    sizes = dict()
+    out = _git_output_with_input([git, "cat-file", "--batch-check"], repo,
+                                 sha1s)
+    for line in out.splitlines():
+        fields = line.split()
+        if len(fields) == 3:
+            sizes[fields[0]] = int(fields[2])
+    small = [x for x in sha1s if sizes.get(x, MAX_FILE_SIZE + 1) <= MAX_FILE_SIZE]
+    for sha1 in sha1s:
+        if sha1 not in small:
+            yield (sha1, None)
+    cmd = [git, "cat-file", "--batch"]
+    process = subprocess.Popen(cmd, cwd=repo, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE)
+    writer = threading.Thread(target=_write_lines,
+                              args=(process.stdin, small))
+    writer.daemon = True
+    writer.start()
+    try:
+        for sha1 in small:
+            header = process.stdout.readline().split()
+            size = int(header[2])
+            contents = process.stdout.read(size)
+            # trailing newline
+            process.stdout.read(1)
+            yield (sha1, contents)
+    finally:
+        writer.join()
+        process.stdout.close()
+        process.wait()
+
+
+def _write_lines(fp, lines):
+    try:
+        for line in lines:
+            fp.write(line + "\n")
+    finally:
+        fp.close()
+
+
+def _git_output_with_input(cmd, repo, lines):
+    process = subprocess.Popen(cmd, cwd=repo, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE)
+    (out, _) = process.communicate("\n".join(lines) + "\n")
+    return out
+
+
+def grep(git, query, candidates):
+    """ Run git grep with the options of the query on the candidate
+    files
+
+    :returns: a (retcode, output) tuple, like ``git.call(..., raises=False)``
+
+    """
+    if query.pathspecs:
+        (rc, out) = git.call("ls-files", "-z", "--", *query.pathspecs,
+                             raises=False)
+        if rc != 0:
+            return (rc, out)
+        selected = set(out.split("\0"))
+        candidates = [x for x in candidates if x in selected]
+    retcode = 1
+    outputs = list()
+    for start in xrange(0, len(candidates), MAX_FILES_PER_GREP):
+        paths = [":(literal)" + x for x in
+                 candidates[start:start+MAX_FILES_PER_GREP]]
+        (rc, out) = git.call("grep", *(query.options + ["--"] + paths),
+                             raises=False)
+        if rc == 0:
+            retcode = 0
+        elif rc != 1:
+            return (rc, out)
+        if out:
+            outputs.append(out)
+    return (retcode, "\n".join(outputs))
@@ -360,6 +360,11 @@ class Git(object):
             if rc != 0:
                 return False, "Fetch failed\n" + out
 
+        if update_cmd[0] == "rebase":
+            # In a shallow clone, make sure rebase can find where
+            # the branches diverged
+            self.get_merge_base(branch.name, remote_ref)
+
         update_successful = False
         message = ""
         (update_rc, out) = self.call(*update_cmd, raises=False)
@@ -386,15 +391,44 @@ class Git(object):
         """Check local_sha1 is fast-forward with remote_sha1.
         Return True / False or None in case of error with merge-base.
         """
-        (retcode, out) = self.call("merge-base", local_sha1, remote_sha1,
-                                   raises=False)
-        if retcode != 0:
+        common_ancestor = self.get_merge_base(local_sha1, remote_sha1)
+        if common_ancestor is None:
             ui.error("Calling merge-base failed")
-            ui.error(out)
             return
-        else:
-            common_ancestor = out.strip()
-            return common_ancestor == local_sha1
+        return common_ancestor == local_sha1
+
+    def is_shallow(self):
+        """ Return True if the repository has been cloned with --depth """
+        (retcode, out) = self.call("rev-parse", "--is-shallow-repository",
+                                   raises=False)
+        return retcode == 0 and out.strip() == "true"
+
+    def get_merge_base(self, ref_a, ref_b, deepen=50):
+        """ Return the sha1 of the best common ancestor of the two refs,
+        or None if there is none.
+
+        In a shallow clone, the common ancestor may not have been fetched
+        yet: fetch ``deepen`` more commits, twice as many the next time,
+        and so on until it is found or the whole history is there.
+
+        """
+        # Doubling 20 times is more than enough to get the whole history,
+        # the limit is just a safety net
+        for _ in range(20):
+            (retcode, out) = self.call("merge-base", ref_a, ref_b,
+                                       raises=False)
+            if retcode == 0:
+                return out.strip()
+            if not self.is_shallow():
+                return None
+            ui.debug("Fetching", deepen, "more commits to find merge-base of",
+                     ref_a, "and", ref_b)
+            (retcode, out) = self.fetch("--quiet", "--deepen=%i" % deepen,
+                                        raises=False)
+            if retcode != 0:
+                ui.error("Could not fetch more history\n" + out)
+                return None
+            deepen *= 2
 
     def get_ref_sha1(self, ref):
         """Return the sha1 from a ref. None if not found."""
@@ -26,7 +26,12 @@ class Manifest(object):
         self.repos = list()
         self.remotes = list()
         self.default_branch = None
+        # Default depth and filter of the clones, see RepoConfig
+        self.clone_depth = None
+        self.clone_filter = None
         self.groups = qisrc.groups.Groups()
+        self._repos_by_project = dict()
+        self._remotes_by_name = dict()
         self.load()
 
     # pylint: disable-msg=E0213
@@ -45,20 +50,32 @@ class Manifest(object):
 
     def load(self):
         """ (re)-parse the xml configuration file """
-        project_names = list()
         self.repos = list()
         self.remotes = list()
+        self.clone_depth = None
+        self.clone_filter = None
         self.groups = qisrc.groups.Groups()
         root = qisys.qixml.read(self.manifest_xml).getroot()
         parser = ManifestParser(self)
         parser.parse(root)
+        self._resolve()
 
+    def _resolve(self):
+        """ Check the configuration, and compute the remotes of every
+        repo from the ``remotes`` of the manifest.
+
+        Called after the xml file has been parsed
+
+        """
+        project_names = set()
         for repo in self.repos:
             if repo.project in project_names:
                 raise ManifestError("%s found twice" % repo.project)
-            project_names.append(repo.project)
+            project_names.add(repo.project)
 
+        self._remotes_by_name = dict()
         for remote in self.remotes:
+            self._remotes_by_name.setdefault(remote.name, remote)
             if remote.review and not self.review:
                 continue
             remote.parse_url()
@@ -75,6 +92,7 @@ Only one remote can be configured with review="true", found {0}
             raise ManifestError(mess)
 
         srcs = dict()
+        self._repos_by_project = dict()
         for repo in self.repos:
             if repo.src in srcs:
                 mess = """ \
@@ -87,7 +105,13 @@ Found two projects sharing the same sources:
             for remote_name in repo.remote_names:
                 self.set_remote(repo, remote_name)
 
+            if repo.depth is None:
+                repo.depth = self.clone_depth
+            if repo.filter is None:
+                repo.filter = self.clone_filter
+
             srcs[repo.src] = repo
+            self._repos_by_project[repo.project] = repo
 
     def set_remote(self, repo, remote_name):
         """ Set the remote of a repo from the list.
@@ -147,15 +171,11 @@ No such project: {1}
 
     def get_repo(self, project):
         """ Get a repository given the project name (foo/bar.git) """
-        for repo in self.repos:
-            if repo.project == project:
-                return repo
+        return self._repos_by_project.get(project)
 
     def get_remote(self, name):
         """ Get a remote given the name """
-        for remote in self.remotes:
-            if remote.name == name:
-                return remote
+        return self._remotes_by_name.get(name)
 
     # Following methods are mainly use for testing,
     # but could be useful for other use cases anyway
@@ -220,6 +240,12 @@ class RepoConfig(object):
         self.default_remote_name = None
         self.remotes = list()
         self.remote_names = None
+        # Number of commits to fetch when cloning, None or 0 for
+        # the whole history
+        self.depth = None
+        # Passed to git fetch --filter when cloning, for instance
+        # 'blob:none'
+        self.filter = None
 
     @property
     def review_remote(self):
@@ -269,6 +295,10 @@ class ManifestParser(qisys.qixml.XMLParser):
     def _parse_branch(self, elem):
         self.target.default_branch = elem.get("default")
 
+    def _parse_clone(self, elem):
+        self.target.clone_depth = parse_depth(elem)
+        self.target.clone_filter = elem.get("filter")
+
     def _parse_repo(self, elem):
         repo_config = RepoConfig()
         parser = RepoConfigParser(repo_config)
@@ -288,6 +318,20 @@ class ManifestParser(qisys.qixml.XMLParser):
     def _write_branch(self, elem):
         elem.set("default", self.target.default_branch)
 
+    def _write_clone_depth(self, elem):
+        if self.target.clone_depth is None and self.target.clone_filter is None:
+            return
+        clone_elem = qisys.qixml.etree.Element("clone")
+        if self.target.clone_depth is not None:
+            clone_elem.set("depth", str(self.target.clone_depth))
+        if self.target.clone_filter is not None:
+            clone_elem.set("filter", self.target.clone_filter)
+        elem.append(clone_elem)
+
+    def _write_clone_filter(self, elem):
+        # Written by _write_clone_depth
+        pass
+
     def _write_repos(self, elem):
         for repo_config in self.target.repos:
             parser = RepoConfigParser(repo_config)
@@ -337,6 +381,8 @@ class RepoConfigParser(qisys.qixml.XMLParser):
         self.target.default_remote_name = self._root.get("default_remote")
         if not self.target.default_remote_name:
             self.target.default_remote_name = remote_names[0]
+        self.target.depth = parse_depth(self._root)
+        self.target.filter = self._root.get("filter")
 
         for upstream_elem in self._root.findall("upstream"):
             name = qisys.qixml.parse_required_attr(upstream_elem, "name")
@@ -354,3 +400,16 @@ class RepoConfigParser(qisys.qixml.XMLParser):
     def _write_default_branch(self, elem):
         elem.set("branch", self.target.default_branch)
 
+def parse_depth(elem):
+    """ Parse the 'depth' attribute of a 'clone' or a 'repo' node """
+    depth = elem.get("depth")
+    if depth is None:
+        return None
+    try:
+        res = int(depth)
+    except ValueError:
+        res = -1
+    if res < 0:
+        raise ManifestError("Invalid depth: '%s' (should be a positive integer)"
+                            % depth)
+    return res
@@ -0,0 +1,241 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" A cache of bare mirrors of the remote repositories, shared by all
+the worktrees of the machine
+
+The git projects borrow objects from the mirrors through
+``.git/objects/info/alternates`` (like ``git clone --reference``), so
+that the objects are downloaded and stored only once.
+
+Since the projects need the objects of the mirrors, nothing is ever
+pruned from a mirror. A project moved or copied elsewhere still borrows
+objects from its mirror without being listed as one of its users, so
+:py:meth:`MirrorCache.gc` only removes the mirrors having no known user
+left when asked to.
+
+Several processes may use the same mirror at once: creating, updating
+or removing a mirror, and changing its list of users, is done while
+holding a lock on the ``<mirror>.lock`` file next to it.
+
+"""
+
+import contextlib
+import hashlib
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from qisys import ui
+import qisys.sh
+import qisrc.git
+
+# Set this environment variable to use an other directory
+# than ~/.cache/qi/git-mirrors
+MIRRORS_DIR_ENV_VAR = "QISRC_MIRRORS_DIR"
+
+USERS_FILE = "qisrc-users"
+
+
+def get_mirrors_root():
+    """ The directory containing the mirrors """
+    res = os.environ.get(MIRRORS_DIR_ENV_VAR)
+    if res:
+        return res
+    return qisys.sh.get_cache_path("qi", "git-mirrors")
+
+
+class MirrorCache(object):
+    """ Create, update and track the users of the mirrors.
+
+    Each mirror is updated at most once during the lifetime of the
+    instance, even if it is used by several threads.
+
+    """
+    def __init__(self, root=None):
+        if root is None:
+            root = get_mirrors_root()
+        self.root = root
+        self._lock = threading.Lock()
+        self._path_locks = dict()
+        self._updated = dict()
+
+    def get_path(self, url):
+        """ Path to the mirror of the given url """
+        name = url.rstrip("/").split("/")[-1].split(":")[-1]
+        if name.endswith(".git"):
+            name = name[:-4]
+        digest = hashlib.sha1(url).hexdigest()[:12]
+        return os.path.join(self.root, "%s-%s.git" % (name, digest))
+
+    def update(self, url):
+        """ Create or refresh the mirror of the given url
+
+        :returns: the path to the mirror, or None if it could not
+                  be updated
+
+        """
+        with self._locked(self.get_path(url)):
+            return self._update_once(url)
+
+    def borrow(self, url, repo_path):
+        """ Update the mirror of the given url, and make the git
+        repository in ``repo_path`` use its objects.
+
+        :returns: a boolean telling if the mirror can be used
+
+        """
+        # The mirror must not be removed before repo_path is listed
+        # as one of its users
+        with self._locked(self.get_path(url)):
+            mirror_path = self._update_once(url)
+            if not mirror_path:
+                return False
+            info_dir = os.path.join(repo_path, ".git", "objects", "info")
+            if not os.path.isdir(os.path.dirname(info_dir)):
+                # Not a regular git repository
+                return False
+            qisys.sh.mkdir(info_dir)
+            mirror_objects = os.path.join(mirror_path, "objects")
+            alternates = read_alternates(repo_path)
+            if mirror_objects not in alternates:
+                with open(os.path.join(info_dir, "alternates"), "a") as fp:
+                    fp.write(mirror_objects + "\n")
+            users = read_users(mirror_path)
+            repo_path = os.path.abspath(repo_path)
+            if repo_path not in users:
+                write_users(mirror_path, users + [repo_path])
+        return True
+
+    def get_mirrors(self):
+        """ Return a list of (path, url, users) for each mirror """
+        res = list()
+        if not os.path.isdir(self.root):
+            return res
+        for name in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, name)
+            if not name.endswith(".git") or not os.path.isdir(path):
+                continue
+            git = qisrc.git.Git(path)
+            (rc, url) = git.call("config", "remote.origin.url", raises=False)
+            if rc != 0:
+                url = None
+            res.append((path, url, read_users(path)))
+        return res
+
+    def gc(self, dry_run=False, force=False):
+        """ Forget about the users that no longer borrow objects from
+        a mirror, and find the mirrors having no user left.
+
+        The unused mirrors are only removed when ``force`` is True:
+        moved or copied projects may still need their objects.
+
+        :returns: the list of the unused mirrors
+
+        """
+        unused = list()
+        for (path, _, _) in self.get_mirrors():
+            with self._locked(path):
+                users = read_users(path)
+                objects = os.path.join(path, "objects")
+                alive = [x for x in users if objects in read_alternates(x)]
+                if alive != users and not dry_run:
+                    write_users(path, alive)
+                if alive:
+                    continue
+                unused.append(path)
+                if force and not dry_run:
+                    qisys.sh.rm(path)
+        return unused
+
+    @contextlib.contextmanager
+    def _locked(self, path):
+        """ Lock the mirror in ``path``, against the other threads
+        and the other processes
+
+        """
+        with self._lock:
+            path_lock = self._path_locks.setdefault(path, threading.Lock())
+        with path_lock:
+            # The lock file is never removed: a process waiting for it
+            # would then lock a file no one else can see
+            qisys.sh.mkdir(os.path.dirname(path), recursive=True)
+            with open(path + ".lock", "a") as fp:
+                if fcntl:
+                    fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+
+    def _update_once(self, url):
+        """ Update the mirror if it was not done yet.
+        Must be called with the mirror locked
+
+        """
+        if url not in self._updated:
+            self._updated[url] = self._update(url)
+        if self._updated[url]:
+            return self.get_path(url)
+
+    def _update(self, url):
+        path = self.get_path(url)
+        git = qisrc.git.Git(path)
+        if os.path.isdir(os.path.join(path, "objects")):
+            ui.debug("Updating mirror", path)
+            (rc, out) = git.fetch("--quiet", "--prune", "origin", raises=False)
+            if rc != 0:
+                ui.warning("Could not update mirror of", url, "\n", out)
+            # Even if the update failed, the objects already in the mirror
+            # can still be used
+            return True
+        ui.debug("Creating mirror", path)
+        qisys.sh.mkdir(path, recursive=True)
+        with git.transaction() as transaction:
+            git.call("init", "--bare", "--quiet")
+            git.call("config", "remote.origin.url", url)
+            git.call("config", "--add", "remote.origin.fetch",
+                     "+refs/heads/*:refs/heads/*")
+            git.call("config", "--add", "remote.origin.fetch",
+                     "+refs/tags/*:refs/tags/*")
+            # Never remove objects the users may need
+            git.call("config", "gc.auto", "0")
+            git.fetch("--quiet", "origin")
+        if not transaction.ok:
+            ui.warning("Could not create mirror of", url, "\n",
+                       transaction.output)
+            if not read_users(path):
+                qisys.sh.rm(path)
+            return False
+        return True
+
+
+def read_alternates(repo_path):
+    """ The list of object directories used by the given git repository """
+    alternates = os.path.join(repo_path, ".git", "objects", "info", "alternates")
+    if not os.path.exists(alternates):
+        return list()
+    with open(alternates, "r") as fp:
+        return [x.strip() for x in fp.readlines() if x.strip()]
+
+
+def read_users(mirror_path):
+    """ The paths of the git repositories using the given mirror """
+    users_file = os.path.join(mirror_path, USERS_FILE)
+    if not os.path.exists(users_file):
+        return list()
+    with open(users_file, "r") as fp:
+        return [x.strip() for x in fp.readlines() if x.strip()]
+
+
+def write_users(mirror_path, users):
+    users_file = os.path.join(mirror_path, USERS_FILE)
+    with open(users_file, "w") as fp:
+        for user in users:
+            fp.write(user + "\n")
@@ -24,6 +24,17 @@ def groups_parser(parser):
     parser.add_argument("-g", "--group", dest="groups", action="append",
                         help="Specify a group of projects.")
 
+def clone_parser(parser):
+    """Parsers settings for new clones."""
+    parser.add_argument("--depth", type=int,
+                        help="Only fetch the last DEPTH commits when cloning. "
+                             "Overrides the setting of the manifest. "
+                             "Use 0 to fetch the whole history")
+    parser.add_argument("--filter", dest="clone_filter", metavar="FILTER_SPEC",
+                        help="Passed to git fetch --filter when cloning "
+                             "(for instance blob:none). "
+                             "Overrides the setting of the manifest")
+
 def get_git_worktree(args):
     """ Get a git worktree to use
 
@@ -161,6 +161,7 @@ class GitProject(object):
         if not branch:
             return None, "No branch given, and no branch configured by default"
 
+        self.borrow_from_mirror()
         rc, out = git.fetch(raises=False)
         if rc != 0:
             return False, "fetch failed\n" + out
@@ -186,6 +187,7 @@ class GitProject(object):
         if not branch:
             return None, "No branch given, and no branch configured by default"
 
+        self.borrow_from_mirror()
         rc, out = git.fetch(raises=False)
         if rc != 0:
             return False, "fetch failed\n" + out
@@ -201,6 +203,17 @@ class GitProject(object):
 
         return True, ""
 
+    def borrow_from_mirror(self):
+        """ If the worktree uses mirrors, refresh the mirror of the
+        default remote, and use its objects, so that the next fetch
+        only downloads what is not in the mirror
+
+        """
+        mirror_cache = self.git_worktree.mirror_cache
+        if not mirror_cache or not self.default_remote:
+            return
+        mirror_cache.borrow(self.clone_url, self.path)
+
     def apply_config(self):
         """ Apply configuration to the underlying git
         repository
@@ -4,22 +4,80 @@
 
 """A set of function to know the status of a git repository."""
 
+import os
+
 import qisrc.git
 from qisys import ui
 
 def stat_tracking_remote(git, branch, tracking):
     """Check if branch is ahead and / or behind tracking."""
-    behind = 0
-    ahead = 0
-    (ret, out) = git.call("rev-list", "--left-right",
-                          "%s..%s" % (tracking, branch), raises=False)
-    if ret == 0:
-        ahead = len(out.split())
-    (ret, out) = git.call("rev-list", "--left-right",
-                          "%s..%s" % (branch, tracking), raises=False)
-    if ret == 0:
-        behind = len(out.split())
-    return (ahead, behind)
+    (ret, out) = git.call("rev-list", "--left-right", "--count",
+                          "%s...%s" % (branch, tracking), raises=False)
+    if ret != 0:
+        return (0, 0)
+    (ahead, behind) = out.split()
+    return (int(ahead), int(behind))
+
+class GitStatus():
+    """The output of ``git status --porcelain=v2 --branch``."""
+    def __init__(self):
+        self.branch   = None
+        self.upstream = None
+        self.ahead    = 0
+        self.behind   = 0
+        # Changes, in the format of ``git status --porcelain``
+        self.lines    = list()
+
+    @property
+    def clean(self):
+        """Tell if there is no change at all."""
+        return not self.lines
+
+def parse_status(out):
+    """Parse the output of ``git status --porcelain=v2 --branch``."""
+    res = GitStatus()
+    for line in out.splitlines():
+        if line.startswith("# branch.head "):
+            head = line[len("# branch.head "):]
+            if head != "(detached)":
+                res.branch = head
+        elif line.startswith("# branch.upstream "):
+            res.upstream = line[len("# branch.upstream "):]
+        elif line.startswith("# branch.ab "):
+            (ahead, behind) = line[len("# branch.ab "):].split()
+            res.ahead = int(ahead)
+            res.behind = -int(behind)
+        elif line.startswith("1 "):
+            fields = line.split(" ", 8)
+            res.lines.append(_short_status(fields[1], fields[8]))
+        elif line.startswith("2 "):
+            fields = line.split(" ", 9)
+            (path, orig_path) = fields[9].split("\t", 1)
+            res.lines.append(_short_status(fields[1],
+                                           "%s -> %s" % (orig_path, path)))
+        elif line.startswith("u "):
+            fields = line.split(" ", 10)
+            res.lines.append(_short_status(fields[1], fields[10]))
+        elif line.startswith("? "):
+            res.lines.append("?? " + line[2:])
+    return res
+
+def _short_status(xy, path):
+    return "%s %s" % (xy.replace(".", " "), path)
+
+def get_git_status(git, untracked):
+    """Run ``git status`` once to get the branch, its upstream,
+    how far they are from each other, and the changes.
+    Return None if it failed.
+
+    """
+    args = ["status", "--porcelain=v2", "--branch"]
+    if not untracked:
+        args.append("--untracked-files=no")
+    (ret, out) = git.call(*args, raises=False)
+    if ret != 0:
+        return None
+    return parse_status(out)
 
 class ProjectState():
     """A class which represent a project and is cleanlyness."""
@@ -54,13 +112,17 @@ def check_state(project, untracked):
 
     git = qisrc.git.Git(project.path)
 
-    if not git.is_valid():
+    if not os.path.isdir(project.path):
+        state_project.valid = False
+        return state_project
+    git_status = get_git_status(git, untracked)
+    if git_status is None:
         state_project.valid = False
         return state_project
 
-    state_project.clean = git.is_clean(untracked = untracked)
-    state_project.current_branch = git.get_current_branch()
-    state_project.tracking = git.get_tracking_branch()
+    state_project.clean = git_status.clean
+    state_project.current_branch = git_status.branch
+    state_project.tracking = git_status.upstream
     if project.default_remote and project.default_branch:
         state_project.manifest_branch = "%s/%s" % (project.default_remote.name, project.default_branch.name)
     #clean worktree, but is the current branch sync with the remote one?
@@ -73,18 +135,15 @@ def check_state(project, untracked):
             if state_project.current_branch != project.default_branch.name:
                 state_project.incorrect_proj = True
 
-        (state_project.ahead, state_project.behind) = stat_tracking_remote(git,
-                state_project.current_branch, state_project.tracking)
+        state_project.ahead = git_status.ahead
+        state_project.behind = git_status.behind
         if state_project.incorrect_proj:
             (state_project.ahead_manifest, state_project.behind_manifest) = stat_tracking_remote(
                 git, state_project.current_branch, "%s/%s" % (
                 project.default_remote.name, project.default_branch.name))
 
     if not state_project.sync_and_clean:
-        out = git.get_status(untracked)
-        if out is not None:
-            state_project.status = [ x for x in out.splitlines() if
-                    len(x.strip()) > 0 ]
+        state_project.status = git_status.lines
 
     return state_project
 
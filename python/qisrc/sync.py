@@ -6,9 +6,11 @@
 
 """
 
+import copy
 import os
 
 from qisys import ui
+import qisys.parallel
 import qisys.qixml
 import qisrc.git
 import qisrc.manifest
@@ -32,20 +34,26 @@ class WorkTreeSyncer(object):
         parser.parse(root)
         self.old_repos = list()
         self.new_repos = list()
+        # (key, qisrc.manifest.Manifest) for the last manifest read
+        # from the manifest repo, see read_remote_manifest
+        self._manifest_cache = (None, None)
 
-    def sync(self):
+    def sync(self, num_jobs=1, depth=None, clone_filter=None):
         """" Synchronize with a remote manifest:
-        * clone missing repos
+        * clone missing repos, ``num_jobs`` at a time
         * move repos that needs to be moved
         * reconfigure remotes and default branches
         * synchronizes build profiles
+        :param depth: if not None, override the depth of the new clones
+        :param clone_filter: if not None, override the filter of the new clones
         :returns: True in case of success, False otherwise
 
         """
         # backup old repos configuration now, so that
         # we know what to sync
         self.old_repos = self.get_old_repos()
-        return self.sync_repos()
+        return self.sync_repos(num_jobs=num_jobs, depth=depth,
+                               clone_filter=clone_filter)
 
     @property
     def manifest_xml(self):
@@ -71,7 +79,7 @@ class WorkTreeSyncer(object):
             git.commit("-m", "initial commit")
         return res
 
-    def sync_repos(self):
+    def sync_repos(self, num_jobs=1, depth=None, clone_filter=None):
         """ Update every manifest, inspect changes, and updates the
         git worktree accordingly
 
@@ -88,7 +96,13 @@ class WorkTreeSyncer(object):
         self._sync_manifest()
         self._sync_groups()
         self.new_repos = self.read_remote_manifest()
-        res = self._sync_repos(self.old_repos, self.new_repos)
+        for repo in self.new_repos:
+            if depth is not None:
+                repo.depth = depth
+            if clone_filter is not None:
+                repo.filter = clone_filter
+        res = self._sync_repos(self.old_repos, self.new_repos,
+                               num_jobs=num_jobs)
         # re-read self.old_repos so we can do several syncs:
         self.old_repos = self.get_old_repos()
         # if everything went well, save the manifests configurations:
@@ -131,10 +145,14 @@ class WorkTreeSyncer(object):
         xml = parser.xml_elem()
         qisys.qixml.write(xml, self.manifest_xml)
 
-    def configure_manifest(self, url, branch="master", groups=None, ref=None, review=True):
+    def configure_manifest(self, url, branch="master", groups=None, ref=None, review=True,
+                           num_jobs=1, mirror=None, depth=None, clone_filter=None):
         """ Add a manifest to the list. Will be stored in
         .qi/manifests/<name>
 
+        :param mirror: whether to use the shared mirrors. If None, keep
+                       the current setting
+
         """
         self.old_repos = self.get_old_repos()
         self.manifest.url = url
@@ -142,7 +160,10 @@ class WorkTreeSyncer(object):
         self.manifest.branch = branch
         self.manifest.ref = ref
         self.manifest.review = review
-        res = self.sync_repos()
+        if mirror is not None:
+            self.manifest.mirror = mirror
+        res = self.sync_repos(num_jobs=num_jobs, depth=depth,
+                              clone_filter=clone_filter)
         self.configure_projects()
         return res
 
@@ -150,10 +171,17 @@ class WorkTreeSyncer(object):
         """ Read the manifest file in .qi/manifests/<name>/manifest.xml
         using the settings in .qi/manifest.xml (to know the name and the groups
         to use)
+
+        The manifest of the manifest repo is only parsed again when its
+        HEAD or its manifest.xml changed. The repos returned are copies,
+        so they can be changed by the caller.
+
         """
-        if not manifest_xml:
-            manifest_xml = os.path.join(self.manifest_repo, "manifest.xml")
-        remote_manifest = qisrc.manifest.Manifest(manifest_xml, review=self.manifest.review)
+        if manifest_xml:
+            remote_manifest = qisrc.manifest.Manifest(manifest_xml,
+                                                      review=self.manifest.review)
+        else:
+            remote_manifest = self._read_manifest_repo()
         groups = self.manifest.groups
         # if self.manifest.groups is empty but there is a default
         # group in the manifest, we need to set self.manifest.groups
@@ -164,7 +192,32 @@ class WorkTreeSyncer(object):
             if default_group:
                 self.manifest.groups = [default_group.name]
         repos = remote_manifest.get_repos(groups=groups)
-        return repos
+        if manifest_xml:
+            return repos
+        return [copy_repo(x) for x in repos]
+
+    def _read_manifest_repo(self):
+        """ Parse the manifest.xml of the manifest repo, or re-use the
+        result of the previous call
+
+        """
+        manifest_repo = self.manifest_repo
+        manifest_xml = os.path.join(manifest_repo, "manifest.xml")
+        git = qisrc.git.Git(manifest_repo)
+        (rc, head) = git.call("rev-parse", "--verify", "--quiet", "HEAD",
+                              raises=False)
+        if rc != 0:
+            head = None
+        # Also check the file itself, in case it was changed
+        # without being committed
+        stat = os.stat(manifest_xml)
+        key = (head, stat.st_mtime, stat.st_size, self.manifest.review)
+        (cached_key, cached_manifest) = self._manifest_cache
+        if head and key == cached_key:
+            return cached_manifest
+        res = qisrc.manifest.Manifest(manifest_xml, review=self.manifest.review)
+        self._manifest_cache = (key, res)
+        return res
 
     def get_old_repos(self):
         """ Backup all repos configuration before any synchronisation
@@ -173,12 +226,14 @@ class WorkTreeSyncer(object):
         """
         old_repos = list()
         old_repos_expected = self.read_remote_manifest()
+        projects_by_url = self.git_worktree.get_projects_by_url()
         # The git projects may not match the previous repo config,
         # for instance the user removed a project by accident, or
         # a rename failed, or the project has not been cloned yet,
         # so make sure old_repos matches the worktree state:
         for old_repo in old_repos_expected:
-            old_project = self.git_worktree.find_repo(old_repo)
+            old_project = self.git_worktree.find_repo(old_repo,
+                                                      projects_by_url=projects_by_url)
             if old_project:
                 old_repo.src = old_project.src
                 old_repos.append(old_repo)
@@ -200,8 +255,13 @@ class WorkTreeSyncer(object):
         if not transaction.ok:
             raise Exception("Update failed\n" + transaction.output)
 
-    def _sync_repos(self, old_repos, new_repos):
-        """ Sync the remote repo configurations with the git worktree """
+    def _sync_repos(self, old_repos, new_repos, num_jobs=1):
+        """ Sync the remote repo configurations with the git worktree
+
+        New repos are cloned ``num_jobs`` at a time, and configured
+        as soon as their clone is done.
+
+        """
         res = True
         ##
         # 1/ create, remove or move the git projects:
@@ -241,23 +301,17 @@ class WorkTreeSyncer(object):
         if to_add:
             ui.info(ui.green, ":: Cloning new repositories ...")
 
-        for i, repo in enumerate(to_add):
+        # Results are displayed in the order of the manifest
+        results = qisys.parallel.imap_ordered(self._clone_repo, to_add,
+                                              num_jobs=num_jobs)
+        for i, (repo, ok) in enumerate(results):
             ui.info_count(i, len(to_add),
                     ui.blue, repo.project,
                     ui.green, "->",
                     ui.blue, repo.src,
                     ui.white, "(%s)" % repo.default_branch)
-            project = self.git_worktree.get_git_project(repo.src)
-            if project:  # Repo is already there, re-apply config
-                project.read_remote_config(repo)
-                project.apply_config()
-                continue
-            if not self.git_worktree.clone_missing(repo):
+            if not ok:
                 res = False
-            else:
-                project = self.git_worktree.get_git_project(repo.src)
-                project.read_remote_config(repo)
-                project.apply_config()
 
         if to_move:
             ui.info(ui.green, ":: Moving repositories ...")
@@ -267,6 +321,24 @@ class WorkTreeSyncer(object):
 
         return res
 
+    def _clone_repo(self, repo):
+        """ Clone a new repo if it is not there yet, then configure it.
+        May be called from several threads at once.
+        :returns: a boolean telling if the clone succeeded
+
+        """
+        project = self.git_worktree.get_git_project(repo.src)
+        if not project:
+            if not self.git_worktree.clone_missing(repo):
+                return False
+            project = self.git_worktree.get_git_project(repo.src)
+        project.read_remote_config(repo)
+        project.apply_config()
+        # Save the config now, so that it is not lost when the git
+        # projects are re-loaded after an other clone
+        self.git_worktree.save_project_config(project)
+        return True
+
     def _sync_groups(self):
         """ Synchronize the repsitories groups read from the given manifest """
         remote_xml = os.path.join(self.manifest_repo, "manifest.xml")
@@ -306,6 +378,8 @@ class LocalManifest(object):
         self.ref = None # used for snaphots or in case you
                         # don't want the head of a branch
         self.review = True
+        # Borrow objects from the shared mirrors, see qisrc.mirror
+        self.mirror = False
 
     @property
     def groups(self):
@@ -331,6 +405,12 @@ class LocalManifest(object):
 
 
 
+def copy_repo(repo):
+    """ Copy a repo config and its remotes """
+    res = copy.copy(repo)
+    res.remotes = [copy.copy(x) for x in repo.remotes]
+    return res
+
 def compute_repo_diff(old_repos, new_repos):
     """ Compute the work that needs to be done
 
@@ -342,41 +422,43 @@ def compute_repo_diff(old_repos, new_repos):
     to_rm = list()
     to_update = list()
 
+    # Index the old repos by url and the new repos by src, keeping the
+    # first one in case of duplicates, so that the diff is linear in
+    # the number of repos
+    old_repos_by_url = dict()
+    for (index, old_repo) in enumerate(old_repos):
+        for url in old_repo.urls:
+            old_repos_by_url.setdefault(url, index)
+    new_repos_by_src = dict()
+    for new_repo in new_repos:
+        new_repos_by_src.setdefault(new_repo.src, new_repo)
+
     for new_repo in new_repos:
-        for old_repo in old_repos:
-            common_url = find_common_url(old_repo, new_repo)
-            if common_url:
-                if new_repo.src == old_repo.src:
-                    pass # nothing to do
-                else:
-                    to_move.append((old_repo, new_repo.src))
-                break
+        # The first old repo having an url in common with the new one
+        indexes = [old_repos_by_url[x] for x in new_repo.urls
+                   if x in old_repos_by_url]
+        if indexes:
+            old_repo = old_repos[min(indexes)]
+            if new_repo.src != old_repo.src:
+                to_move.append((old_repo, new_repo.src))
         else:
             # actually we are adding repos that
             # only changed remotes, because we did not
             #commpute to_update yet
             to_add.append(new_repo)
 
+    moved = set(x[0] for x in to_move)
     for old_repo in old_repos:
-        for new_repo in new_repos:
-            if old_repo.src == new_repo.src:
-                if new_repo.remotes == old_repo.remotes:
-                    if new_repo.default_branch == old_repo.default_branch:
-                        pass
-                    else:
-                        to_update.append((old_repo, new_repo))
-                else:
-                    to_update.append((old_repo, new_repo))
-                break
-        else:
-            if not old_repo in [x[0] for x in to_move]:
-                to_rm.append(old_repo)
+        new_repo = new_repos_by_src.get(old_repo.src)
+        if new_repo:
+            if new_repo.remotes != old_repo.remotes or \
+               new_repo.default_branch != old_repo.default_branch:
+                to_update.append((old_repo, new_repo))
+        elif old_repo not in moved:
+            to_rm.append(old_repo)
 
-    really_to_add = list()
-    for repo in to_add:
-        if repo.src not in [x[0].src for x in to_update]:
-            really_to_add.append(repo)
-    to_add = really_to_add
+    updated_srcs = set(x[0].src for x in to_update)
+    to_add = [x for x in to_add if x.src not in updated_srcs]
 
     # sort everything by 'src':
     for repo_list in [to_add, to_rm]:
@@ -386,12 +468,6 @@ def compute_repo_diff(old_repos, new_repos):
 
     return (to_add, to_move, to_rm, to_update)
 
-def find_common_url(repo_a, repo_b):
-    for url_a in repo_a.urls:
-        for url_b in repo_b.urls:
-            if url_a == url_b:
-                return url_b
-
 def compute_profile_updates(local_profiles, remote_profiles):
     """ Compare a local set of profiles with a remote set.
 
@@ -0,0 +1,139 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+import qisrc.code_index
+from qisrc.test.conftest import TestGit
+
+def test_required_literals():
+    def check(pattern, expected):
+        assert qisrc.code_index.required_literals(pattern) == expected
+    check("spam", [["spam"]])
+    check("Spam_Eggs", [["spam_eggs"]])
+    check("foo.*bar", [["foo", "bar"]])
+    check("foo\\.bar", [["foo.bar"]])
+    check("spams?", [["spam"]])
+    check("spam+eggs", [["spam", "eggs"]])
+    check("spam[0-9]eggs", [["spam", "eggs"]])
+    check("spam[]a]eggs", [["spam", "eggs"]])
+    check("spam|eggs", [["spam"], ["eggs"]])
+    check("spam\\|eggs", [["spam"], ["eggs"]])
+    check("spam(eggs|bacon)", [["spam"]])
+    check("spam\\(eggs\\|bacon\\)", [["spam"]])
+    check("\\bspam\\w+", [["spam"]])
+    check("spam{2,3}", [["spa"]])
+    check("spam|a.b", None)
+    check("ab", None)
+    check("(spam", None)
+    check("[spam", None)
+    check("\\x41BCD", None)
+    check("(spam)\\1", None)
+    # Each line is a separate branch
+    check("abc\nzzz", [["abc"], ["zzz"]])
+    check("spam\nab", None)
+    # Perl inline options change the meaning of the pattern
+    check("(?x)abc def", None)
+    check("abc(?i)def", None)
+    check("spam(?:eggs|bacon)", [["spam"]])
+
+def test_parse_git_grep_opts():
+    parse = qisrc.code_index.parse_git_grep_opts
+    query = parse(["-n", "spam"])
+    assert query.options == ["-n", "spam"]
+    assert query.branches == [["spam"]]
+    assert not query.pathspecs
+    query = parse(["-niC2", "spam", "--", "*.py"])
+    assert query.options == ["-niC2", "spam"]
+    assert query.pathspecs == ["*.py"]
+    query = parse(["-A", "3", "-e", "spam", "-ie", "eggs", "--max-count=2"])
+    assert query.options == ["-A", "3", "-e", "spam", "-ie", "eggs",
+                             "--max-count=2"]
+    assert query.branches == [["spam"], ["eggs"]]
+    query = parse(["-F", "a.b*c"])
+    assert query.branches == [["a.b*c"]]
+    query = parse(["--max-depth", "2", "spam"])
+    assert query.branches == [["spam"]]
+    assert parse(["-v", "spam"]) is None
+    assert parse(["-nv", "spam"]) is None
+    assert parse(["-e", "spam", "--not", "-e", "eggs"]) is None
+    assert parse(["spam", "HEAD~1"]) is None
+    assert parse(["-n"]) is None
+    assert parse(["a.b"]) is None
+    assert parse(["-L", "spam"]) is None
+    assert parse(["-nL", "spam"]) is None
+    assert parse(["--files-without-match", "spam"]) is None
+    assert parse(["--file", "patterns.txt"]) is None
+    assert parse(["--file=patterns.txt"]) is None
+    query = parse(["--regexp", "spam", "--regexp=eggs"])
+    assert query.options == ["--regexp", "spam", "--regexp=eggs"]
+    assert query.branches == [["spam"], ["eggs"]]
+    assert parse(["-F", "ab"]) is None
+    assert parse(["-F", "-i", "caf\xc3\xa9"]) is None
+    assert parse(["-P", "(?x)abc def"]) is None
+
+def create_repo(tmpdir, files):
+    repo = tmpdir.mkdir("repo")
+    git = TestGit(repo.strpath)
+    git.initialize()
+    for (name, contents) in files.iteritems():
+        git.commit_file(name, contents)
+    return (repo, git)
+
+def test_search(tmpdir):
+    (repo, _) = create_repo(tmpdir, {
+        "a.txt": "this is spam\n",
+        "b.txt": "this is eggs\n",
+        "c.bin": "spam\0eggs\n",
+    })
+    code_index = qisrc.code_index.CodeIndex(tmpdir.join("index").strpath)
+    files = qisrc.code_index.list_files(repo.strpath)
+    assert code_index.update(repo.strpath, files=files) == 4
+    assert code_index.update(repo.strpath, files=files) == 0
+
+    def candidates(pattern):
+        query = qisrc.code_index.parse_git_grep_opts([pattern])
+        matching = code_index.search(query)
+        return sorted(code_index.get_candidates(files, matching))
+    # binary files are always searched
+    assert candidates("Spam") == ["a.txt", "c.bin"]
+    assert candidates("is eggs") == ["b.txt", "c.bin"]
+    assert candidates("bacon") == ["c.bin"]
+    assert candidates("spam|eggs") == ["a.txt", "b.txt", "c.bin"]
+    assert candidates("spam\neggs") == ["a.txt", "b.txt", "c.bin"]
+    # A branch without trigrams matches every blob
+    query = qisrc.code_index.GrepQuery()
+    query.branches = [["ab"]]
+    assert sorted(code_index.get_candidates(files, code_index.search(query))) \
+        == [".gitignore", "a.txt", "b.txt", "c.bin"]
+
+    # modified files are always searched
+    repo.join("a.txt").write("bacon\n")
+    files = qisrc.code_index.list_files(repo.strpath)
+    assert candidates("bacon") == ["a.txt", "c.bin"]
+
+def test_save_and_gc(tmpdir):
+    (repo, git) = create_repo(tmpdir, {"a.txt": "spam\n"})
+    index_path = tmpdir.join("index").strpath
+    code_index = qisrc.code_index.CodeIndex(index_path)
+    code_index.update(repo.strpath)
+    code_index.save()
+    code_index = qisrc.code_index.CodeIndex(index_path)
+    assert code_index.num_blobs == 2
+
+    git.commit_file("a.txt", "eggs\n")
+    assert code_index.update(repo.strpath) == 1
+    files = qisrc.code_index.list_files(repo.strpath)
+    assert code_index.gc([x[1] for x in files]) == 1
+    code_index.save()
+    code_index = qisrc.code_index.CodeIndex(index_path)
+    assert code_index.num_blobs == 2
+    query = qisrc.code_index.parse_git_grep_opts(["spam"])
+    assert code_index.get_candidates(files, code_index.search(query)) == []
+    query = qisrc.code_index.parse_git_grep_opts(["eggs"])
+    assert code_index.get_candidates(files, code_index.search(query)) == \
+        ["a.txt"]
+
+def test_corrupted_index(tmpdir):
+    index_path = tmpdir.join("index")
+    index_path.write("not an index")
+    code_index = qisrc.code_index.CodeIndex(index_path.strpath)
+    assert code_index.num_blobs == 0
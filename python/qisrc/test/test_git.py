@@ -85,3 +85,32 @@ def test_safe_checkout(cd_to_tmpdir, git_server):
     ok, mess = git.safe_checkout("devel", "origin")
     assert git.get_current_branch() == "devel"
     assert ok
+
+def test_get_merge_base_deepens_shallow_clones(tmpdir, git_server):
+    git_server.create_repo("foo.git")
+    for i in range(5):
+        git_server.push_file("foo.git", "master.txt", "%i\n" % i)
+    foo_url = "file://" + git_server.srv.join("foo.git").strpath
+    git_server.push_file("foo.git", "devel.txt", "devel\n", branch="devel")
+    work = tmpdir.mkdir("work_foo")
+    git = qisrc.git.Git(work.strpath)
+    git.call("clone", "--quiet", "--depth=1", "--no-single-branch",
+             foo_url, work.strpath)
+    assert git.is_shallow()
+    master_sha1 = git.get_ref_sha1("refs/remotes/origin/master")
+    devel_sha1 = git.get_ref_sha1("refs/remotes/origin/devel")
+    # devel was forked from master, but the fork point was not fetched
+    rc, _ = git.call("merge-base", master_sha1, devel_sha1, raises=False)
+    assert rc != 0
+    assert git.get_merge_base(master_sha1, devel_sha1, deepen=1) == master_sha1
+    assert git.is_ff(master_sha1, devel_sha1)
+    assert not git.is_ff(devel_sha1, master_sha1)
+
+def test_get_merge_base_unrelated(tmpdir):
+    git = TestGit(tmpdir.strpath)
+    git.initialize()
+    master_sha1 = git.get_ref_sha1("refs/heads/master")
+    git.checkout("--quiet", "--orphan", "other")
+    git.commit("--quiet", "--allow-empty", "-m", "unrelated")
+    other_sha1 = git.get_ref_sha1("refs/heads/other")
+    assert git.get_merge_base(master_sha1, other_sha1) is None
@@ -87,6 +87,18 @@ def test_clone_missing_simple(git_worktree, git_server):
     git_worktree.clone_missing(foo_repo)
     assert len(git_worktree.git_projects) == 1
 
+def test_find_repo(git_worktree, git_server):
+    foo_repo = git_server.create_repo("foo.git")
+    bar_repo = git_server.create_repo("bar.git", src="lib/bar")
+    spam_repo = git_server.create_repo("spam.git")
+    git_worktree.configure_manifest(git_server.manifest_url)
+    git_worktree.remove_repo(git_worktree.get_git_project("spam"))
+    projects_by_url = git_worktree.get_projects_by_url()
+    assert git_worktree.find_repo(foo_repo).src == "foo"
+    assert git_worktree.find_repo(bar_repo,
+                                  projects_by_url=projects_by_url).src == "lib/bar"
+    assert git_worktree.find_repo(spam_repo) is None
+
 def test_clone_missing_create_subdirs(git_worktree, git_server):
     foo_repo = git_server.create_repo("foo", src="long/path/to/foo")
     git_worktree.clone_missing(foo_repo)
@@ -306,6 +306,59 @@ def test_default_branch(tmpdir):
     assert foo.default_branch == "tutu"
 
 
+def test_clone_settings(tmpdir):
+    manifest_xml = tmpdir.join("manifest.xml")
+    manifest_xml.write(""" \
+<manifest>
+  <remote name="origin" url="git@example.com" />
+  <clone depth="1" filter="blob:none" />
+  <repo project="foo/bar.git" src="lib/bar" remotes="origin" />
+  <repo project="foo/foo.git" src="lib/foo" remotes="origin" depth="0" />
+  <repo project="foo/baz.git" src="lib/baz" remotes="origin" depth="10"
+        filter="tree:0" />
+</manifest>
+""")
+    manifest = qisrc.manifest.Manifest(manifest_xml.strpath)
+    assert manifest.clone_depth == 1
+    assert manifest.clone_filter == "blob:none"
+    (bar, foo, baz) = manifest.repos
+    assert (bar.depth, bar.filter) == (1, "blob:none")
+    assert (foo.depth, foo.filter) == (0, "blob:none")
+    assert (baz.depth, baz.filter) == (10, "tree:0")
+    manifest.dump()
+    manifest = qisrc.manifest.Manifest(manifest_xml.strpath)
+    assert manifest.clone_depth == 1
+    assert manifest.repos[2].depth == 10
+
+def test_no_clone_settings(tmpdir):
+    manifest_xml = tmpdir.join("manifest.xml")
+    manifest_xml.write(""" \
+<manifest>
+  <remote name="origin" url="git@example.com" />
+  <repo project="foo/bar.git" src="lib/bar" remotes="origin" />
+</manifest>
+""")
+    manifest = qisrc.manifest.Manifest(manifest_xml.strpath)
+    bar = manifest.repos[0]
+    assert bar.depth is None
+    assert bar.filter is None
+    manifest.dump()
+    assert "clone" not in manifest_xml.read()
+
+def test_invalid_depth(tmpdir):
+    manifest_xml = tmpdir.join("manifest.xml")
+    manifest_xml.write(""" \
+<manifest>
+  <remote name="origin" url="git@example.com" />
+  <repo project="foo/bar.git" src="lib/bar" remotes="origin" depth="-2" />
+</manifest>
+""")
+    # pylint: disable-msg=E1101
+    with pytest.raises(qisrc.manifest.ManifestError) as e:
+        qisrc.manifest.Manifest(manifest_xml.strpath)
+    assert "Invalid depth" in str(e.value)
+
+
 def test_multiple_remotes(tmpdir):
     manifest_xml = tmpdir.join("manifest.xml")
     manifest_xml.write(""" \
@@ -0,0 +1,130 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+import fcntl
+import os
+import shutil
+import threading
+import time
+
+import qisys.sh
+import qisrc.git
+import qisrc.mirror
+from qisrc.test.conftest import TestGitWorkTree, TestGit
+
+def test_init_with_mirror(qisrc_action, git_server):
+    git_server.create_repo("foo.git")
+    git_server.push_file("foo.git", "README", "foo\n")
+    qisrc_action("init", git_server.manifest_url, "--mirror")
+    git_worktree = TestGitWorkTree()
+    assert git_worktree.manifest.mirror
+    foo = git_worktree.get_git_project("foo")
+    assert TestGit(foo.path).read_file("README") == "foo\n"
+    mirrors = qisrc.mirror.MirrorCache().get_mirrors()
+    assert len(mirrors) == 1
+    (mirror_path, url, users) = mirrors[0]
+    assert url.endswith("/foo.git")
+    assert users == [foo.path]
+    assert qisrc.mirror.read_alternates(foo.path) == \
+        [os.path.join(mirror_path, "objects")]
+    # Every object comes from the mirror
+    (_, out) = qisrc.git.Git(foo.path).call("count-objects", "-v", raises=False)
+    assert "count: 0" in out.splitlines()
+    assert "in-pack: 0" in out.splitlines()
+
+def test_sync_refreshes_mirror(qisrc_action, git_server):
+    git_server.create_repo("foo.git")
+    qisrc_action("init", git_server.manifest_url, "--mirror")
+    git_server.push_file("foo.git", "README", "new\n")
+    qisrc_action("sync")
+    git_worktree = TestGitWorkTree()
+    foo = git_worktree.get_git_project("foo")
+    foo_git = TestGit(foo.path)
+    assert foo_git.read_file("README") == "new\n"
+    (mirror_path, _, _) = qisrc.mirror.MirrorCache().get_mirrors()[0]
+    mirror_git = qisrc.git.Git(mirror_path)
+    assert mirror_git.get_ref_sha1("refs/heads/master") == \
+           foo_git.get_ref_sha1("refs/heads/master")
+
+def test_no_mirror_by_default(qisrc_action, git_server):
+    git_server.create_repo("foo.git")
+    qisrc_action("init", git_server.manifest_url)
+    foo = TestGitWorkTree().get_git_project("foo")
+    assert not qisrc.mirror.read_alternates(foo.path)
+    assert not qisrc.mirror.MirrorCache().get_mirrors()
+
+def test_unreachable_mirror(git_worktree, tmpdir):
+    mirror_cache = qisrc.mirror.MirrorCache()
+    repo = tmpdir.mkdir("repo")
+    qisrc.git.Git(repo.strpath).init()
+    url = "file://" + tmpdir.join("no-such-repo.git").strpath
+    assert not mirror_cache.borrow(url, repo.strpath)
+    assert not os.path.exists(mirror_cache.get_path(url))
+    assert not qisrc.mirror.read_alternates(repo.strpath)
+
+def test_gc(qisrc_action, git_server, record_messages):
+    git_server.create_repo("foo.git")
+    git_server.create_repo("bar.git")
+    qisrc_action("init", git_server.manifest_url, "--mirror")
+    git_worktree = TestGitWorkTree()
+    bar = git_worktree.get_git_project("bar")
+    qisrc_action("mirror", "gc")
+    assert len(qisrc.mirror.MirrorCache().get_mirrors()) == 2
+
+    qisys.sh.rm(bar.path)
+    qisrc_action("mirror", "gc", "--dry-run")
+    assert record_messages.find("Would remove 1 unused mirror")
+    assert len(qisrc.mirror.MirrorCache().get_mirrors()) == 2
+    qisrc_action("mirror", "gc")
+    assert record_messages.find("Use --force to remove them")
+    assert len(qisrc.mirror.MirrorCache().get_mirrors()) == 2
+    qisrc_action("mirror", "gc", "--force")
+    assert record_messages.find("Removed 1 unused mirror")
+    mirrors = qisrc.mirror.MirrorCache().get_mirrors()
+    assert len(mirrors) == 1
+    assert mirrors[0][1].endswith("/foo.git")
+
+def test_gc_keeps_moved_projects_working(qisrc_action, git_server, tmpdir):
+    git_server.create_repo("foo.git")
+    git_server.push_file("foo.git", "README", "foo\n")
+    qisrc_action("init", git_server.manifest_url, "--mirror")
+    foo = TestGitWorkTree().get_git_project("foo")
+    moved = tmpdir.join("moved").strpath
+    shutil.move(foo.path, moved)
+    qisrc_action("mirror", "gc")
+    mirrors = qisrc.mirror.MirrorCache().get_mirrors()
+    assert len(mirrors) == 1
+    # The old path is forgotten, but the moved project can still
+    # read the objects of the mirror
+    assert mirrors[0][2] == list()
+    assert TestGit(moved).read_file("README") == "foo\n"
+    (rc, _) = qisrc.git.Git(moved).call("fsck", raises=False)
+    assert rc == 0
+
+def test_failed_creation_keeps_users(git_worktree, tmpdir):
+    mirror_cache = qisrc.mirror.MirrorCache()
+    url = "file://" + tmpdir.join("no-such-repo.git").strpath
+    mirror_path = mirror_cache.get_path(url)
+    qisys.sh.mkdir(mirror_path, recursive=True)
+    qisrc.mirror.write_users(mirror_path, ["/path/to/repo"])
+    assert not mirror_cache.update(url)
+    assert os.path.exists(mirror_path)
+
+def test_mirror_lock_is_shared_with_other_processes(git_server, tmpdir):
+    git_server.create_repo("foo.git")
+    foo_url = git_server.get_repo("foo.git").clone_url
+    mirror_cache = qisrc.mirror.MirrorCache()
+    mirror_path = mirror_cache.get_path(foo_url)
+    qisys.sh.mkdir(os.path.dirname(mirror_path), recursive=True)
+    # flock() locks held through other open files conflict, as if
+    # they were held by an other process
+    with open(mirror_path + ".lock", "a") as fp:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+        thread = threading.Thread(target=mirror_cache.update, args=(foo_url,))
+        thread.start()
+        time.sleep(0.5)
+        assert thread.is_alive()
+        assert not os.path.exists(mirror_path)
+        fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+    thread.join()
+    assert os.path.isdir(os.path.join(mirror_path, "objects"))
@@ -1,6 +1,10 @@
 ## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
 ## Use of this source code is governed by a BSD-style license that can be
 ## found in the COPYING file.
+import qisys.command
+
+import pytest
+
 def test_qisrc_foreach(qisrc_action, record_messages):
     worktree = qisrc_action.worktree
     worktree.create_project("not_in_git")
@@ -13,3 +17,35 @@ def test_qisrc_foreach(qisrc_action, record_messages):
     qisrc_action("foreach", "ls", "--all")
     assert record_messages.find("not_in_git")
     assert record_messages.find("git_project")
+
+def test_parallel_failures(qisrc_action, record_messages):
+    git_worktree = qisrc_action.git_worktree
+    for name in ["a", "b", "c"]:
+        git_worktree.create_git_project(name)
+    cmd = ["python", "-c",
+           "import os, sys; sys.exit(os.path.basename(os.getcwd()) != 'b')"]
+    rc = qisrc_action("foreach", "-j", "3", "--continue", "--", *cmd,
+                      retcode=True)
+    assert rc != 0
+    assert record_messages.find("Command failed on the following projects")
+    assert record_messages.find(r"\*\s+a\s*$")
+    assert record_messages.find(r"\*\s+c\s*$")
+    assert not record_messages.find(r"\*\s+b\s*$")
+
+def test_parallel_stops_on_error(qisrc_action):
+    git_worktree = qisrc_action.git_worktree
+    for name in ["a", "b", "c"]:
+        git_worktree.create_git_project(name)
+    # pylint: disable-msg=E1101
+    with pytest.raises(qisys.command.CommandFailedException):
+        qisrc_action("foreach", "-j", "2", "--", "python", "-c",
+                     "import sys; sys.exit(1)")
+
+def test_live(qisrc_action, record_messages):
+    git_worktree = qisrc_action.git_worktree
+    git_worktree.create_git_project("foo")
+    git_worktree.create_git_project("bar")
+    qisrc_action("foreach", "-j", "2", "--live", "--", "python", "-c",
+                 "print('spam')")
+    assert record_messages.find(r"\[foo\].*spam")
+    assert record_messages.find(r"\[bar\].*spam")
@@ -1,7 +1,9 @@
 ## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
 ## Use of this source code is governed by a BSD-style license that can be
 ## found in the COPYING file.
+from qisys import ui
 import qisrc.git
+from qisrc.test.conftest import TestGitWorkTree
 
 import py
 
@@ -49,3 +51,87 @@ def test_worktree_paths(qisrc_action, record_messages):
     setup_projects(qisrc_action)
     rc = qisrc_action("grep", "--path", "worktree",  "--", "-i", "-l", "Spam", retcode=True)
     assert record_messages.find("foo/a.txt")
+
+def test_output_is_in_project_order(qisrc_action, record_messages):
+    names = ["p%i" % i for i in range(6)]
+    for name in names:
+        proj = qisrc_action.create_git_project(name)
+        # pylint: disable-msg=E1101
+        py.path.local(proj.path).join("a.txt").write("spam from %s\n" % name)
+        qisrc.git.Git(proj.path).add("a.txt")
+    record_messages.reset()
+    rc = qisrc_action("grep", "-j", "4", "spam", retcode=True)
+    assert rc == 0
+    out = "".join(ui._MESSAGES)
+    positions = [out.find("spam from %s" % x) for x in names]
+    assert -1 not in positions
+    assert positions == sorted(positions)
+
+def test_max_count(qisrc_action, record_messages):
+    for name in ["a", "b", "c"]:
+        proj = qisrc_action.create_git_project(name)
+        # pylint: disable-msg=E1101
+        proj_path = py.path.local(proj.path)
+        proj_path.join("a.txt").write("spam 1\nspam 2\n")
+        proj_path.join("b.txt").write("spam 3\n")
+        qisrc.git.Git(proj.path).add("a.txt", "b.txt")
+    record_messages.reset()
+    rc = qisrc_action("grep", "--max-count", "4", "spam", retcode=True)
+    assert rc == 0
+    out = "".join(ui._MESSAGES)
+    assert out.count("spam ") == 4
+    assert "c/" not in out
+    assert "Looking in" in out
+
+def test_indexed(qisrc_action, record_messages):
+    setup_projects(qisrc_action)
+    rc = qisrc_action("grep", "--indexed", "spam", retcode=True)
+    assert rc == 0
+    assert record_messages.find("this is spam")
+    record_messages.reset()
+    rc = qisrc_action("grep", "--indexed", "--", "-i", "eggs", retcode=True)
+    assert rc == 1
+    assert not record_messages.find("this is spam")
+
+def test_indexed_sees_new_contents(qisrc_action, record_messages):
+    setup_projects(qisrc_action)
+    qisrc_action("index")
+    git_worktree = TestGitWorkTree()
+    bar = git_worktree.get_git_project("bar")
+    # Not committed yet
+    # pylint: disable-msg=E1101
+    py.path.local(bar.path).join(".gitignore").write("eggs are spam\n")
+    record_messages.reset()
+    rc = qisrc_action("grep", "--indexed", "--path", "worktree", "spam",
+                      retcode=True)
+    assert rc == 0
+    assert record_messages.find("bar/.gitignore:eggs are spam")
+    assert record_messages.find("foo/a.txt:this is spam")
+
+def test_indexed_with_pathspecs(qisrc_action, record_messages):
+    setup_projects(qisrc_action)
+    rc = qisrc_action("grep", "--indexed", "--", "spam", "--", "*.py",
+                      retcode=True)
+    assert rc == 1
+    rc = qisrc_action("grep", "--indexed", "--", "spam", "--", "*.txt",
+                      retcode=True)
+    assert rc == 0
+
+def test_indexed_unsupported_options(qisrc_action, record_messages):
+    setup_projects(qisrc_action)
+    rc = qisrc_action("grep", "--indexed", "--", "-v", "eggs", retcode=True)
+    assert rc == 0
+    assert record_messages.find("Cannot use the index")
+
+def test_indexed_files_without_match(qisrc_action, record_messages):
+    setup_projects(qisrc_action)
+    rc = qisrc_action("grep", "--indexed", "--", "-L", "spam", retcode=True)
+    assert rc == 0
+    assert record_messages.find("Cannot use the index")
+    assert record_messages.find(r"\.gitignore")
+
+def test_indexed_short_fixed_string(qisrc_action, record_messages):
+    setup_projects(qisrc_action)
+    rc = qisrc_action("grep", "--indexed", "--", "-F", "is", retcode=True)
+    assert rc == 0
+    assert record_messages.find("this is spam")
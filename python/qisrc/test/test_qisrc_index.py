@@ -0,0 +1,31 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+import os
+
+import qisrc.code_index
+from qisrc.test.conftest import TestGitWorkTree
+
+def test_index(qisrc_action, record_messages):
+    foo = qisrc_action.create_git_project("foo")
+    qisrc_action("index")
+    assert record_messages.find("Added 1 file")
+    git_worktree = TestGitWorkTree()
+    assert os.path.exists(git_worktree.code_index_path)
+    record_messages.reset()
+    qisrc_action("index")
+    assert record_messages.find("Added 0 file")
+
+    qisrc_action("remove", "foo")
+    record_messages.reset()
+    qisrc_action("index")
+    assert record_messages.find("removed 1 file")
+    code_index = qisrc.code_index.CodeIndex(git_worktree.code_index_path)
+    assert code_index.num_blobs == 0
+
+def test_rebuild(qisrc_action, record_messages):
+    qisrc_action.create_git_project("foo")
+    qisrc_action("index")
+    record_messages.reset()
+    qisrc_action("index", "--rebuild")
+    assert record_messages.find("Added 1 file")
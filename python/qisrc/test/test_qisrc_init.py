@@ -1,7 +1,10 @@
 ## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
 ## Use of this source code is governed by a BSD-style license that can be
 ## found in the COPYING file.
+import os
+
 import qisys.script
+import qisrc.git
 from qisrc.test.conftest import TestGitWorkTree
 
 import pytest
@@ -133,6 +136,42 @@ def test_retcode_when_cloning_fails(qisrc_action, git_server):
     rc = qisrc_action("init", git_server.manifest_url, retcode=True)
     assert rc != 0
 
+def test_retcode_when_parallel_cloning_fails(qisrc_action, git_server):
+    git_server.create_repo("foo.git")
+    git_server.create_repo("bar.git")
+    git_server.create_repo("baz.git")
+    git_server.srv.join("bar.git").remove()
+    rc = qisrc_action("init", git_server.manifest_url, "-j", "3", retcode=True)
+    assert rc != 0
+    git_worktree = TestGitWorkTree()
+    assert not git_worktree.get_git_project("bar")
+    assert git_worktree.get_git_project("foo")
+    assert git_worktree.get_git_project("baz")
+
+def test_shallow_clone(qisrc_action, git_server):
+    git_server.create_repo("foo.git")
+    git_server.push_file("foo.git", "a.txt", "a\n")
+    git_server.push_file("foo.git", "b.txt", "b\n")
+    qisrc_action("init", git_server.manifest_url, "--depth", "1")
+    foo = TestGitWorkTree().get_git_project("foo")
+    foo_git = qisrc.git.Git(foo.path)
+    assert foo_git.is_shallow()
+    (_, out) = foo_git.call("rev-list", "--count", "HEAD", raises=False)
+    assert out == "1"
+    assert os.path.exists(os.path.join(foo.path, "b.txt"))
+
+def test_partial_clone(qisrc_action, git_server):
+    git_server.create_repo("foo.git")
+    git_server.push_file("foo.git", "a.txt", "a\n")
+    srv_git = qisrc.git.Git(git_server.srv.join("foo.git").strpath)
+    srv_git.set_config("uploadpack.allowFilter", "true")
+    qisrc_action("init", git_server.manifest_url, "--filter", "blob:none")
+    foo = TestGitWorkTree().get_git_project("foo")
+    foo_git = qisrc.git.Git(foo.path)
+    assert foo_git.get_config("remote.origin.partialclonefilter") == "blob:none"
+    assert not foo_git.is_shallow()
+    assert os.path.exists(os.path.join(foo.path, "a.txt"))
+
 def test_calling_init_twice(qisrc_action, git_server):
     git_server.create_repo("bar.git")
     qisrc_action("init", git_server.manifest_url)
@@ -2,6 +2,7 @@
 ## Use of this source code is governed by a BSD-style license that can be
 ## found in the COPYING file.
 import qisrc.git
+import qisrc.status
 from qisrc.test.conftest import TestGitWorkTree
 
 import py
@@ -14,13 +15,11 @@ def test_untracked(qisrc_action, record_messages):
     foo_path = py.path.local(foo.path)
     foo_path.ensure("untracked", file=True)
     qisrc_action("status")
-    dirty = record_messages.find("Dirty projects")
-    assert "0" in dirty
+    assert record_messages.find(r"Dirty projects 0 / 2")
 
     record_messages.reset()
     qisrc_action("status", "-u")
-    dirty = record_messages.find("Dirty projects")
-    assert "1" in dirty
+    assert record_messages.find(r"Dirty projects 1 / 2")
 
 def test_behind(qisrc_action, git_server, record_messages):
     git_server.create_repo("foo.git")
@@ -55,3 +54,57 @@ def test_not_on_any_branch(qisrc_action, record_messages):
     foo_git.checkout(out)
     qisrc_action("status")
     assert record_messages.find("not on any branch")
+
+def test_parse_status():
+    out = """\
+# branch.oid 0123456789abcdef0123456789abcdef01234567
+# branch.head master
+# branch.upstream origin/master
+# branch.ab +2 -1
+1 .M N... 100644 100644 100644 0123 0123 modified file.txt
+1 A. N... 000000 100644 100644 0000 0123 new.txt
+2 R. N... 100644 100644 100644 0123 0123 R100 new name.txt\told.txt
+u UU N... 100644 100644 100644 100644 0123 4567 89ab conflict.txt
+? untracked.txt
+"""
+    git_status = qisrc.status.parse_status(out)
+    assert git_status.branch == "master"
+    assert git_status.upstream == "origin/master"
+    assert git_status.ahead == 2
+    assert git_status.behind == 1
+    assert git_status.lines == [" M modified file.txt",
+                                "A  new.txt",
+                                "R  old.txt -> new name.txt",
+                                "UU conflict.txt",
+                                "?? untracked.txt"]
+    assert not git_status.clean
+
+def test_parse_status_detached():
+    out = """\
+# branch.oid 0123456789abcdef0123456789abcdef01234567
+# branch.head (detached)
+"""
+    git_status = qisrc.status.parse_status(out)
+    assert git_status.branch is None
+    assert git_status.upstream is None
+    assert git_status.clean
+
+def test_check_state(git_server, git_worktree):
+    git_server.create_repo("foo.git")
+    git_worktree.configure_manifest(git_server.manifest_url)
+    foo = git_worktree.get_git_project("foo")
+    foo_git = qisrc.git.Git(foo.path)
+    foo_git.commit("--allow-empty", "-m", "local commit")
+    git_server.push_file("foo.git", "README", "new\n")
+    foo_git.fetch()
+    # pylint: disable-msg=E1101
+    py.path.local(foo.path).join("untracked").write("")
+    state = qisrc.status.check_state(foo, True)
+    assert state.valid
+    assert not state.clean
+    assert state.current_branch == "master"
+    assert state.tracking == "origin/master"
+    assert state.status == ["?? untracked"]
+    state = qisrc.status.check_state(foo, False)
+    assert state.clean
+    assert (state.ahead, state.behind) == (1, 1)
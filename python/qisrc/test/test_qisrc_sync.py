@@ -283,3 +283,23 @@ def test_do_not_sync_when_clone_fails(qisrc_action, git_server, record_messages)
     rc = qisrc_action("sync", retcode=True)
     assert rc != 0
     assert not record_messages.find("Success")
+
+def test_parallel_sync(qisrc_action, git_server, record_messages):
+    names = ["foo", "bar", "baz", "spam", "eggs"]
+    for name in names:
+        git_server.create_repo(name + ".git")
+    qisrc_action("init", git_server.manifest_url)
+    for name in names:
+        git_server.push_file(name + ".git", "README", "This is %s\n" % name)
+    git_worktree = TestGitWorkTree()
+    spam_git = TestGit(git_worktree.get_git_project("spam").path)
+    spam_git.checkout("-b", "devel")
+    record_messages.reset()
+    rc = qisrc_action("sync", "-j", "3", retcode=True)
+    assert rc != 0
+    assert record_messages.find(r"Success: 4 Skipped: 1 Failed: 0")
+    for name in names:
+        if name == "spam":
+            continue
+        git = TestGit(git_worktree.get_git_project(name).path)
+        assert git.read_file("README") == "This is %s\n" % name
@@ -133,3 +133,36 @@ def test_evil_nested():
     (to_add, to_move, to_rm, to_update) = qisrc.sync.compute_repo_diff(old, new)
     assert to_add[0].src == "foo"
     assert to_add[1].src == "foo/bar"
+
+def test_everything_at_once():
+    old = make_repos(
+        ("a.git", "a", ["origin"]),
+        ("b.git", "b", ["origin"]),
+        ("c.git", "c", ["origin"]),
+        ("d.git", "d", ["origin"]),
+    )
+    new = make_repos(
+        ("a.git", "a", ["origin"]),
+        ("b.git", "lib/b", ["origin"]),
+        ("c.git", "c", ["origin", "gerrit"]),
+        ("e.git", "e", ["origin"]),
+    )
+    (to_add, to_move, to_rm, to_update) = qisrc.sync.compute_repo_diff(old, new)
+    assert to_add == [new[3]]
+    assert to_move == [(old[1], "lib/b")]
+    assert to_rm == [old[3]]
+    assert to_update == [(old[2], new[2])]
+
+def test_first_matching_old_repo_is_used():
+    # Two old repos share an url with the new one: the first one wins
+    old = make_repos(
+        ("foo.git", "foo", ["origin"]),
+        ("foo.git", "foo2", ["origin"]),
+    )
+    new = make_repos(
+        ("foo.git", "lib/foo", ["origin"]),
+    )
+    (to_add, to_move, to_rm, to_update) = qisrc.sync.compute_repo_diff(old, new)
+    assert to_add == list()
+    assert to_move == [(old[0], "lib/foo")]
+    assert to_rm == [old[1]]
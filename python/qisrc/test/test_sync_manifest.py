@@ -61,6 +61,20 @@ def test_new_repos(git_worktree, git_server):
     git_worktree.configure_manifest(manifest_url)
     assert git_worktree.get_git_project("foo")
 
+def test_new_repos_in_parallel(git_worktree, git_server):
+    names = ["repo%i" % i for i in range(8)]
+    for name in names:
+        git_server.create_repo(name + ".git")
+    manifest_url = git_server.manifest_url
+    git_worktree.configure_manifest(manifest_url, num_jobs=4)
+    # Re-read .qi/git.xml and the worktree from disk
+    git_worktree = TestGitWorkTree()
+    assert sorted(x.src for x in git_worktree.git_projects) == names
+    for name in names:
+        git_project = git_worktree.get_git_project(name)
+        assert git_project.default_remote.url.endswith("/%s.git" % name)
+        assert git_project.default_branch.name == "master"
+
 def test_moving_repos_simple_case(git_worktree, git_server):
     git_server.create_repo("foo.git")
     manifest_url = git_server.manifest_url
@@ -152,3 +166,36 @@ def test_rm_nested_repos_root(git_worktree, git_server, qisrc_action):
     assert git_worktree.get_git_project("foo")
     assert git_worktree.get_git_project("foo/bar")
     assert git_worktree.get_git_project("foo/lol")
+
+def test_manifest_parsed_once_per_head(git_worktree, git_server, monkeypatch):
+    git_server.create_repo("foo.git")
+    worktree_syncer = qisrc.sync.WorkTreeSyncer(git_worktree)
+    worktree_syncer.configure_manifest(git_server.manifest_url)
+    loaded = list()
+    load = qisrc.manifest.Manifest.load
+    def counting_load(manifest):
+        loaded.append(manifest.manifest_xml)
+        return load(manifest)
+    monkeypatch.setattr(qisrc.manifest.Manifest, "load", counting_load)
+
+    worktree_syncer = qisrc.sync.WorkTreeSyncer(git_worktree)
+    worktree_syncer.sync()
+    assert len(loaded) == 1
+
+    del loaded[:]
+    git_server.create_repo("bar.git")
+    worktree_syncer.sync()
+    # once before and once after the manifest is updated
+    assert len(loaded) == 2
+    assert git_worktree.get_git_project("bar")
+
+def test_read_remote_manifest_returns_copies(git_worktree, git_server):
+    git_server.create_repo("foo.git")
+    worktree_syncer = qisrc.sync.WorkTreeSyncer(git_worktree)
+    worktree_syncer.configure_manifest(git_server.manifest_url)
+    repos = worktree_syncer.read_remote_manifest()
+    repos[0].src = "spam"
+    repos[0].remotes[0].url = "eggs"
+    repos = worktree_syncer.read_remote_manifest()
+    assert repos[0].src == "foo"
+    assert repos[0].remotes[0].url != "eggs"
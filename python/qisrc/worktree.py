@@ -4,10 +4,12 @@
 import os
 import copy
 import operator
+import threading
 
 from qisys import ui
 import qisys.worktree
 import qisrc.git
+import qisrc.mirror
 import qisrc.snapshot
 import qisrc.sync
 import qisrc.project
@@ -34,15 +36,23 @@ class GitWorkTree(qisys.worktree.WorkTreeObserver):
         self.root = worktree.root
         self._root_xml = qisys.qixml.read(self.git_xml).getroot()
         worktree.register(self)
+        # Serialize writes to .qi/git.xml and to the worktree when
+        # several repositories are cloned at the same time
+        self._lock = threading.RLock()
+        self._mirror_cache = None
         self.git_projects = list()
+        self._git_projects_by_src = dict()
         self.load_git_projects()
         self._syncer = qisrc.sync.WorkTreeSyncer(self)
 
     def configure_manifest(self, manifest_url, groups=None,
-                           branch="master", ref=None, review=True):
+                           branch="master", ref=None, review=True,
+                           num_jobs=1, mirror=None, depth=None, clone_filter=None):
         """ Add a new manifest to this worktree """
         return self._syncer.configure_manifest(manifest_url, groups=groups,
-                                               branch=branch, ref=ref, review=review)
+                                               branch=branch, ref=ref, review=review,
+                                               num_jobs=num_jobs, mirror=mirror,
+                                               depth=depth, clone_filter=clone_filter)
 
     def configure_projects(self, projects):
         self._syncer.configure_projects(projects)
@@ -51,16 +61,18 @@ class GitWorkTree(qisys.worktree.WorkTreeObserver):
         """ Run a sync using just the xml file given as parameter """
         return self._syncer.sync_from_manifest_file(xml_path)
 
-    def sync(self):
+    def sync(self, num_jobs=1, depth=None, clone_filter=None):
         """ Delegates to WorkTreeSyncer """
-        return self._syncer.sync()
+        return self._syncer.sync(num_jobs=num_jobs, depth=depth,
+                                 clone_filter=clone_filter)
 
     def load_git_projects(self):
         """ Build a list of git projects using the
         xml configuration
 
         """
-        self.git_projects = list()
+        git_projects = list()
+        git_projects_by_src = dict()
         for worktree_project in self.worktree.projects:
             project_src = worktree_project.src
             if not qisrc.git.is_git(worktree_project.path):
@@ -69,14 +81,19 @@ class GitWorkTree(qisys.worktree.WorkTreeObserver):
             git_elem = self._get_elem(project_src)
             if git_elem is not None:
                 git_project.load_xml(git_elem)
-            self.git_projects.append(git_project)
+            git_projects.append(git_project)
+            git_projects_by_src[project_src] = git_project
+        # Replace both at once, so that other threads never see a
+        # partially loaded worktree
+        self.git_projects = git_projects
+        self._git_projects_by_src = git_projects_by_src
 
     def get_git_project(self, path, raises=False, auto_add=False):
         """ Get a git project by its sources """
         src = self.worktree.normalize_path(path)
-        for git_project in self.git_projects:
-            if git_project.src == src:
-                return git_project
+        git_project = self._git_projects_by_src.get(src)
+        if git_project:
+            return git_project
         if auto_add:
             self.worktree.add_project(path)
             return self.get_git_project(path)
@@ -104,13 +121,30 @@ class GitWorkTree(qisys.worktree.WorkTreeObserver):
         res.sort(key=operator.attrgetter("src"))
         return res
 
-    def find_repo(self, repo):
-        """ Look for a project configured with the given repo """
+    def find_repo(self, repo, projects_by_url=None):
+        """ Look for a project configured with the given repo
+
+        :param projects_by_url: the result of :py:meth:`get_projects_by_url`,
+                                to avoid computing it again when looking
+                                for several repos
+        """
+        if projects_by_url is None:
+            projects_by_url = self.get_projects_by_url()
         for url in repo.urls:
-            for git_project in self.git_projects:
-                for remote in git_project.remotes:
-                    if url == remote.url:
-                        return git_project
+            git_project = projects_by_url.get(url)
+            if git_project:
+                return git_project
+
+    def get_projects_by_url(self):
+        """ Return a dict url -> first git project having a remote
+        with this url
+
+        """
+        res = dict()
+        for git_project in self.git_projects:
+            for remote in git_project.remotes:
+                res.setdefault(remote.url, git_project)
+        return res
 
     @property
     def git_xml(self):
@@ -120,10 +154,28 @@ class GitWorkTree(qisys.worktree.WorkTreeObserver):
                 fp.write("""<git />""")
         return git_xml_path
 
+    @property
+    def code_index_path(self):
+        """ Path to the trigram index used by ``qisrc grep --indexed`` """
+        return os.path.join(self.worktree.dot_qi, "code-index")
+
     @property
     def manifest(self):
         return self._syncer.manifest
 
+    @property
+    def mirror_cache(self):
+        """ The :py:class:`qisrc.mirror.MirrorCache` to use when cloning
+        and fetching, or None if the worktree does not use mirrors
+
+        """
+        if not self.manifest.mirror:
+            return None
+        with self._lock:
+            if self._mirror_cache is None:
+                self._mirror_cache = qisrc.mirror.MirrorCache()
+            return self._mirror_cache
+
     def snapshot(self):
         """ Return a :py:class`.Snapshot` of the current worktree state
 
@@ -145,14 +197,15 @@ class GitWorkTree(qisys.worktree.WorkTreeObserver):
 
     def add_git_project(self, src):
         """ Add a new git project """
-        elem = qisys.qixml.etree.Element("project")
-        elem.set("src", src)
-        self._root_xml.append(elem)
-        qisys.qixml.write(self._root_xml, self.git_xml)
-        # This will trigger the call to self.load_git_projects()
-        self.worktree.add_project(src)
-        new_proj = self.get_git_project(src)
-        return new_proj
+        with self._lock:
+            elem = qisys.qixml.etree.Element("project")
+            elem.set("src", src)
+            self._root_xml.append(elem)
+            qisys.qixml.write(self._root_xml, self.git_xml)
+            # This will trigger the call to self.load_git_projects()
+            self.worktree.add_project(src)
+            new_proj = self.get_git_project(src)
+            return new_proj
 
     def on_project_removed(self, project):
         self.load_git_projects()
@@ -165,10 +218,12 @@ class GitWorkTree(qisys.worktree.WorkTreeObserver):
 
     def clone_missing(self, repo):
         """ Add a new project.
+        Can be called from several threads at once.
         :returns: a boolean telling if the clone succeeded
 
         """
-        worktree_project = self.worktree.add_project(repo.src)
+        with self._lock:
+            worktree_project = self.worktree.add_project(repo.src)
         git_project = qisrc.project.GitProject(self, worktree_project)
         if os.path.exists(git_project.path):
             git = qisrc.git.Git(git_project.path)
@@ -194,16 +249,27 @@ class GitWorkTree(qisys.worktree.WorkTreeObserver):
         try:
             git.init()
             git.remote("add", remote_name, clone_url)
-            git.fetch(remote_name, "--quiet")
+            mirror_cache = self.mirror_cache
+            if mirror_cache:
+                # Objects already in the mirror won't be fetched again
+                mirror_cache.borrow(clone_url, git_project.path)
+            fetch_args = [remote_name, "--quiet"]
+            if repo.depth:
+                fetch_args.append("--depth=%i" % repo.depth)
+            if repo.filter:
+                fetch_args.append("--filter=%s" % repo.filter)
+            git.fetch(*fetch_args)
             git.checkout("-b", branch, "%s/%s" % (remote_name, branch))
         except:
             ui.error("Cloning repo failed")
             if git.is_empty():
                 qisys.sh.rm(git_project.path)
-            self.worktree.remove_project(repo.src)
+            with self._lock:
+                self.worktree.remove_project(repo.src)
             return False
-        self.save_project_config(git_project)
-        self.load_git_projects()
+        with self._lock:
+            self.save_project_config(git_project)
+            self.load_git_projects()
         return True
 
     def move_repo(self, repo, new_src):
@@ -288,8 +354,9 @@ class GitWorkTree(qisys.worktree.WorkTreeObserver):
             raise Exception("Could not read manifest on %s"% ref)
         groups = self._syncer.manifest.groups
         repos = manifest.get_repos(groups=groups)
+        projects_by_url = self.get_projects_by_url()
         for repo in repos:
-            project = self.find_repo(repo)
+            project = self.find_repo(repo, projects_by_url=projects_by_url)
             if project:
                 # Make a copy so that we do not modify the projects in place
                 project_copy = copy.deepcopy(project)
@@ -318,16 +385,18 @@ class GitWorkTree(qisys.worktree.WorkTreeObserver):
 
     def save_project_config(self, project):
         """ Save the project instance in .qi/git.xml """
-        project_xml = project.dump_xml()
-        self._set_elem(project.src, project_xml)
-        qisys.qixml.write(self._root_xml, self.git_xml)
+        with self._lock:
+            project_xml = project.dump_xml()
+            self._set_elem(project.src, project_xml)
+            qisys.qixml.write(self._root_xml, self.git_xml)
 
     def save_git_config(self):
         """ Save the worktree config in .qi/git.xml """
-        for project in self.git_projects:
-            project_xml = project.dump_xml()
-            self._set_elem(project.src, project_xml)
-        qisys.qixml.write(self._root_xml, self.git_xml)
+        with self._lock:
+            for project in self.git_projects:
+                project_xml = project.dump_xml()
+                self._set_elem(project.src, project_xml)
+            qisys.qixml.write(self._root_xml, self.git_xml)
 
     def __repr__(self):
         return "<GitWorkTree in %s>" % self.root
@@ -5,30 +5,47 @@
 
 """
 
+import subprocess
 import sys
+import threading
+
 from qisys import ui
 import qisys.command
+import qisys.parallel
 import qisys
 
-def foreach(projects, cmd, ignore_errors=True):
+def foreach(projects, cmd, ignore_errors=True, num_jobs=1, live=False,
+            depends=None):
     """ Execute the command on every project
     :param ignore_errors: whether to stop at first
     failure
+    :param num_jobs: run the command on up to ``num_jobs`` projects
+    at the same time. The output of each project is then captured and
+    displayed once the command is done, in the order of the projects
+    :param live: when running in parallel, display the output as soon
+    as it is produced instead, each line being prefixed by the project
+    :param depends: a function returning the projects that must be done
+    before starting the command in the given project
 
     """
     errors = list()
     ui.info(ui.green, "Running `%s` on every project" % " ".join(cmd))
-    for i, project in enumerate(projects):
-        ui.info_count(i, len(projects), ui.blue, project.src)
-        command = cmd[:]
-        try:
-            qisys.command.call(command, cwd=project.path)
-        except qisys.command.CommandFailedException:
-            if ignore_errors:
-                errors.append(project)
-                continue
-            else:
-                raise
+    if num_jobs > 1 or depends:
+        errors = _foreach_parallel(projects, cmd, ignore_errors=ignore_errors,
+                                   num_jobs=num_jobs, live=live,
+                                   depends=depends)
+    else:
+        for i, project in enumerate(projects):
+            ui.info_count(i, len(projects), ui.blue, project.src)
+            command = cmd[:]
+            try:
+                qisys.command.call(command, cwd=project.path)
+            except qisys.command.CommandFailedException:
+                if ignore_errors:
+                    errors.append(project)
+                    continue
+                else:
+                    raise
     if not errors:
         return
     print
@@ -36,3 +53,55 @@ def foreach(projects, cmd, ignore_errors=True):
     for project in errors:
         ui.info(ui.green, " * ", ui.reset, ui.blue, project.src)
     sys.exit(1)
+
+def _foreach_parallel(projects, cmd, ignore_errors=True, num_jobs=1,
+                      live=False, depends=None):
+    """ Helper for :py:func:`foreach`. Return the projects on which
+    the command failed
+
+    """
+    exe_full_path = qisys.command.find_program(cmd[0])
+    if not exe_full_path:
+        raise qisys.command.NotInPath(cmd[0])
+    command = [exe_full_path] + cmd[1:]
+    max_src = max(len(x.src) for x in projects) if projects else 0
+    lock = threading.Lock()
+
+    def run(project):
+        ui.debug("Calling:", " ".join(command), "in", project.path)
+        process = subprocess.Popen(command, cwd=project.path,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT)
+        if not live:
+            out = process.communicate()[0]
+            return (process.returncode, out)
+        prefix = ("[%s]" % project.src).ljust(max_src + 2)
+        for line in iter(process.stdout.readline, ""):
+            with lock:
+                ui.info(ui.blue, prefix, ui.reset, line.rstrip("\n"))
+        process.wait()
+        return (process.returncode, None)
+
+    if depends:
+        results = qisys.parallel.imap_unordered(run, projects,
+                                                num_jobs=num_jobs,
+                                                depends=depends)
+    else:
+        results = qisys.parallel.imap_ordered(run, projects,
+                                              num_jobs=num_jobs)
+    errors = list()
+    for i, (project, (returncode, out)) in enumerate(results):
+        with lock:
+            ui.info_count(i, len(projects), ui.blue, project.src)
+            if out:
+                ui.info(out, end="")
+        if returncode == 0:
+            continue
+        if not ignore_errors:
+            # No other project is started
+            results.close()
+            raise qisys.command.CommandFailedException(command, returncode,
+                                                       cwd=project.path)
+        errors.append(project)
+    errors.sort(key=projects.index)
+    return errors
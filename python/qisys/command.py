@@ -6,14 +6,24 @@
 
 """
 
+import errno
+import math
 import os
+import select
 import sys
+import collections
 import contextlib
 import subprocess
 import signal
 import threading
+import time
 import Queue
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 from qisys import ui
 import qisys
 import qisys.envsetter
@@ -23,6 +33,13 @@ _FIND_PROGRAM_CACHE = dict()
 
 SIGINT_EVENT = threading.Event()
 
+# Time given to a process to stop after a SIGTERM before killing it
+TERMINATE_GRACE_TIME = 5
+
+# Maximum time between two waitpid() calls when waiting for a process
+# that closed its output or was killed to exit
+MAX_REAP_INTERVAL = 0.1
+
 class Process:
     """ A simple way to run commands.
 
@@ -40,20 +57,55 @@ class Process:
     INTERRUPTED = 4
     NOT_RUN     = 5
 
-    def __init__(self, cmd, cwd=None, env=None):
+    def __init__(self, cmd, cwd=None, env=None, log_file=None,
+                 tail_size=None):
         self.cmd = cmd
         self.cwd = cwd
         self.env = env
+        # If set, the whole output is written to this file while the
+        # process runs
+        self.log_file = log_file
+        # If set, only the last ``tail_size`` bytes of the output are
+        # kept in memory, in self.out
+        self.tail_size = tail_size
         self.out = ""
+        # Total size of the output
+        self.out_size = 0
         self.returncode = None
         self._process = None
         self.exception = None
         self.return_type = Process.FAILED
+        self._tail = None
+        self._log_fp = None
+        self._output_open = False
+
+    def run(self, timeout=None, supervisor=None):
+        """ Run the command and wait for it to finish.
+
+        On POSIX, the process is watched by a :py:class:`Supervisor`.
+        If ``supervisor`` is given, its :py:meth:`Supervisor.loop` is
+        expected to be called by an other thread. Otherwise, a new one
+        is used until the process is done.
+
+        """
+        if os.name != "posix":
+            self._run_with_threads(timeout)
+            return
+        if supervisor:
+            supervisor.start(self, timeout=timeout).wait()
+            return
+        supervisor = Supervisor()
+        try:
+            child = supervisor.start(self, timeout=timeout)
+            supervisor.loop(until=child.is_done)
+        finally:
+            supervisor.close()
 
-    def run(self, timeout=None):
+    def _run_with_threads(self, timeout=None):
         def target():
             ui.debug("Starting thread.")
             ui.debug("Calling:", subprocess.list2cmdline(self.cmd))
+            self._output_started()
             try:
                 opts = dict()
                 if os.name == 'posix':
@@ -74,9 +126,17 @@ class Process:
             except Exception, e:
                 self.exception = e
                 self.return_type = Process.NOT_RUN
+                self._output_done()
                 return
             def read_target():
-                self.out = self._process.communicate()[0]
+                fd = self._process.stdout.fileno()
+                while True:
+                    data = os.read(fd, 65536)
+                    if not data:
+                        break
+                    self._output_received(data)
+                self._process.stdout.close()
+                self._process.wait()
             self._should_stop_reading = False
             self._reading_thread = threading.Thread(target=read_target)
             # Allow Python to exit even if the reading thread is still alive
@@ -85,6 +145,7 @@ class Process:
             self._reading_thread.start()
             while not self._should_stop_reading and self._reading_thread.is_alive():
                 self._reading_thread.join(1)
+            self._output_done()
             self.returncode = self._process.returncode
             if self.returncode == 0:
                 ui.debug("Setting return code to Process.OK")
@@ -106,6 +167,41 @@ class Process:
             ui.debug("Process timed out")
             self._kill_subprocess()
 
+    def _output_started(self):
+        self._tail = OutputTail(self.tail_size)
+        self._output_open = True
+        self.out_size = 0
+        if not self.log_file:
+            return
+        try:
+            self._log_fp = open(self.log_file, "wb")
+        except IOError, e:
+            ui.warning("Could not write output to", self.log_file, ":", e)
+            self.log_file = None
+
+    def _output_received(self, data):
+        if not self._output_open:
+            return
+        self.out_size += len(data)
+        self._tail.write(data)
+        if not self._log_fp:
+            return
+        try:
+            self._log_fp.write(data)
+        except IOError, e:
+            ui.warning("Could not write output to", self.log_file, ":", e)
+            self._log_fp.close()
+            self._log_fp = None
+
+    def _output_done(self):
+        if not self._output_open:
+            return
+        self._output_open = False
+        self.out = self._tail.getvalue()
+        if self._log_fp:
+            self._log_fp.close()
+            self._log_fp = None
+
     def _kill_subprocess(self):
         if self._thread and self._process:
             self.return_type = Process.TIME_OUT
@@ -137,6 +233,359 @@ class Process:
         self._should_stop_reading = True
         self._thread.join()
 
+class Supervisor(object):
+    """ Watch many processes at once, from a single thread (POSIX only)
+
+    Processes can be started from any thread with :py:meth:`start`.
+    :py:meth:`loop` then reads their output, enforces their timeouts
+    and collects their return codes, waiting for something to happen
+    with a single ``poll()`` call. Timeouts are thus accurate to the
+    millisecond, and no thread is needed for each process.
+
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = list()
+        self._children = list()
+        self._by_fd = dict()
+        self._closed = False
+        self._wake_r, self._wake_w = os.pipe()
+        for fd in self._wake_r, self._wake_w:
+            _set_cloexec(fd)
+            _set_nonblocking(fd)
+        self._poller = None
+        if hasattr(select, "poll"):
+            self._poller = select.poll()
+            self._poller.register(self._wake_r, select.POLLIN)
+
+    def close(self):
+        """ Release the resources used by the supervisor.
+        No process can be started afterwards
+
+        """
+        with self._lock:
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+            self._closed = True
+
+    def start(self, process, timeout=None):
+        """ Start the process. Can be called from any thread.
+
+        Return an object with a ``wait()`` method returning
+        when the process is done, and an ``is_done()`` method
+
+        """
+        child = _Child(process, timeout)
+        if self._closed:
+            process.return_type = Process.INTERRUPTED
+            child.done.set()
+            return child
+        ui.debug("Calling:", subprocess.list2cmdline(process.cmd))
+        process._output_started()
+        try:
+            child.popen = subprocess.Popen(process.cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                cwd=process.cwd,
+                env=process.env,
+                preexec_fn=os.setsid,
+                close_fds=True)
+        except Exception, e:
+            process.exception = e
+            process.return_type = Process.NOT_RUN
+            process._output_done()
+            child.done.set()
+            return child
+        child.fd = child.popen.stdout.fileno()
+        _set_nonblocking(child.fd)
+        if timeout is not None:
+            child.deadline = time.time() + timeout
+        with self._lock:
+            self._pending.append(child)
+        self.wake()
+        return child
+
+    def wake(self):
+        """ Make :py:meth:`loop` check its ``until`` condition again.
+        Can be called from any thread
+
+        """
+        with self._lock:
+            if self._closed:
+                return
+            try:
+                os.write(self._wake_w, "x")
+            except OSError, e:
+                # When the pipe is full, the loop is going to wake up anyway
+                if e.errno != errno.EAGAIN:
+                    raise
+
+    def loop(self, until):
+        """ Watch the processes until ``until()`` returns True.
+
+        If something goes wrong (for instance if a KeyboardInterrupt
+        is raised), every process still running is killed.
+
+        """
+        try:
+            while True:
+                self._update()
+                if until():
+                    return
+                self._wait()
+        except BaseException:
+            self._abort()
+            raise
+
+    def _update(self):
+        """ Register the new processes, and deal with the timeouts,
+        the interruptions and the processes that exited
+
+        """
+        with self._lock:
+            pending = self._pending
+            self._pending = list()
+        for child in pending:
+            self._children.append(child)
+            self._by_fd[child.fd] = child
+            if self._poller:
+                self._poller.register(child.fd, select.POLLIN)
+        now = time.time()
+        interrupted = SIGINT_EVENT.is_set()
+        for child in self._children[:]:
+            if child.killed:
+                pass
+            elif interrupted:
+                self._kill(child, Process.INTERRUPTED)
+            elif child.kill_deadline is not None and \
+                 now >= child.kill_deadline:
+                ui.debug("Killing zombies")
+                self._kill(child, Process.ZOMBIE)
+            elif child.deadline is not None and now >= child.deadline:
+                ui.debug("Process timed out")
+                self._terminate(child, now)
+            if child.eof or child.killed:
+                self._reap(child, now)
+
+    def _wait(self):
+        """ Wait for some output, a call to :py:meth:`wake`, a signal
+        or the next deadline, and read the available output
+
+        """
+        wait = None
+        next_event = None
+        for child in self._children:
+            child_event = child.next_event()
+            if child_event is None:
+                continue
+            if next_event is None or child_event < next_event:
+                next_event = child_event
+        if next_event is not None:
+            wait = max(0, next_event - time.time())
+        try:
+            if self._poller:
+                if wait is None:
+                    events = self._poller.poll()
+                else:
+                    events = self._poller.poll(int(math.ceil(wait * 1000)))
+                ready = [fd for (fd, _) in events]
+            else:
+                fds = [self._wake_r] + self._by_fd.keys()
+                ready = select.select(fds, [], [], wait)[0]
+        except select.error, e:
+            # Interrupted by a signal: its handler has been called,
+            # and SIGINT_EVENT may be set now.
+            if e.args[0] == errno.EINTR:
+                return
+            raise
+        for fd in ready:
+            if fd == self._wake_r:
+                self._drain_wake_pipe()
+            else:
+                self._read(self._by_fd[fd])
+
+    def _drain_wake_pipe(self):
+        while True:
+            try:
+                if not os.read(self._wake_r, 4096):
+                    return
+            except OSError, e:
+                if e.errno in (errno.EAGAIN, errno.EINTR):
+                    return
+                raise
+
+    def _read(self, child):
+        try:
+            data = os.read(child.fd, 65536)
+        except OSError, e:
+            if e.errno in (errno.EAGAIN, errno.EINTR):
+                return
+            raise
+        if data:
+            child.process._output_received(data)
+        else:
+            self._close_output(child)
+
+    def _close_output(self, child):
+        if child.eof:
+            return
+        if self._poller:
+            self._poller.unregister(child.fd)
+        del self._by_fd[child.fd]
+        child.popen.stdout.close()
+        child.eof = True
+
+    def _terminate(self, child, now):
+        """ Called when the process timed out """
+        child.process.return_type = Process.TIME_OUT
+        child.deadline = None
+        child.kill_deadline = now + TERMINATE_GRACE_TIME
+        ui.debug("Terminating process")
+        try:
+            child.popen.terminate()
+        except OSError:
+            pass
+
+    def _kill(self, child, return_type):
+        """ Kill the whole group of processes """
+        child.process.return_type = return_type
+        child.killed = True
+        child.next_reap = 0
+        try:
+            os.killpg(child.popen.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    def _reap(self, child, now):
+        """ Collect the return code of the process, if it exited """
+        if now < child.next_reap:
+            return
+        try:
+            (pid, status) = os.waitpid(child.popen.pid, os.WNOHANG)
+        except OSError, e:
+            if e.errno == errno.EINTR:
+                return
+            if e.errno != errno.ECHILD:
+                raise
+            # Someone else collected it
+            self._finish(child, child.popen.returncode)
+            return
+        if pid == 0:
+            child.next_reap = now + child.reap_interval
+            child.reap_interval = min(2 * child.reap_interval,
+                                      MAX_REAP_INTERVAL)
+            return
+        self._finish(child, _returncode_from_status(status))
+
+    def _finish(self, child, returncode):
+        self._close_output(child)
+        self._children.remove(child)
+        child.popen.returncode = returncode
+        process = child.process
+        process.returncode = returncode
+        process._output_done()
+        if returncode == 0 and process.return_type == Process.FAILED:
+            ui.debug("Setting return code to Process.OK")
+            process.return_type = Process.OK
+        child.done.set()
+
+    def _abort(self):
+        """ Kill every process, and wait for them to exit """
+        with self._lock:
+            self._children.extend(self._pending)
+            self._pending = list()
+        for child in self._children[:]:
+            self._kill(child, Process.INTERRUPTED)
+            try:
+                (_, status) = os.waitpid(child.popen.pid, 0)
+                returncode = _returncode_from_status(status)
+            except OSError:
+                returncode = child.popen.returncode
+            if not child.eof and child.fd not in self._by_fd:
+                # Started but not registered yet. The fd of a child
+                # whose output is closed may already be used elsewhere
+                self._by_fd[child.fd] = child
+                if self._poller:
+                    self._poller.register(child.fd, select.POLLIN)
+            self._finish(child, returncode)
+
+
+class _Child(object):
+    """ State of a process watched by a :py:class:`Supervisor` """
+    def __init__(self, process, timeout):
+        self.process = process
+        self.popen = None
+        self.fd = None
+        self.deadline = None
+        self.kill_deadline = None
+        self.eof = False
+        self.killed = False
+        self.next_reap = 0
+        self.reap_interval = 0.001
+        self.done = threading.Event()
+
+    def wait(self):
+        self.done.wait()
+
+    def is_done(self):
+        return self.done.is_set()
+
+    def next_event(self):
+        """ The next time something should be done with the process,
+        or None if there is nothing to do until it writes something
+
+        """
+        if self.eof or self.killed:
+            return self.next_reap
+        if self.kill_deadline is not None:
+            return self.kill_deadline
+        return self.deadline
+
+
+class OutputTail(object):
+    """ Keep the last ``max_size`` bytes written to it in memory,
+    or everything if ``max_size`` is None
+
+    """
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self._chunks = collections.deque()
+        self._size = 0
+
+    def write(self, data):
+        self._chunks.append(data)
+        self._size += len(data)
+        if self.max_size is None:
+            return
+        while len(self._chunks) > 1 and \
+              self._size - len(self._chunks[0]) >= self.max_size:
+            self._size -= len(self._chunks.popleft())
+
+    def getvalue(self):
+        res = "".join(self._chunks)
+        if self.max_size is not None and len(res) > self.max_size:
+            res = res[len(res) - self.max_size:]
+        return res
+
+
+def _returncode_from_status(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _set_cloexec(fd):
+    if fcntl:
+        flags = fcntl.fcntl(fd, fcntl.F_GETFD)
+        fcntl.fcntl(fd, fcntl.F_SETFD, flags | fcntl.FD_CLOEXEC)
+
+
+def _set_nonblocking(fd):
+    if fcntl:
+        flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+        fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+
+
 def str_from_signal(code):
     """ Return a description about what happened when the
     retcode of a program is less than zero
@@ -362,7 +811,8 @@ def check_is_in_path(executable, env=None):
         raise NotInPath(executable, env=env)
 
 
-def call(cmd, cwd=None, env=None, ignore_ret_code=False, quiet=False):
+def call(cmd, cwd=None, env=None, ignore_ret_code=False, quiet=False,
+         log_file=None):
     """ Execute a command line.
 
     If ignore_ret_code is False:
@@ -370,6 +820,9 @@ def call(cmd, cwd=None, env=None, ignore_ret_code=False, quiet=False):
     Else:
         simply returns the returncode of the process
 
+    If log_file is not None, stdout and stderr of the
+    process are written to this file instead of the console.
+
     Note: first arg of the cmd is assumed to be something
     inside %PATH%. (or in env[PATH] if env is not None)
 
@@ -399,9 +852,15 @@ def call(cmd, cwd=None, env=None, ignore_ret_code=False, quiet=False):
     ui.debug("Calling:", " ".join(cmd))
 
     call_kwargs = {"env":env, "cwd":cwd}
-    if quiet or ui.CONFIG.get("quiet"):
-        call_kwargs["stdout"] = subprocess.PIPE
-    returncode = subprocess.call(cmd, **call_kwargs)
+    if log_file:
+        with open(log_file, "w") as fp:
+            call_kwargs["stdout"] = fp
+            call_kwargs["stderr"] = subprocess.STDOUT
+            returncode = subprocess.call(cmd, **call_kwargs)
+    else:
+        if quiet or ui.CONFIG.get("quiet"):
+            call_kwargs["stdout"] = subprocess.PIPE
+        returncode = subprocess.call(cmd, **call_kwargs)
 
     if returncode != 0 and not ignore_ret_code:
         raise CommandFailedException(cmd, returncode, cwd)
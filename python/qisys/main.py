@@ -21,15 +21,14 @@ def main():
         script_name = script_name.replace("-script", "")
         script_name = script_name.replace(".py", "")
     script_name = os.path.basename(script_name)
-    parser = argparse.ArgumentParser()
-    package_name = ("%s.actions" % script_name)
-    modules = qisys.script.action_modules_from_package(package_name)
-
     if len(sys.argv) == 2 and sys.argv[1] == '--version':
         print_version(script_name)
         sys.exit(0)
 
-    qisys.script.root_command_main(script_name, parser, modules)
+    parser = argparse.ArgumentParser()
+    package_name = ("%s.actions" % script_name)
+    actions = qisys.script.actions_from_package(package_name)
+    qisys.script.root_command_main(script_name, parser, actions)
 
 if __name__ == "__main__":
     sys.argv.pop(0)
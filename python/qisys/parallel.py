@@ -0,0 +1,165 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" Run the same function on many items using a pool of threads
+
+"""
+
+import sys
+import threading
+import Queue
+
+
+def imap_ordered(func, items, num_jobs=1, max_ahead=None):
+    """ Call ``func(item)`` for every item, using up to ``num_jobs``
+    threads.
+
+    Yield ``(item, result)`` tuples in the order of ``items``, each
+    one as soon as it and all the previous ones are done, so that the
+    output of the caller does not depend on which item finished first.
+
+    If ``func`` raises, the exception is re-raised when its item is
+    reached, and no other item is started. The same happens when the
+    caller stops iterating.
+
+    If ``max_ahead`` is given, an item is only started when less than
+    ``max_ahead`` items before it are still waiting to be yielded, so
+    that at most ``max_ahead`` results are held in memory.
+
+    With ``num_jobs`` lower than 2, no thread is used and ``func``
+    is only called when the caller asks for the next result.
+
+    """
+    items = list(items)
+    if num_jobs is None or num_jobs < 2 or len(items) < 2:
+        for item in items:
+            yield (item, func(item))
+        return
+
+    tasks = Queue.Queue()
+    for (index, item) in enumerate(items):
+        tasks.put((index, item))
+    results = dict()
+    done = threading.Condition()
+    stop = threading.Event()
+    # index of the next item to yield
+    next_index = [0]
+
+    def target():
+        while not stop.is_set():
+            try:
+                (index, item) = tasks.get_nowait()
+            except Queue.Empty:
+                return
+            if max_ahead:
+                with done:
+                    while index >= next_index[0] + max_ahead:
+                        if stop.is_set():
+                            return
+                        done.wait(0.1)
+            try:
+                res = (True, func(item))
+            except Exception:
+                res = (False, sys.exc_info())
+            with done:
+                results[index] = res
+                done.notify_all()
+
+    workers = list()
+    for i in range(min(num_jobs, len(items))):
+        worker = threading.Thread(target=target, name="Worker#%i" % i)
+        worker.daemon = True
+        worker.start()
+        workers.append(worker)
+
+    try:
+        for (index, item) in enumerate(items):
+            with done:
+                while index not in results:
+                    # Using a timeout so that the main thread stays
+                    # responsive to KeyboardInterrupt
+                    done.wait(0.1)
+                (ok, res) = results.pop(index)
+                next_index[0] = index + 1
+                done.notify_all()
+            if not ok:
+                # pylint: disable-msg=E0702
+                raise res[0], res[1], res[2]
+            yield (item, res)
+    finally:
+        stop.set()
+
+
+def imap_unordered(func, items, num_jobs=1, depends=None):
+    """ Call ``func(item)`` for every item, using up to ``num_jobs``
+    threads, and yield ``(item, result)`` tuples as soon as each item
+    is done.
+
+    If ``depends`` is given, ``depends(item)`` must return the items
+    that have to be done before ``item`` is started. Items are started
+    in the order of ``items`` among the ones whose dependencies are
+    done. When circular dependencies prevent any item from being
+    started, the first pending one is started anyway.
+
+    If ``func`` raises, the exception is re-raised when the item is
+    done, and no other item is started. The same happens when the
+    caller stops iterating.
+
+    """
+    items = list(items)
+    if num_jobs is None or num_jobs < 1:
+        num_jobs = 1
+    indexes = dict((id(x), i) for (i, x) in enumerate(items))
+    deps = list()
+    for item in items:
+        item_deps = set()
+        if depends:
+            item_deps = set(indexes[id(x)] for x in depends(item)
+                            if id(x) in indexes)
+        item_deps.discard(indexes[id(item)])
+        deps.append(item_deps)
+    pending = range(len(items))
+    done = set()
+    running = set()
+    events = Queue.Queue()
+
+    def target(index):
+        try:
+            res = (True, func(items[index]))
+        except Exception:
+            res = (False, sys.exc_info())
+        events.put((index, res))
+
+    def start_ready():
+        ready = [x for x in pending if deps[x] <= done]
+        if not ready and not running and pending:
+            ready = pending[:1]
+        for index in ready[:num_jobs - len(running)]:
+            pending.remove(index)
+            running.add(index)
+            if num_jobs == 1:
+                # No need for a thread
+                target(index)
+                continue
+            worker = threading.Thread(target=target, args=(index,),
+                                      name="Worker#%i" % index)
+            worker.daemon = True
+            worker.start()
+
+    while pending or running:
+        start_ready()
+        while True:
+            try:
+                # Using a timeout so that the main thread stays
+                # responsive to KeyboardInterrupt
+                (index, (ok, res)) = events.get(True, 0.1)
+                break
+            except Queue.Empty:
+                pass
+        running.remove(index)
+        done.add(index)
+        if not ok:
+            # pylint: disable-msg=E0702
+            raise res[0], res[1], res[2]
+        yield (items[index], res)
@@ -52,6 +52,9 @@ def worktree_parser(parser):
     default_parser(parser)
     parser.add_argument("-w", "--worktree", "--work-tree", dest="worktree",
         help="Use a specific work tree path.")
+    parser.add_argument("--no-cache", dest="use_cache", action="store_false",
+        help="Do not use the cache of parsed projects in .qi/")
+    parser.set_defaults(use_cache=True)
 
 def project_parser(parser, positional=True):
     """Parser settings for every action using projects."""
@@ -81,6 +84,17 @@ def build_parser(parser, group=None, include_worktree_parser=True):
     group.add_argument("-c", "--config",
         help="The configuration to use. ")
 
+def foreach_parser(parser):
+    """Parser settings for running a command on several projects."""
+    group = parser.add_argument_group("foreach options")
+    group.add_argument("-j", "--jobs", dest="num_jobs", type=int, default=1,
+        help="Run the command on up to NUM_JOBS projects at the same time. "
+             "The output of each project is displayed when the command "
+             "is done")
+    group.add_argument("--live", action="store_true",
+        help="With -j, display the output as soon as it is produced, "
+             "prefixed by the project")
+
 def deploy_parser(parser):
     group = parser.add_argument_group("deploy options")
     group.add_argument("--url", dest="urls", action="append",
@@ -97,12 +111,14 @@ def get_worktree(args=None, raises=True):
 
     """
     wt_root = None
+    use_cache = True
     if args:
         wt_root = args.worktree
+        use_cache = getattr(args, "use_cache", True) is not False
     if not wt_root:
         wt_root = qisys.worktree.guess_worktree(raises=raises)
     if wt_root:
-        return qisys.worktree.WorkTree(wt_root)
+        return qisys.worktree.WorkTree(wt_root, use_cache=use_cache)
     else:
         return None
 
@@ -9,6 +9,7 @@
 import os
 import sys
 import argparse
+import ast
 import copy
 import operator
 
@@ -170,7 +171,10 @@ def _dump_arguments(name, args):
 def root_command_main(name, parser, modules, args=None, return_if_no_action=False):
     """name : name of the main program
        parser : an instance of ArgumentParser class
-       modules : list of Python modules
+       modules : list of Python modules, or of :py:class:`Action`
+
+    Only the module of the selected action is imported, and only its
+    parser is configured.
 
     """
     if not args:
@@ -179,43 +183,47 @@ def root_command_main(name, parser, modules, args=None, return_if_no_action=Fals
         dest="action",
         title="actions")
 
-    # A dict name -> python module for the the action
-    action_modules = dict()
+    # A dict name -> (Action, parser) for the action
+    action_parsers = dict()
 
     for module in modules:
-        try:
-            check_module(module)
-        except InvalidAction, err:
-            print "Warning, skipping", module.__name__
-            print err
-            continue
-        name = module.__name__.split(".")[-1]
-        # we want to type `foo bar-baz', and not type `foo bar_baz',
-        # even if "bar-baz" is not a valid module name.
-        name = name.replace("_", "-")
-        configurator = module.configure_parser
-        first_doc_line = module.__doc__.splitlines()[0]
-        action_parser = subparsers.add_parser(name, help=first_doc_line)
-        configurator(action_parser)
+        if isinstance(module, Action):
+            action = module
+        else:
+            try:
+                check_module(module)
+            except InvalidAction, err:
+                print "Warning, skipping", module.__name__
+                print err
+                continue
+            action = Action.from_module(module)
+        action_parser = subparsers.add_parser(action.name,
+                                              help=action.first_doc_line)
         action_parser.formatter_class = argparse.RawDescriptionHelpFormatter
-
-        doc_lines = module.__doc__.splitlines()
-        epilog = "\n".join(doc_lines[1:])
-        if epilog:
-            action_parser.epilog = first_doc_line + "\n" + epilog
-
-        action_modules[name] = module
+        action_parsers[action.name] = (action, action_parser)
 
     (help_requested, action) = parse_args_for_help(args)
+    if help_requested:
+        selected = action
+    else:
+        selected = _get_action_name(args)
+    if selected in action_parsers:
+        (selected_action, action_parser) = action_parsers[selected]
+        try:
+            _configure_action_parser(selected_action, action_parser)
+        except InvalidAction, err:
+            ui.error(err)
+            sys.exit(2)
+
     # if not action and return_if_no_action:
     #     return False
     if help_requested:
         if not action:
             parser.print_help()
         else:
-            if not action in action_modules:
+            if not action in action_parsers:
                 print "Invalid action!"
-                print "Choose between: ", " ".join(action_modules.keys())
+                print "Choose between: ", " ".join(sorted(action_parsers.keys()))
                 print
                 parser.print_help()
             else:
@@ -245,11 +253,35 @@ def root_command_main(name, parser, modules, args=None, return_if_no_action=Fals
 
     pargs = parser.parse_args(args)
     ui.configure_logging(pargs)
-    module = action_modules[pargs.action]
+    module = action_parsers[pargs.action][0].module
     _dump_arguments(module.__name__, pargs)
     main_wrapper(module, pargs)
     return True
 
+def _get_action_name(args):
+    """ The name of the action, which is the first argument
+    that is not an option, or None
+
+    """
+    for arg in args:
+        if not arg.startswith("-"):
+            return arg
+    return None
+
+def _configure_action_parser(action, action_parser):
+    """ Import the module of the action and let it add its options
+    to its parser
+
+    """
+    module = action.module
+    check_module(module)
+    module.configure_parser(action_parser)
+    doc_lines = module.__doc__.splitlines()
+    first_doc_line = doc_lines[0]
+    epilog = "\n".join(doc_lines[1:])
+    if epilog:
+        action_parser.epilog = first_doc_line + "\n" + epilog
+
 
 
 def check_module(module):
@@ -299,9 +331,7 @@ def action_modules_from_package(package_name):
     last_part = ".".join(splitted)
     package = __import__(package_name, globals(), locals(), [last_part])
     base_path = os.path.dirname(package.__file__)
-    module_paths = os.listdir(base_path)
-    module_paths = [x[:-3] for x in module_paths if x.endswith(".py")]
-    module_paths.remove("__init__")
+    module_paths = _list_action_modules(base_path)
     for module_path in module_paths:
         try:
             _tmp = __import__(package_name, globals(), locals(), [module_path], -1)
@@ -316,6 +346,161 @@ def action_modules_from_package(package_name):
 
 
 
+class Action(object):
+    """ An action of a package, described by the name of its
+    module and the first line of its doc string.
+    The module is only imported when needed.
+
+    """
+    def __init__(self, package_name, module_name, first_doc_line,
+                 module=None):
+        self.package_name = package_name
+        self.module_name = module_name
+        self.first_doc_line = first_doc_line
+        self._module = module
+
+    @classmethod
+    def from_module(cls, module):
+        """ Create an action from an already imported module """
+        (package_name, module_name) = module.__name__.rsplit(".", 1)
+        first_doc_line = module.__doc__.splitlines()[0].strip()
+        return cls(package_name, module_name, first_doc_line, module=module)
+
+    @property
+    def name(self):
+        """ The name of the action on the command line """
+        # we want to type `foo bar-baz', and not type `foo bar_baz',
+        # even if "bar-baz" is not a valid module name.
+        return self.module_name.replace("_", "-")
+
+    @property
+    def module(self):
+        """ The python module of the action """
+        if not self._module:
+            full_name = "%s.%s" % (self.package_name, self.module_name)
+            try:
+                _tmp = __import__(self.package_name, globals(), locals(),
+                                  [self.module_name])
+                self._module = getattr(_tmp, self.module_name)
+            except (ImportError, AttributeError), err:
+                raise InvalidAction(full_name, str(err))
+        return self._module
+
+    def __repr__(self):
+        return "<Action %s in %s>" % (self.name, self.package_name)
+
+
+ACTION_INDEX_MODULE = "_index"
+
+def actions_from_package(package_name):
+    """ Returns the list of :py:class:`Action` of a package,
+    without importing any action.
+
+    Names and doc strings are read from the ``_index`` module of
+    the package, generated by :py:func:`write_action_index`. If the
+    index does not list exactly the modules found in the package,
+    it is computed again by parsing the sources of the actions.
+
+    """
+    package = __import__(package_name, globals(), locals(), ["__name__"])
+    base_path = os.path.dirname(package.__file__)
+    module_names = _list_action_modules(base_path)
+    try:
+        _tmp = __import__(package_name, globals(), locals(),
+                          [ACTION_INDEX_MODULE])
+        index = getattr(_tmp, ACTION_INDEX_MODULE).ACTIONS
+    except (ImportError, AttributeError):
+        index = None
+    if index is None or set(x[0] for x in index) != set(module_names):
+        ui.debug("Action index of", package_name, "is out of date")
+        index = gen_action_index(package_name)
+    # Modules that are not valid actions have no doc line
+    return [Action(package_name, module_name, first_doc_line)
+            for (module_name, first_doc_line) in index
+            if first_doc_line is not None]
+
+def gen_action_index(package_name):
+    """ Compute the index of the actions of a package by parsing
+    their sources.
+
+    :return: a sorted list of (module name, first doc line), where
+             the first doc line is None if the module is not a valid
+             action
+
+    """
+    package = __import__(package_name, globals(), locals(), ["__name__"])
+    base_path = os.path.dirname(package.__file__)
+    res = list()
+    for module_name in sorted(_list_action_modules(base_path)):
+        full_name = "%s.%s" % (package_name, module_name)
+        module_path = os.path.join(base_path, module_name + ".py")
+        try:
+            first_doc_line = _read_action_doc(full_name, module_path)
+        except InvalidAction, err:
+            print "Warning, skipping", full_name
+            print err
+            first_doc_line = None
+        res.append((module_name, first_doc_line))
+    return res
+
+def write_action_index(package_name):
+    """ Write the ``_index.py`` file of a package containing actions
+
+    :return: the path of the file written
+
+    """
+    index = gen_action_index(package_name)
+    package = __import__(package_name, globals(), locals(), ["__name__"])
+    base_path = os.path.dirname(package.__file__)
+    to_write = """\
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+# Generated by qisys.script.write_action_index(). Do not edit.
+
+ACTIONS = [
+"""
+    for (module_name, first_doc_line) in index:
+        to_write += "    (%r, %r),\n" % (module_name, first_doc_line)
+    to_write += "]\n"
+    index_path = os.path.join(base_path, ACTION_INDEX_MODULE + ".py")
+    with open(index_path, "w") as fp:
+        fp.write(to_write)
+    return index_path
+
+def _read_action_doc(full_name, module_path):
+    """ Check that the source of a module looks like an action without
+    importing it, and return the first line of its doc string
+
+    """
+    with open(module_path, "r") as fp:
+        tree = ast.parse(fp.read(), module_path)
+    defined = set()
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef):
+            defined.add(node.name)
+        elif isinstance(node, ast.Assign):
+            defined.update(x.id for x in node.targets
+                           if isinstance(x, ast.Name))
+    for function in ("do", "configure_parser"):
+        if function not in defined:
+            raise InvalidAction(full_name,
+                                "Could not find a %s() method" % function)
+    doc = ast.get_docstring(tree, clean=False)
+    if doc is None:
+        raise InvalidAction(full_name, "No doc string")
+    return doc.splitlines()[0].strip()
+
+def _list_action_modules(base_path):
+    """ Names of the modules in the directory of an actions package """
+    res = list()
+    for filename in os.listdir(base_path):
+        if filename.endswith(".py") and not filename.startswith("_"):
+            res.append(filename[:-3])
+    return res
+
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
@@ -8,17 +8,31 @@
 
 __all__ = [ "DagError", "assert_dag", "topological_sort" ]
 
+from qisys import ui
+
 class DagError(Exception):
-    """ Dag Exception """
-    def __init__(self, node, parent, result):
+    """ Dag Exception
+
+    ``cycle`` is the full path of the cycle, starting and ending
+    with the same node
+
+    """
+    def __init__(self, cycle):
         Exception.__init__(self)
-        self.node   = node
-        self.parent = parent
-        self.result = result
+        self.cycle  = cycle
+        self.node   = cycle[0]
+        self.parent = cycle[-2]
 
     def __str__(self):
-        return "Circular dependency error: Starting from '%s', node '%s' depends on '%s', complete path %s" \
-               % (self.node, self.parent, self.node, self.result)
+        return "Circular dependency error: %s" % format_cycle(self.cycle)
+
+def format_cycle(cycle):
+    """ Format a cycle returned by the topological sort
+
+    >>> format_cycle(['a', 'b', 'a'])
+    'a -> b -> a'
+    """
+    return " -> ".join(str(x) for x in cycle)
 
 def assert_dag(data):
     """ Check if data is a dag
@@ -34,13 +48,11 @@ def assert_dag(data):
     ...   'e' : ( 'e', 'c' )})
     Traceback (most recent call last):
         ...
-    DagError: Circular dependency error: Starting from 'e', node 'e' depends on 'e', complete path []
+    DagError: Circular dependency error: e -> e
     """
+    _topological_sort(data, sorted(data.keys()), raise_exception=True)
 
-    for node, _ in data.items():
-        _topological_sort(data, node, node, True)
-
-def topological_sort(data, heads):
+def topological_sort(data, heads, allow_cycles=True):
     """ Topological sort
 
     data should be a dictionary like that (it's a dag):
@@ -53,10 +65,14 @@ def topological_sort(data, heads):
 
     This function return a list. Head will be the last element.
 
-    Warning: this sort always find a solution even is data is not a dag!!
-             If a depend on b and b depend on a, the solution is [ a, b ].
-             This is ok in our case but could be a problem in other situation.
-             (you know what? try to use the result you will see if it work!).
+    If data is not a dag and allow_cycles is False, raise a
+    :py:class:`DagError` containing the full path of the first cycle found.
+    Otherwise, cycles are broken where they are found (if a depend on b
+    and b depend on a, the solution is [ b, a ]) and a warning is
+    printed for each of them.
+
+    The sort is iterative and runs in O(V + E), so deep dependency
+    chains are fine.
 
     >>> topological_sort({
     ...   'head'         : ['telepathe', 'opennao-tools', 'naoqi'],
@@ -91,6 +107,14 @@ def topological_sort(data, heads):
     ... }, 'a')
     ['b', 'a']
 
+    >>> topological_sort({
+    ...   'a' : ( 'b' ),
+    ...   'b' : ( 'a' ),
+    ... }, 'a', allow_cycles=False)
+    Traceback (most recent call last):
+        ...
+    DagError: Circular dependency error: a -> b -> a
+
     >>> topological_sort({
     ...   'a' : ( 'g', 'b', 'c', 'd' ),
     ...   'b' : ( 'e', 'c' ),
@@ -107,36 +131,54 @@ def topological_sort(data, heads):
     ...   'e' : ( 'g', 'c' )}, [ 'a', 'q' ])
     ['g', 'c', 'e', 'b', 'd', 'a', 'u', 'y', 'o', 'i', 'q']
     """
-    if isinstance(heads, list):
-        data['internalfakehead'] = heads
-        head = 'internalfakehead'
-        result =  _topological_sort(data, head, head)
-        return [ x for x in result if x != 'internalfakehead' ]
-    else:
-        head = heads
-        return _topological_sort(data, head, head)
-
-def _topological_sort(data, head, top_node, raise_exception = False, result = None, visited = None):
+    if not isinstance(heads, list):
+        heads = [heads]
+    result, cycles = _topological_sort(data, heads,
+                                       raise_exception=not allow_cycles)
+    for cycle in cycles:
+        ui.warning("Circular dependency detected:", format_cycle(cycle))
+    return result
+
+def _topological_sort(data, heads, raise_exception=False):
     """ Internal function
+
+    Iterative depth-first search: returns the nodes in post-order,
+    and the list of the cycles found
+
     """
-    if not result:
-        result = []
-    if not visited:
-        visited = []
-    deps = data.get(head, list())
-    if head in visited:
-        if head == top_node and raise_exception:
-            raise DagError(head, head, result)
-        return result
-    visited.append(head)
-    for i in deps:
-        try:
-            result.index(i)
-        except ValueError:
-            #the item does not exist
-            result = _topological_sort(data, i, top_node, raise_exception, result, visited)
-    result.append(head)
-    return result
+    result = list()
+    cycles = list()
+    done = set()
+    # node -> position in the stack, for the nodes being visited
+    in_progress = dict()
+    for head in heads:
+        if head in done or head in in_progress:
+            continue
+        stack = [(head, iter(data.get(head, list())))]
+        path = [head]
+        in_progress[head] = 0
+        while stack:
+            node, deps = stack[-1]
+            for dep in deps:
+                if dep in done:
+                    continue
+                if dep in in_progress:
+                    cycle = path[in_progress[dep]:] + [dep]
+                    if raise_exception:
+                        raise DagError(cycle)
+                    cycles.append(cycle)
+                    continue
+                in_progress[dep] = len(path)
+                path.append(dep)
+                stack.append((dep, iter(data.get(dep, list()))))
+                break
+            else:
+                stack.pop()
+                path.pop()
+                del in_progress[node]
+                done.add(node)
+                result.append(node)
+    return result, cycles
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+import os
+import signal
+import sys
+import threading
+import time
+
+import qisys.command
+
+import pytest
+
+posix_only = pytest.mark.skipif(os.name != "posix", reason="POSIX only")
+
+def test_process_ok():
+    process = qisys.command.Process([sys.executable, "-c", "print 'hello'"])
+    process.run()
+    assert process.return_type == qisys.command.Process.OK
+    assert process.returncode == 0
+    assert process.out == "hello\n"
+
+def test_process_failed():
+    process = qisys.command.Process([sys.executable, "-c",
+                                     "import sys; sys.exit(3)"])
+    process.run()
+    assert process.return_type == qisys.command.Process.FAILED
+    assert process.returncode == 3
+
+def test_process_not_run(tmpdir):
+    process = qisys.command.Process([tmpdir.join("nosuchexe").strpath])
+    process.run()
+    assert process.return_type == qisys.command.Process.NOT_RUN
+    assert process.exception is not None
+
+@posix_only
+def test_process_killed_by_signal():
+    process = qisys.command.Process(["sh", "-c", "kill -SEGV $$"])
+    process.run()
+    assert process.return_type == qisys.command.Process.FAILED
+    assert process.returncode == -signal.SIGSEGV
+
+@posix_only
+def test_timeout_is_accurate():
+    process = qisys.command.Process(["sleep", "10"])
+    start = time.time()
+    process.run(timeout=0.2)
+    elapsed = time.time() - start
+    assert process.return_type == qisys.command.Process.TIME_OUT
+    assert process.returncode == -signal.SIGTERM
+    assert 0.2 <= elapsed < 0.7
+
+@posix_only
+def test_zombie(monkeypatch):
+    monkeypatch.setattr(qisys.command, "TERMINATE_GRACE_TIME", 0.2)
+    process = qisys.command.Process(["sh", "-c",
+                                     "trap '' TERM; echo ready; sleep 10"])
+    process.run(timeout=0.2)
+    assert process.return_type == qisys.command.Process.ZOMBIE
+    assert process.returncode == -signal.SIGKILL
+    assert process.out == "ready\n"
+
+@posix_only
+def test_supervise_many_processes_from_threads():
+    supervisor = qisys.command.Supervisor()
+    processes = list()
+    threads = list()
+    done = list()
+    def target(i):
+        process = qisys.command.Process([sys.executable, "-c",
+                                         "print %i" % i])
+        process.run(supervisor=supervisor)
+        processes.append((i, process))
+        done.append(i)
+        supervisor.wake()
+    for i in range(20):
+        thread = threading.Thread(target=target, args=(i,))
+        threads.append(thread)
+        thread.start()
+    try:
+        supervisor.loop(until=lambda: len(done) == 20)
+    finally:
+        supervisor.close()
+    for thread in threads:
+        thread.join()
+    for (i, process) in processes:
+        assert process.return_type == qisys.command.Process.OK
+        assert process.out == "%i\n" % i
+
+@posix_only
+def test_interrupted(monkeypatch):
+    monkeypatch.setattr(qisys.command, "SIGINT_EVENT", threading.Event())
+    supervisor = qisys.command.Supervisor()
+    process = qisys.command.Process(["sleep", "10"])
+    child = supervisor.start(process)
+    timer = threading.Timer(0.1, lambda: (qisys.command.SIGINT_EVENT.set(),
+                                          supervisor.wake()))
+    timer.start()
+    try:
+        supervisor.loop(until=child.is_done)
+    finally:
+        supervisor.close()
+    assert process.return_type == qisys.command.Process.INTERRUPTED
+
+@posix_only
+def test_abort_after_end_of_output(monkeypatch):
+    monkeypatch.setattr(qisys.command, "SIGINT_EVENT", threading.Event())
+    supervisor = qisys.command.Supervisor()
+    process = qisys.command.Process(["sh", "-c", "exec >&- 2>&-; sleep 10"])
+    child = supervisor.start(process)
+    def until():
+        if child.eof:
+            raise KeyboardInterrupt()
+        return False
+    try:
+        with pytest.raises(KeyboardInterrupt):
+            supervisor.loop(until=until)
+    finally:
+        supervisor.close()
+    assert process.return_type == qisys.command.Process.INTERRUPTED
+    # The closed fd is not watched again
+    assert not supervisor._by_fd
+
+def test_output_tail():
+    tail = qisys.command.OutputTail(max_size=10)
+    for i in range(100):
+        tail.write("%03d\n" % i)
+    assert tail.getvalue() == "7\n098\n099\n"
+    tail = qisys.command.OutputTail(max_size=10)
+    tail.write("x" * 100)
+    assert tail.getvalue() == "x" * 10
+    tail = qisys.command.OutputTail()
+    tail.write("foo")
+    tail.write("bar")
+    assert tail.getvalue() == "foobar"
+
+def test_output_streamed_to_log_file(tmpdir):
+    log_file = tmpdir.join("out.log")
+    process = qisys.command.Process([sys.executable, "-c",
+                                     "for i in range(100000): print i"],
+                                    log_file=log_file.strpath,
+                                    tail_size=100)
+    process.run()
+    assert process.return_type == qisys.command.Process.OK
+    expected = "".join("%i\n" % i for i in range(100000))
+    assert log_file.read() == expected
+    assert process.out_size == len(expected)
+    assert process.out == expected[-100:]
@@ -0,0 +1,113 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+import threading
+import time
+
+import qisys.parallel
+
+import pytest
+
+def test_results_are_in_order():
+    def func(x):
+        # the first items finish last
+        time.sleep(0.01 * (5 - x))
+        return x * 2
+    res = list(qisys.parallel.imap_ordered(func, range(6), num_jobs=4))
+    assert res == [(x, x * 2) for x in range(6)]
+
+def test_runs_in_parallel():
+    second_started = threading.Event()
+    def func(x):
+        # the first item waits for the second one to start
+        if x == 0:
+            return second_started.wait(5)
+        second_started.set()
+        return True
+    res = list(qisys.parallel.imap_ordered(func, [0, 1], num_jobs=2))
+    assert res == [(0, True), (1, True)]
+
+def test_exception_is_raised_when_reached():
+    started = list()
+    def func(x):
+        started.append(x)
+        if x == 1:
+            raise Exception("Kaboom")
+        time.sleep(0.05)
+        return x
+    results = qisys.parallel.imap_ordered(func, range(20), num_jobs=2)
+    assert next(results) == (0, 0)
+    # pylint: disable-msg=E1101
+    with pytest.raises(Exception) as e:
+        next(results)
+    assert "Kaboom" in str(e.value)
+    time.sleep(0.1)
+    assert len(started) < 20
+
+def test_serial_is_lazy():
+    started = list()
+    def func(x):
+        started.append(x)
+        return x
+    results = qisys.parallel.imap_ordered(func, range(3), num_jobs=1)
+    assert started == list()
+    assert next(results) == (0, 0)
+    assert started == [0]
+
+def test_max_ahead():
+    started = list()
+    def func(x):
+        started.append(x)
+        if x == 0:
+            time.sleep(0.05)
+        return x
+    results = qisys.parallel.imap_ordered(func, range(10), num_jobs=4,
+                                          max_ahead=2)
+    for (x, _) in results:
+        # only the two items following the one being yielded may
+        # have been started
+        assert max(started) <= x + 2
+    assert sorted(started) == range(10)
+
+def test_unordered_respects_dependencies():
+    deps = {"a": [], "b": ["a"], "c": ["a"], "d": ["b", "c"], "e": []}
+    started = list()
+    finished = list()
+    lock = threading.Lock()
+    def func(x):
+        with lock:
+            assert set(deps[x]) <= set(finished)
+            started.append(x)
+        time.sleep(0.01)
+        with lock:
+            finished.append(x)
+        return x
+    results = qisys.parallel.imap_unordered(func, sorted(deps), num_jobs=3,
+                                            depends=lambda x: deps[x])
+    done = [x for (x, _) in results]
+    assert sorted(done) == sorted(deps)
+    assert done.index("a") < done.index("b") < done.index("d")
+    assert done.index("c") < done.index("d")
+    # a and e have no dependencies, and start at once
+    assert sorted(started[:2]) == ["a", "e"]
+
+def test_unordered_circular_dependencies():
+    deps = {"a": ["b"], "b": ["a"]}
+    results = qisys.parallel.imap_unordered(lambda x: x, ["a", "b"],
+                                            num_jobs=2,
+                                            depends=lambda x: deps[x])
+    assert [x for (x, _) in results] == ["a", "b"]
+
+def test_unordered_stops_on_error():
+    started = list()
+    def func(x):
+        started.append(x)
+        if x == 0:
+            raise Exception("Kaboom")
+        return x
+    results = qisys.parallel.imap_unordered(func, range(10), num_jobs=1)
+    # pylint: disable-msg=E1101
+    with pytest.raises(Exception):
+        list(results)
+    assert started == [0]
@@ -0,0 +1,103 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+import os
+import subprocess
+import sys
+
+import qisys
+import qisys.script
+
+import pytest
+
+TOOLS = ["qibuild", "qidoc", "qilinguist", "qimvn", "qipkg", "qipy",
+         "qisrc", "qitest", "qitoolchain"]
+
+ACTION = '''\
+""" Do %s
+
+Longer description
+"""
+
+import qisys.parsers
+
+def configure_parser(parser):
+    qisys.parsers.default_parser(parser)
+    parser.add_argument("--%s", action="store_true")
+
+def do(args):
+    return "%s"
+'''
+
+@pytest.fixture
+def actions_package(tmpdir, monkeypatch):
+    """ A 'foo.actions' package with a 'spam' and an 'eggs' action """
+    actions = tmpdir.join("foo", "actions")
+    actions.ensure("__init__.py", file=True)
+    tmpdir.join("foo", "__init__.py").ensure(file=True)
+    for name in ["spam", "eggs"]:
+        actions.join(name + ".py").write(ACTION % (name, name, name))
+    monkeypatch.syspath_prepend(tmpdir.strpath)
+    yield actions
+    for name in list(sys.modules):
+        if name == "foo" or name.startswith("foo."):
+            del sys.modules[name]
+
+@pytest.mark.parametrize("tool", TOOLS)
+def test_action_index_is_up_to_date(tool):
+    # If this fails, run tools/gen_action_index.py
+    package_name = tool + ".actions"
+    _tmp = __import__(package_name, globals(), locals(), ["_index"])
+    # pylint: disable-msg=E1101
+    assert _tmp._index.ACTIONS == qisys.script.gen_action_index(package_name)
+
+def test_index_is_used(actions_package):
+    qisys.script.write_action_index("foo.actions")
+    actions = qisys.script.actions_from_package("foo.actions")
+    assert [x.name for x in actions] == ["eggs", "spam"]
+    assert actions[1].first_doc_line == "Do spam"
+    assert "foo.actions.spam" not in sys.modules
+
+def test_stale_index(actions_package):
+    qisys.script.write_action_index("foo.actions")
+    actions_package.join("bar_baz.py").write(ACTION % ("bar", "bar", "bar"))
+    actions = qisys.script.actions_from_package("foo.actions")
+    assert [x.name for x in actions] == ["bar-baz", "eggs", "spam"]
+
+def test_invalid_actions_are_skipped(actions_package):
+    actions_package.join("helpers.py").write("def do(): pass\n")
+    qisys.script.write_action_index("foo.actions")
+    actions = qisys.script.actions_from_package("foo.actions")
+    assert [x.name for x in actions] == ["eggs", "spam"]
+
+def test_only_selected_action_is_imported(actions_package):
+    actions = qisys.script.actions_from_package("foo.actions")
+    qisys.script.root_command_main("foo", qisys.script.argparse.ArgumentParser(),
+                                   actions, args=["spam", "--spam"])
+    assert "foo.actions.spam" in sys.modules
+    assert "foo.actions.eggs" not in sys.modules
+
+def test_help_does_not_import_actions():
+    # Run in a separate process, since other tests already imported
+    # lots of actions
+    python_dir = os.path.dirname(os.path.dirname(qisys.__file__))
+    code = """\
+import sys
+sys.argv = ["qibuild", "--help"]
+import qisys.main
+try:
+    qisys.main.main()
+except SystemExit:
+    pass
+imported = [x for x in sys.modules if x.startswith("qibuild.actions.")
+            and sys.modules[x] and x != "qibuild.actions._index"]
+sys.stderr.write(" ".join(imported))
+"""
+    env = os.environ.copy()
+    env["PYTHONPATH"] = python_dir
+    process = subprocess.Popen([sys.executable, "-c", code], env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    (out, err) = process.communicate()
+    assert "add-config" in out
+    assert err == ""
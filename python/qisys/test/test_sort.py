@@ -0,0 +1,52 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+import sys
+
+import pytest
+
+import qisys.sort
+
+def test_deep_chain():
+    depth = sys.getrecursionlimit() * 2
+    data = dict()
+    for i in range(depth):
+        data[i] = [i + 1]
+    res = qisys.sort.topological_sort(data, [0])
+    assert res == list(reversed(range(depth + 1)))
+
+def test_keeps_order_of_deps():
+    data = {
+        "a" : ["d", "c", "b"],
+        "b" : ["c"],
+    }
+    assert qisys.sort.topological_sort(data, ["a"]) == ["d", "c", "b", "a"]
+
+def test_cycle_is_reported(record_messages):
+    data = {
+        "a" : ["b"],
+        "b" : ["c"],
+        "c" : ["a"],
+    }
+    res = qisys.sort.topological_sort(data, ["a"])
+    assert res == ["c", "b", "a"]
+    assert record_messages.find("Circular dependency detected: a -> b -> c -> a")
+
+def test_cycle_raises_when_not_allowed():
+    data = {
+        "a" : ["b"],
+        "b" : ["c"],
+        "c" : ["b"],
+    }
+    # pylint: disable-msg=E1101
+    with pytest.raises(qisys.sort.DagError) as e:
+        qisys.sort.topological_sort(data, ["a"], allow_cycles=False)
+    assert e.value.cycle == ["b", "c", "b"]
+    assert str(e.value) == "Circular dependency error: b -> c -> b"
+
+def test_assert_dag():
+    qisys.sort.assert_dag({"a" : ["b"], "b" : ["c"]})
+    # pylint: disable-msg=E1101
+    with pytest.raises(qisys.sort.DagError):
+        qisys.sort.assert_dag({"a" : ["b"], "b" : ["a"]})
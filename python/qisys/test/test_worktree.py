@@ -173,3 +173,89 @@ def test_warns_on_nested_worktrees(tmpdir, record_messages):
 def test_non_ascii_path(tmpdir):
     coffee_dir = tmpdir.mkdir("café")
     wt = qisys.worktree.WorkTree(coffee_dir.strpath)
+
+def test_projects_cache(tmpdir):
+    a_project = tmpdir.mkdir("a")
+    a_project.join("qiproject.xml").write("""
+<project>
+    <project src="b" />
+</project>
+""")
+    a_project.mkdir("b")
+    wt = qisys.worktree.WorkTree(tmpdir.strpath)
+    wt.add_project("a")
+    assert [p.src for p in wt.projects] == ["a", "a/b"]
+
+    with mock.patch("qisys.project.WorkTreeProject.parse_qiproject_xml") as m:
+        wt2 = qisys.worktree.WorkTree(tmpdir.strpath)
+        assert not m.called
+    assert [p.src for p in wt2.projects] == ["a", "a/b"]
+
+def test_projects_cache_changed_qiproject(tmpdir):
+    a_project = tmpdir.mkdir("a")
+    a_xml = a_project.join("qiproject.xml")
+    a_xml.write("<project />\n")
+    a_project.mkdir("b")
+    a_project.mkdir("c")
+    a_project.join("c", "qiproject.xml").write("<project />\n")
+    wt = qisys.worktree.WorkTree(tmpdir.strpath)
+    wt.add_project("a")
+    assert [p.src for p in wt.projects] == ["a"]
+
+    a_xml.write("""
+<project>
+    <project src="b" />
+    <project src="c" />
+</project>
+""")
+    parsed = list()
+    def fake_parse(self):
+        parsed.append(self.src)
+        return real_parse(self)
+    real_parse = qisys.project.WorkTreeProject.parse_qiproject_xml
+    with mock.patch("qisys.project.WorkTreeProject.parse_qiproject_xml",
+                    fake_parse):
+        wt2 = qisys.worktree.WorkTree(tmpdir.strpath)
+    assert [p.src for p in wt2.projects] == ["a", "a/b", "a/c"]
+    assert parsed == ["a", "a/b", "a/c"]
+
+    parsed = list()
+    with mock.patch("qisys.project.WorkTreeProject.parse_qiproject_xml",
+                    fake_parse):
+        wt3 = qisys.worktree.WorkTree(tmpdir.strpath)
+    assert [p.src for p in wt3.projects] == ["a", "a/b", "a/c"]
+    assert parsed == list()
+
+def test_projects_cache_removed_subproject(tmpdir):
+    a_project = tmpdir.mkdir("a")
+    a_project.join("qiproject.xml").write("""
+<project>
+    <project src="b" />
+</project>
+""")
+    b_project = a_project.mkdir("b")
+    wt = qisys.worktree.WorkTree(tmpdir.strpath)
+    wt.add_project("a")
+    b_project.remove()
+    # pylint: disable-msg=E1101
+    with pytest.raises(qisys.worktree.WorkTreeError) as e:
+        qisys.worktree.WorkTree(tmpdir.strpath)
+    assert "invalid sub project" in e.value.message
+
+def test_no_cache(tmpdir):
+    tmpdir.mkdir("a")
+    wt = qisys.worktree.WorkTree(tmpdir.strpath, use_cache=False)
+    wt.add_project("a")
+    assert not os.path.exists(wt.projects_cache_path)
+    with mock.patch("qisys.project.WorkTreeProject.parse_qiproject_xml") as m:
+        qisys.worktree.WorkTree(tmpdir.strpath, use_cache=False)
+        assert m.called
+
+def test_get_project_after_changes(worktree):
+    worktree.create_project("foo")
+    worktree.create_project("bar")
+    assert worktree.get_project("foo").src == "foo"
+    worktree.remove_project("foo")
+    assert not worktree.has_project("foo")
+    assert worktree.get_project("foo") is None
+    assert worktree.get_project("bar").src == "bar"
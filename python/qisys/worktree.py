@@ -7,6 +7,7 @@
 """
 
 import abc
+import json
 import locale
 import os
 import ntpath
@@ -25,12 +26,14 @@ import qibuild.config
 
 class WorkTree(object):
     """ This class represent a :term:`worktree`. """
-    def __init__(self, root, sanity_check=True):
+    def __init__(self, root, sanity_check=True, use_cache=True):
         """
         Construct a new worktree
 
         :param root: The root directory of the worktree.
         :param allow_nested: Allow nested worktrees.
+        :param use_cache: Re-use the projects parsed during a previous
+                          run (stored in .qi/worktree-cache.json)
 
         """
         if not os.path.exists(root):
@@ -40,8 +43,12 @@ This path does not exist
 """.format(root))
 
         self._observers = list()
+        self._projects_by_src = dict()
         self.root = root
+        self.use_cache = use_cache
         self.cache = self.load_cache()
+        self.projects_cache = ProjectsCache(self.projects_cache_path,
+                                            enabled=use_cache)
         # Re-parse every qiproject.xml to visit the subprojects
         self.projects = list()
         self.load_projects()
@@ -109,27 +116,66 @@ This path does not exist
                 fp.write("<worktree />")
         return worktree_xml
 
+    @property
+    def projects_cache_path(self):
+        """Get the path to .qi/worktree-cache.json """
+        return os.path.join(self.dot_qi, "worktree-cache.json")
+
     def has_project(self, path):
         src = self.normalize_path(path)
-        srcs = (p.src for p in self.projects)
-        return src in srcs
+        return src in self._projects_by_src
 
     def load_projects(self):
         """ For every project in cache, re-read the subprojects and
         and them to the list
 
+        Only the qiproject.xml files that changed since the last
+        call are re-parsed, see :py:class:`ProjectsCache`
+
         """
         self.projects = list()
+        cached_srcs = self.projects_cache.get_all_srcs(self.worktree_xml)
+        if cached_srcs is not None:
+            projects = [qisys.project.WorkTreeProject(self, x)
+                        for x in cached_srcs]
+            up_to_date = [self._parse_qiproject_xml(x) for x in projects]
+            if all(up_to_date):
+                self._set_projects(projects)
+                return
+
         srcs = self.cache.get_srcs()
         for src in srcs:
             project = qisys.project.WorkTreeProject(self, src)
-            project.parse_qiproject_xml()
+            self._parse_qiproject_xml(project)
             self.projects.append(project)
 
         res = set(self.projects)
         for project in self.projects:
             self._rec_parse_sub_projects(project, res)
-        self.projects = sorted(res, key=operator.attrgetter("src"))
+        self._set_projects(sorted(res, key=operator.attrgetter("src")))
+        self.projects_cache.set_all_srcs(self.worktree_xml,
+                                         [x.src for x in self.projects])
+        self.projects_cache.save()
+
+    def _set_projects(self, projects):
+        """ Set the list of projects and the src -> project index """
+        self.projects = projects
+        self._projects_by_src = dict((x.src, x) for x in projects)
+
+    def _parse_qiproject_xml(self, project):
+        """ Fill the subprojects of the project, using the cache
+        when the qiproject.xml did not change.
+
+        Return False if the qiproject.xml had to be parsed
+
+        """
+        subprojects = self.projects_cache.get_subprojects(project)
+        if subprojects is not None:
+            project.subprojects = subprojects
+            return True
+        project.parse_qiproject_xml()
+        self.projects_cache.set_subprojects(project)
+        return False
 
     def _rec_parse_sub_projects(self, project, res):
         """ Recursively parse every project and subproject,
@@ -140,7 +186,7 @@ This path does not exist
             src = os.path.join(project.src, sub_project_src)
             src = qisys.sh.to_posix_path(src)
             sub_project = qisys.project.WorkTreeProject(self, src)
-            sub_project.parse_qiproject_xml()
+            self._parse_qiproject_xml(sub_project)
             res.add(sub_project)
             self._rec_parse_sub_projects(sub_project, res)
 
@@ -154,14 +200,14 @@ This path does not exist
 
         """
         src = self.normalize_path(src)
-        if not self.has_project(src):
+        project = self._projects_by_src.get(src)
+        if project is None:
             if not raises:
                 return None
             mess  = ui.did_you_mean("No project in '%s'\n" % src,
                                     src, [x.src for x in self.projects])
             raise WorkTreeError(mess)
-        match = (p for p in self.projects if p.src == src)
-        return match.next()
+        return project
 
     def add_project(self, path):
         """ Add a project to a worktree
@@ -325,6 +371,154 @@ class WorkTreeCache:
             srcs.append(qisys.qixml.parse_required_attr(project_elem, "src"))
         return srcs
 
+class ProjectsCache(object):
+    """ Remember the sub projects found in every qiproject.xml
+    of the worktree, along with the mtime and size of the files
+    they were read from, so that only modified files get
+    parsed again.
+
+    The list of all the projects is also stored, and re-used as is
+    as long as neither .qi/worktree.xml nor any qiproject.xml changed.
+
+    """
+    version = 1
+
+    def __init__(self, json_path, enabled=True):
+        self.json_path = json_path
+        self.enabled = enabled
+        self._dirty = False
+        self.data = self._empty()
+        if enabled:
+            self.load()
+
+    def _empty(self):
+        return {"version": self.version,
+                "worktree_xml": None,
+                "srcs": None,
+                "projects": dict()}
+
+    def load(self):
+        """ Read the cache from disk. Discard it if it is unreadable """
+        if not os.path.exists(self.json_path):
+            return
+        try:
+            with open(self.json_path, "r") as fp:
+                data = json.load(fp)
+        except (IOError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != self.version:
+            return
+        self.data = data
+
+    def save(self):
+        """ Write the cache to disk if it has changed """
+        if not self.enabled or not self._dirty:
+            return
+        to_write = self.json_path + ".tmp"
+        try:
+            with open(to_write, "w") as fp:
+                json.dump(self.data, fp)
+            qisys.sh.mv(to_write, self.json_path)
+        except (IOError, OSError) as e:
+            ui.debug("Could not write worktree cache:", e)
+            return
+        self._dirty = False
+
+    def get_all_srcs(self, worktree_xml):
+        """ Return the sorted list of all the projects sources, or None
+        if it may be out of date
+
+        """
+        if not self.enabled:
+            return None
+        if self.data["worktree_xml"] != get_stamp(worktree_xml):
+            return None
+        srcs = self.data["srcs"]
+        if srcs is None:
+            return None
+        for src in srcs:
+            entry = self.data["projects"].get(src)
+            if not entry:
+                return None
+
+        return [_to_str(x) for x in srcs]
+
+    def set_all_srcs(self, worktree_xml, srcs):
+        """ Store the list of all the projects sources, and forget
+        about the projects that are no longer in the worktree
+
+        """
+        if not self.enabled:
+            return
+        if self.data["srcs"] == srcs and \
+           self.data["worktree_xml"] == get_stamp(worktree_xml):
+            return
+        self.data["worktree_xml"] = get_stamp(worktree_xml)
+        self.data["srcs"] = srcs
+        projects = self.data["projects"]
+        to_keep = set(srcs)
+        for src in projects.keys():
+            if src not in to_keep:
+                del projects[src]
+        self._dirty = True
+
+    def get_subprojects(self, project):
+        """ Return the list of subprojects of the given project, or
+        None if the qiproject.xml has changed since it was stored
+
+        """
+        if not self.enabled:
+            return None
+        entry = self.data["projects"].get(project.src)
+        if not entry:
+            return None
+        project_path = project.path
+        qiproject_xml = os.path.join(project_path, "qiproject.xml")
+        if entry["stamp"] != get_stamp(qiproject_xml):
+            return None
+        subprojects = entry["subprojects"]
+        # A sub project may have been removed without touching
+        # the qiproject.xml: let parse_qiproject_xml() report the error
+        for sub_src in subprojects:
+            if not os.path.exists(os.path.join(project_path, sub_src)):
+                return None
+        return [_to_str(x) for x in subprojects]
+
+    def set_subprojects(self, project):
+        """ Store the subprojects of the given project """
+        if not self.enabled:
+            return
+        self.data["projects"][project.src] = {
+            "stamp" : get_stamp(project.qiproject_xml),
+            "subprojects" : project.subprojects,
+        }
+        # The list of all sources depends on this project
+        self.data["srcs"] = None
+        self._dirty = True
+
+
+def get_stamp(path):
+    """ Return a (mtime, size) list for the given path,
+    or None if it does not exist
+
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime, st.st_size]
+
+def _to_str(value):
+    """ json gives back unicode strings, but ElementTree returns
+    str for ASCII values: do the same
+
+    """
+    try:
+        return str(value)
+    except UnicodeEncodeError:
+        return value
+
+
 class WorkTreeError(Exception):
     """ Just a custom exception. """
 
@@ -4,6 +4,9 @@
 
 """ Launch automatic tests
 
+When running the tests of several projects with ``-j``, every test goes
+in the same queue, so that the workers are shared between the projects.
+
 """
 
 import argparse
@@ -15,6 +18,7 @@ import qisys.parsers
 import qibuild.test_runner
 import qibuild.gcov
 import qitest.parsers
+import qitest.runner
 import qitest.actions.list
 
 def configure_parser(parser):
@@ -26,8 +30,14 @@ def configure_parser(parser):
 def do(args):
     """Main entry point"""
     test_runners = qitest.parsers.get_test_runners(args)
-    global_res = True
     n = len(test_runners)
+    if n > 1 and args.num_jobs > 1 and not args.coverage:
+        ui.info(ui.bold, "::", ui.reset, "Running tests in", n, "projects")
+        test_runner = qitest.runner.MultiProjectTestRunner(test_runners)
+        if not test_runner.run():
+            sys.exit(1)
+        return
+    global_res = True
     for i, test_runner in enumerate(test_runners):
         if n != 1:
             ui.info(ui.bold, "::", "[%i on %i]" % (i + 1, len(test_runners)),
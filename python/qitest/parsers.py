@@ -12,6 +12,7 @@ from qisys import ui
 import qisys.parsers
 import qibuild.parsers
 import qitest.project
+import qitest.timings
 
 def test_parser(parser, with_num_jobs=True):
     qisys.parsers.worktree_parser(parser)
@@ -42,6 +43,17 @@ def test_parser(parser, with_num_jobs=True):
     if with_num_jobs:
         group.add_argument("-j", dest="num_jobs", default=1, type=int,
                             help="Number of tests to run in parallel")
+        group.add_argument("--default-test-time", dest="default_estimate",
+                            type=float,
+                            default=qitest.timings.DEFAULT_ESTIMATE,
+                            help="Expected duration in seconds of the tests "
+                                 "that never ran. When running in parallel, "
+                                 "the longest tests are started first "
+                                 "(default: %(default)s)")
+        group.add_argument("--shard-large-tests", dest="shard_large_tests",
+                            action="store_true",
+                            help="Split the gtest having a 'shard' option "
+                                 "into shards running in parallel")
     return group
 
 def get_test_runner(args, build_project=None, qitest_json=None):
@@ -81,6 +93,16 @@ def get_test_runner(args, build_project=None, qitest_json=None):
     test_runner.nightly = args.nightly
     test_runner.nightmare = args.nightmare
     test_runner.root_output_dir = args.root_output_dir
+    test_runner.shard_large_tests = vars(args).get("shard_large_tests", False)
+    test_runner.default_estimate = vars(args).get("default_estimate",
+                                                  qitest.timings.DEFAULT_ESTIMATE)
+    worktree = None
+    if build_project:
+        worktree = build_project.build_worktree.worktree
+    else:
+        worktree = qisys.parsers.get_worktree(args, raises=False)
+    if worktree:
+        test_runner.timings_path = qitest.timings.get_timings_path(worktree)
 
     return test_runner
 
@@ -11,3 +11,5 @@ class TestResult:
         self.time = 0
         self.ok = False
         self.message = list()
+        # Path to the file containing the whole output of the test, if any
+        self.log_file = None
@@ -6,7 +6,9 @@ import re
 import os
 
 from qisys import ui
+import qitest.shard
 import qitest.test_queue
+import qitest.timings
 
 class TestSuiteRunner(object):
     """ Interface for a class able to run a test suite """
@@ -23,6 +25,11 @@ class TestSuiteRunner(object):
         self.coverage = False
         self.nightmare = False
         self.root_output_dir = None
+        # Split the gtest having a 'shard' option
+        self.shard_large_tests = False
+        # Path to the qitest.timings.TestTimings database, if any
+        self.timings_path = None
+        self.default_estimate = qitest.timings.DEFAULT_ESTIMATE
         self._tests = project.tests
 
     @abc.abstractproperty
@@ -37,11 +44,30 @@ class TestSuiteRunner(object):
         Return True if and only if the whole suite passed.
 
         """
-        test_queue = qitest.test_queue.TestQueue(self.tests)
+        timings = None
+        if self.timings_path:
+            timings = qitest.timings.TestTimings(self.timings_path)
+        test_queue = qitest.test_queue.TestQueue(
+            self.queued_tests(), timings=timings, timing_key=self.timing_key,
+            default_estimate=self.default_estimate)
         test_queue.launcher = self.launcher
         ok = test_queue.run(num_jobs=self.num_jobs)
         return ok
 
+    def queued_tests(self):
+        """ The tests to put in the queue: the large gtest are replaced
+        by their shards if required
+
+        """
+        tests = self.tests
+        if self.shard_large_tests:
+            tests = qitest.shard.split_tests(tests, self.num_jobs)
+        return tests
+
+    def timing_key(self, test):
+        """ The key of the test in the timings database """
+        return qitest.timings.get_key(self.project.name, test)
+
     @property
     def patterns(self):
         return self._patterns
@@ -73,12 +99,126 @@ class TestLauncher(object):
         # Set by the test suite, the launcher may need to know about its woker
         # index
         self.worker_index = None
+        # Set by the test queue: the qisys.command.Supervisor watching
+        # the processes of the tests, if any
+        self.supervisor = None
 
     @abc.abstractmethod
     def launch(self, test):
         """ Should return a :py:class:`.TestResult` """
         pass
 
+    def merge_shards(self, test, shards):
+        """ Called once the shards of the test have run, with a list
+        of (shard, result) tuples sorted by shard index.
+        Should return a :py:class:`.TestResult` for the whole test
+
+        """
+        return qitest.shard.merge_results(test, shards)
+
+
+class MultiProjectTestRunner(object):
+    """ Run the tests of several :py:class:`TestSuiteRunner` in a
+    single :py:class:`qitest.test_queue.TestQueue`, so that they
+    share the same workers.
+
+    Each test is still run by the launcher of its suite runner,
+    so the results are written in the usual directories.
+
+    """
+    def __init__(self, test_runners):
+        self.test_runners = test_runners
+        self.num_jobs = 1
+        if test_runners:
+            self.num_jobs = max(x.num_jobs for x in test_runners)
+
+    def run(self):
+        """ Run all the tests.
+        Return True if and only if every suite passed.
+
+        """
+        launcher = MultiProjectLauncher()
+        tests = list()
+        for test_runner in self.test_runners:
+            tests.extend(launcher.add_suite(test_runner))
+        timings = None
+        default_estimate = qitest.timings.DEFAULT_ESTIMATE
+        for test_runner in self.test_runners:
+            default_estimate = test_runner.default_estimate
+            if test_runner.timings_path:
+                timings = qitest.timings.TestTimings(test_runner.timings_path)
+                break
+        test_queue = qitest.test_queue.TestQueue(
+            tests, timings=timings, timing_key=launcher.timing_key,
+            default_estimate=default_estimate)
+        test_queue.launcher = launcher
+        return test_queue.run(num_jobs=self.num_jobs)
+
+
+class MultiProjectLauncher(TestLauncher):
+    """ Implements :py:class:`TestLauncher` for a
+    :py:class:`MultiProjectTestRunner`.
+
+    The tests of the queue wrap the tests of the suites: their name is
+    prefixed by the name of the project, and they know the launcher of
+    their suite runner.
+
+    """
+    def __init__(self):
+        super(MultiProjectLauncher, self).__init__()
+        self._launchers = list()
+        self._runners = list()
+
+    def add_suite(self, test_runner):
+        """ Return the tests of the queue for the given suite runner """
+        index = len(self._runners)
+        self._runners.append(test_runner)
+        self._launchers.append(test_runner.launcher)
+        prefix = test_runner.project.name
+        if not prefix:
+            prefix = os.path.basename(test_runner.cwd)
+        wrapped = dict()
+        def wrap(test):
+            res = wrapped.get(id(test))
+            if res:
+                return res
+            res = {
+                "name" : "%s/%s" % (prefix, test["name"]),
+                "test" : test,
+                "suite_index" : index,
+            }
+            sharded_from = test.get("sharded_from")
+            if sharded_from:
+                res["sharded_from"] = wrap(sharded_from)
+                res["shard_index"] = test["shard_index"]
+                res["num_shards"] = test["num_shards"]
+            wrapped[id(test)] = res
+            return res
+        return [wrap(x) for x in test_runner.queued_tests()]
+
+    def timing_key(self, test):
+        test_runner = self._runners[test["suite_index"]]
+        return test_runner.timing_key(test["test"])
+
+    def launch(self, test):
+        launcher = self._get_launcher(test)
+        res = launcher.launch(test["test"])
+        res.test = test
+        return res
+
+    def merge_shards(self, test, shards):
+        launcher = self._get_launcher(test)
+        res = launcher.merge_shards(test["test"], [(shard["test"], result)
+                                                   for (shard, result) in shards])
+        res.test = test
+        return res
+
+    def _get_launcher(self, test):
+        launcher = self._launchers[test["suite_index"]]
+        launcher.worker_index = self.worker_index
+        launcher.supervisor = self.supervisor
+        return launcher
+
 
 def match_patterns(patterns, name):
     if not patterns:
@@ -0,0 +1,151 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" Split big gtest binaries into shards that can run in parallel
+
+Each shard is a copy of the test running a subset of the test cases,
+selected by gtest itself using the ``GTEST_TOTAL_SHARDS`` and
+``GTEST_SHARD_INDEX`` environment variables.
+
+"""
+
+import copy
+
+from qisys import ui
+from qisys.qixml import etree
+import qitest.result
+
+# Attributes summed when merging JUnit XML elements
+COUNTERS = ["tests", "failures", "disabled", "errors"]
+
+
+def get_num_shards(test, num_jobs):
+    """ The number of shards the test should be split into.
+    There is no point in having more shards than workers
+
+    """
+    if not test.get("gtest"):
+        return 1
+    num_shards = test.get("shard")
+    if not num_shards:
+        return 1
+    return max(1, min(int(num_shards), num_jobs))
+
+
+def split_tests(tests, num_jobs):
+    """ Replace each test having a ``shard`` option by its shards """
+    res = list()
+    for test in tests:
+        num_shards = get_num_shards(test, num_jobs)
+        if num_shards == 1:
+            res.append(test)
+        else:
+            res.extend(split_test(test, num_shards))
+    return res
+
+
+def split_test(test, num_shards):
+    """ Return a list of ``num_shards`` tests. Each of them has
+    a ``sharded_from`` key pointing to the original test
+
+    """
+    res = list()
+    for i in range(num_shards):
+        shard = copy.deepcopy(test)
+        shard["name"] = get_shard_name(test, i)
+        environment = shard.get("environment") or dict()
+        environment["GTEST_TOTAL_SHARDS"] = str(num_shards)
+        environment["GTEST_SHARD_INDEX"] = str(i)
+        shard["environment"] = environment
+        shard["sharded_from"] = test
+        shard["shard_index"] = i
+        shard["num_shards"] = num_shards
+        res.append(shard)
+    return res
+
+
+def get_shard_name(test, index):
+    return "%s_shard%i" % (test["name"], index)
+
+
+def merge_results(test, shards):
+    """ Merge the results of the shards of the test into one
+    :py:class:`qitest.result.TestResult`
+
+    :param shards: a list of (shard, result) tuples, sorted by
+                   shard index
+
+    """
+    results = [result for (_, result) in shards]
+    res = qitest.result.TestResult(test)
+    res.time = sum(x.time for x in results)
+    outs = [getattr(x, "out", None) for x in results]
+    if any(outs):
+        res.out = "".join(x for x in outs if x)
+    if any(x.ok is None for x in results):
+        res.ok = None
+    else:
+        res.ok = all(x.ok for x in results)
+    failures = [(shard, result) for (shard, result) in shards
+                if not result.ok]
+    if not failures:
+        res.message = results[0].message
+        return res
+    indexes = ", ".join(str(shard["shard_index"] + 1)
+                        for (shard, _) in failures)
+    plural = "s" if len(failures) > 1 else ""
+    res.message = list(failures[0][1].message)
+    res.message.extend([ui.reset, "(shard%s %s of %i)" % (
+                        plural, indexes, failures[0][0]["num_shards"])])
+    return res
+
+
+def merge_junit_xml(roots):
+    """ Merge the JUnit XML trees written by the shards of a gtest
+
+    Test suites having the same name are merged, so that the result
+    looks like the output of a single run of the binary.
+
+    """
+    merged = etree.Element("testsuites")
+    merged.set("name", "AllTests")
+    suites = list()
+    suites_by_name = dict()
+    for root in roots:
+        if root.tag == "testsuite":
+            to_merge = [root]
+        else:
+            to_merge = root.findall("testsuite")
+        for suite in to_merge:
+            name = suite.get("name")
+            known = suites_by_name.get(name)
+            if known is None:
+                suites_by_name[name] = suite
+                suites.append(suite)
+                continue
+            _add_counters(known, suite)
+            for child in suite:
+                known.append(child)
+    for suite in suites:
+        _add_counters(merged, suite)
+        merged.append(suite)
+    return merged
+
+
+def _add_counters(elem, other):
+    for name in COUNTERS:
+        value = _to_number(elem.get(name)) + _to_number(other.get(name))
+        elem.set(name, str(value))
+    time = _to_number(elem.get("time"), float) + \
+           _to_number(other.get("time"), float)
+    elem.set("time", "%.3f" % time)
+
+
+def _to_number(value, type_=int):
+    if value is None:
+        return type_(0)
+    try:
+        return type_(value)
+    except ValueError:
+        return type_(0)
@@ -6,6 +6,10 @@ import time
 import qitest.test_queue
 import qitest.runner
 import qitest.result
+import qitest.shard
+import qitest.timings
+
+import pytest
 
 class DummyLauncher(qitest.runner.TestLauncher):
     def __init__(self):
@@ -85,3 +89,84 @@ def test_no_tests():
     test_queue.launcher = dummy_launcher
     test_queue.run(num_jobs=1)
     assert not test_queue.ok
+
+def test_longest_first(tmpdir):
+    tests = [
+     {"name" : "short"},
+     {"name" : "long"},
+     {"name" : "unknown"},
+     {"name" : "medium"},
+    ]
+    timings = qitest.timings.TestTimings(tmpdir.join("timings.json").strpath)
+    timings.record("short", 0.01)
+    timings.record("long", 0.3)
+    timings.record("medium", 0.1)
+    test_queue = qitest.test_queue.TestQueue(tests, timings=timings,
+                                             default_estimate=0.2)
+    started = list()
+    class RecordingLauncher(DummyLauncher):
+        def launch(self, test):
+            started.append(test["name"])
+            start = time.time()
+            result = DummyLauncher.launch(self, test)
+            result.time = time.time() - start
+            return result
+    dummy_launcher = RecordingLauncher()
+    dummy_launcher.results = {
+        "short": {"sleep_time": 0.01},
+        "long": {"sleep_time": 0.3},
+        "medium": {"sleep_time": 0.1},
+    }
+    test_queue.launcher = dummy_launcher
+    test_queue.run(num_jobs=2)
+    assert test_queue.ok
+    assert started[:2] == ["long", "unknown"]
+    assert started[2:] == ["medium", "short"]
+    # long || unknown + medium + short
+    assert test_queue.predicted_time == pytest.approx(0.31)
+
+    # durations are recorded
+    timings = qitest.timings.TestTimings(tmpdir.join("timings.json").strpath)
+    assert timings.get("unknown") == pytest.approx(0.2, abs=0.1)
+    assert timings.get("long") == pytest.approx(0.3, abs=0.1)
+
+def test_json_order_with_one_job(tmpdir):
+    tests = [
+     {"name" : "short"},
+     {"name" : "long"},
+    ]
+    timings = qitest.timings.TestTimings(tmpdir.join("timings.json").strpath)
+    timings.record("long", 10)
+    test_queue = qitest.test_queue.TestQueue(tests, timings=timings)
+    started = list()
+    class RecordingLauncher(DummyLauncher):
+        def launch(self, test):
+            started.append(test["name"])
+            return DummyLauncher.launch(self, test)
+    test_queue.launcher = RecordingLauncher()
+    test_queue.run(num_jobs=1)
+    assert started == ["short", "long"]
+    assert test_queue.predicted_time is None
+
+def test_shards_are_merged(tmpdir):
+    big = {"name" : "big", "gtest" : True, "shard" : 3}
+    tests = qitest.shard.split_tests([big, {"name" : "other"}], 3)
+    timings = qitest.timings.TestTimings(tmpdir.join("timings.json").strpath)
+    timings.record("big", 3.0)
+    test_queue = qitest.test_queue.TestQueue(tests, timings=timings)
+    assert test_queue.estimate(tests[0]) == 1.0
+    fail_result = qitest.result.TestResult(tests[1])
+    fail_result.ok = False
+    fail_result.message = (ui.red, "[FAIL]")
+    dummy_launcher = DummyLauncher()
+    dummy_launcher.results = {
+        "big_shard1" : {"result" : fail_result},
+    }
+    test_queue.launcher = dummy_launcher
+    test_queue.run(num_jobs=3)
+    assert not test_queue.ok
+    assert sorted(test_queue.results.keys()) == ["big", "other"]
+    result = test_queue.results["big"]
+    assert result.test is big
+    assert result.ok is False
+    assert result.message[-1] == "(shard 2 of 3)"
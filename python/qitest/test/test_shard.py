@@ -0,0 +1,87 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+from qisys import ui
+from qisys.qixml import etree
+import qitest.result
+import qitest.shard
+
+def test_split_tests():
+    tests = [
+        {"name" : "big", "gtest" : True, "shard" : 3,
+         "environment" : {"FOO" : "BAR"}},
+        {"name" : "small", "gtest" : True},
+        {"name" : "not_a_gtest", "shard" : 3},
+    ]
+    res = qitest.shard.split_tests(tests, 4)
+    assert [x["name"] for x in res] == ["big_shard0", "big_shard1", "big_shard2",
+                                        "small", "not_a_gtest"]
+    assert res[1]["environment"] == {"FOO" : "BAR",
+                                     "GTEST_TOTAL_SHARDS" : "3",
+                                     "GTEST_SHARD_INDEX" : "1"}
+    assert res[1]["sharded_from"] is tests[0]
+    # The original test is left untouched
+    assert tests[0]["environment"] == {"FOO" : "BAR"}
+
+def test_no_more_shards_than_jobs():
+    tests = [{"name" : "big", "gtest" : True, "shard" : 8}]
+    assert len(qitest.shard.split_tests(tests, 2)) == 2
+    assert qitest.shard.split_tests(tests, 1) == tests
+
+def get_shard_result(shard, ok, message):
+    res = qitest.result.TestResult(shard)
+    res.ok = ok
+    res.time = 1.5
+    res.message = message
+    return res
+
+def test_merge_results():
+    test = {"name" : "big", "gtest" : True, "shard" : 3}
+    shards = qitest.shard.split_test(test, 3)
+    ok_message = (ui.green, "[OK]")
+    fail_message = (ui.red, "[FAIL] Return code: 1")
+    results = [
+        (shards[0], get_shard_result(shards[0], True, ok_message)),
+        (shards[1], get_shard_result(shards[1], False, fail_message)),
+        (shards[2], get_shard_result(shards[2], False, fail_message)),
+    ]
+    res = qitest.shard.merge_results(test, results)
+    assert res.test is test
+    assert res.ok is False
+    assert res.time == 4.5
+    assert res.message[-1] == "(shards 2, 3 of 3)"
+
+    results = [(x, get_shard_result(x, True, ok_message)) for x in shards]
+    res = qitest.shard.merge_results(test, results)
+    assert res.ok is True
+    assert res.message == ok_message
+
+def test_merge_junit_xml():
+    one = etree.fromstring("""
+<testsuites tests="3" failures="1" name="AllTests">
+  <testsuite name="Foo" tests="2" failures="1" disabled="0" errors="0" time="0.5">
+    <testcase name="one" />
+    <testcase name="two"><failure message="oops" /></testcase>
+  </testsuite>
+  <testsuite name="Bar" tests="1" failures="0" disabled="0" errors="0" time="1">
+    <testcase name="three" />
+  </testsuite>
+</testsuites>
+""")
+    two = etree.fromstring("""
+<testsuites tests="1" failures="0" name="AllTests">
+  <testsuite name="Foo" tests="1" failures="0" disabled="1" errors="0" time="0.25">
+    <testcase name="four" />
+  </testsuite>
+</testsuites>
+""")
+    merged = qitest.shard.merge_junit_xml([one, two])
+    assert merged.get("tests") == "4"
+    assert merged.get("failures") == "1"
+    assert merged.get("disabled") == "1"
+    assert merged.get("time") == "1.750"
+    suites = merged.findall("testsuite")
+    assert [x.get("name") for x in suites] == ["Foo", "Bar"]
+    assert suites[0].get("tests") == "3"
+    assert [x.get("name") for x in suites[0].findall("testcase")] == \
+        ["one", "two", "four"]
@@ -0,0 +1,49 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+import qitest.timings
+
+import pytest
+
+def test_record_and_save(tmpdir):
+    json_path = tmpdir.join("timings.json").strpath
+    timings = qitest.timings.TestTimings(json_path)
+    assert timings.get("foo") is None
+    timings.record("foo", 2)
+    assert timings.get("foo") == 2
+    timings.record("foo", 4)
+    assert timings.get("foo") == 3
+    timings.save()
+    timings = qitest.timings.TestTimings(json_path)
+    assert timings.get("foo") == 3
+
+def test_concurrent_runs_are_merged(tmpdir):
+    json_path = tmpdir.join("timings.json").strpath
+    first = qitest.timings.TestTimings(json_path)
+    second = qitest.timings.TestTimings(json_path)
+    first.record("foo", 2)
+    first.save()
+    second.record("bar", 1)
+    second.save()
+    timings = qitest.timings.TestTimings(json_path)
+    assert timings.get("foo") == 2
+    assert timings.get("bar") == 1
+
+def test_corrupted_database(tmpdir):
+    json_path = tmpdir.join("timings.json")
+    json_path.write("{ not json")
+    timings = qitest.timings.TestTimings(json_path.strpath)
+    assert timings.get("foo") is None
+
+def test_get_key():
+    test = {"name": "test_foo"}
+    assert qitest.timings.get_key("foo", test) == "foo/test_foo"
+    assert qitest.timings.get_key(None, test) == "test_foo"
+
+def test_predict_makespan():
+    predict = qitest.timings.predict_makespan
+    assert predict([], 4) == 0
+    assert predict([3, 2, 2], 4) == 3
+    assert predict([3, 2, 2], 2) == 4
+    assert predict([1, 1, 1, 10], 2) == pytest.approx(11)
+    assert predict([10, 1, 1, 1], 2) == pytest.approx(10)
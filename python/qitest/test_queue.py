@@ -4,6 +4,7 @@
 import contextlib
 import collections
 import datetime
+import os
 import signal
 import traceback
 import time
@@ -15,12 +16,30 @@ import Queue
 from qisys import ui
 import qisys.command
 import qitest.result
+import qitest.timings
 
 
 class TestQueue():
-    """ A class able to run tests in parallel """
-    def __init__(self, tests):
+    """ A class able to run tests in parallel
+
+    When running in parallel with a :py:class:`qitest.timings.TestTimings`
+    database, the tests expected to be the longest are started first,
+    and the duration of each test is recorded in the database.
+
+    Shards of a test (see :py:mod:`qitest.shard`) are run as separate
+    tests, and their results are merged by the launcher once they
+    are all done.
+
+    """
+    def __init__(self, tests, timings=None, timing_key=None,
+                 default_estimate=qitest.timings.DEFAULT_ESTIMATE):
         self.tests = tests
+        self.timings = timings
+        if timing_key is None:
+            timing_key = lambda test: test["name"]
+        self.timing_key = timing_key
+        self.default_estimate = default_estimate
+        self.predicted_time = None
         self.test_logger = TestLogger(tests)
         self.task_queue = Queue.Queue()
         self.launcher = None
@@ -40,35 +59,111 @@ class TestQueue():
         delta = end - start
         self.elapsed_time = float(delta.microseconds) / 10**6 + delta.seconds
         self.summary()
+        self.record_timings()
         return self.ok
 
+    def estimate(self, test):
+        """ The expected duration of the test """
+        sharded_from = test.get("sharded_from")
+        if sharded_from:
+            return self.estimate(sharded_from) / test["num_shards"]
+        if self.timings:
+            res = self.timings.get(self.timing_key(test))
+            if res is not None:
+                return res
+        return self.default_estimate
+
+    def record_timings(self):
+        """ Store the duration of the tests that ran in the database """
+        if not self.timings or self._interrupted:
+            return
+        for result in self.results.values():
+            if result.time:
+                self.timings.record(self.timing_key(result.test), result.time)
+        self.timings.save()
+
     def _run(self, num_jobs=1):
         """ Helper function for ._run """
         if not self.launcher:
             ui.error("test launcher not set, cannot run tests")
             return
-        for i, test in enumerate(self.tests):
+        to_run = list(enumerate(self.tests))
+        if num_jobs > 1 and self.timings:
+            # Longest first, so that a long test does not start
+            # when the others are almost done
+            to_run.sort(key=lambda x: self.estimate(x[1]), reverse=True)
+            estimates = [self.estimate(test) for (_, test) in to_run]
+            self.predicted_time = qitest.timings.predict_makespan(estimates,
+                                                                  num_jobs)
+        for i, test in to_run:
             self.task_queue.put((test, i))
 
         if num_jobs == 1:
             self.test_logger.single_job = True
 
+        # The processes of the tests are watched from this thread,
+        # which waits for the workers without polling
+        supervisor = None
+        if os.name == "posix":
+            supervisor = qisys.command.Supervisor()
+        self.launcher.supervisor = supervisor
+        lock = threading.Lock()
+        running = [num_jobs]
+        def on_worker_done():
+            with lock:
+                running[0] -= 1
+            if supervisor:
+                supervisor.wake()
+
         for i in range(0, num_jobs):
             worker = TestWorker(self.task_queue, i)
             worker.launcher = self.launcher
             worker.launcher.worker_index = i
             worker.test_logger = self.test_logger
             worker.results = self.results
+            worker.on_done = on_worker_done
             self._workers.append(worker)
             worker.start()
 
-        while not self.task_queue.empty() and \
-              not self._interrupted:
-            time.sleep(0.1)
+        if supervisor:
+            try:
+                supervisor.loop(until=lambda: running[0] == 0)
+            finally:
+                supervisor.close()
+        else:
+            while not self.task_queue.empty() and \
+                  not self._interrupted:
+                time.sleep(0.1)
 
         for worker_thread in self._workers:
             worker_thread.join()
 
+        self._merge_shards()
+
+    def _merge_shards(self):
+        """ Replace the results of the shards of a test by the
+        result of the whole test
+
+        """
+        tests_by_name = dict((x["name"], x) for x in self.tests)
+        results = collections.OrderedDict()
+        shard_results = collections.OrderedDict()
+        for name, result in self.results.iteritems():
+            sharded_from = tests_by_name[name].get("sharded_from")
+            if sharded_from is None:
+                results[name] = result
+                continue
+            parent_name = sharded_from["name"]
+            if parent_name not in shard_results:
+                # Keep the place of the first shard done
+                results[parent_name] = None
+                shard_results[parent_name] = (sharded_from, list())
+            shard_results[parent_name][1].append((tests_by_name[name], result))
+        for parent_name, (test, shards) in shard_results.iteritems():
+            shards.sort(key=lambda x: x[0]["shard_index"])
+            results[parent_name] = self.launcher.merge_shards(test, shards)
+        self.results = results
+
     def summary(self):
         """ Display the tests results.
 
@@ -84,6 +179,9 @@ class TestQueue():
         num_failed = len(failures)
         message = "Ran %i tests in %is" % (num_tests, self.elapsed_time)
         ui.info(message)
+        if self.predicted_time is not None:
+            ui.info("Predicted: %.1fs, actual: %.1fs" % (self.predicted_time,
+                                                         self.elapsed_time))
         self.ok = (not failures) and not self._interrupted
         if self.ok:
             ui.info(ui.green, "All pass. Congrats!")
@@ -131,6 +229,8 @@ class TestWorker(threading.Thread):
         self.launcher = None
         self.test_logger = None
         self.results = dict()
+        # Called when the worker is done
+        self.on_done = None
         self._should_stop = False
 
     def stop(self):
@@ -138,6 +238,13 @@ class TestWorker(threading.Thread):
         self._should_stop = True
 
     def run(self):
+        try:
+            self._run()
+        finally:
+            if self.on_done:
+                self.on_done()
+
+    def _run(self):
         while not self._should_stop:
             try:
                 test, index = self.queue.get_nowait()
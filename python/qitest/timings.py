@@ -0,0 +1,123 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" Remember how long each test took to run, so that the longest tests
+can be started first
+
+"""
+
+import heapq
+import json
+import os
+
+from qisys import ui
+import qisys.sh
+
+# Estimated duration of the tests that never ran, in seconds
+DEFAULT_ESTIMATE = 1.0
+
+# Weight of the last run in the estimate
+SMOOTHING = 0.5
+
+
+def get_key(project_name, test):
+    """ The key of the test in the database """
+    if project_name:
+        return "%s/%s" % (project_name, test["name"])
+    return test["name"]
+
+
+def get_timings_path(worktree):
+    """ The database of a worktree is stored in .qi/test-timings.json """
+    return os.path.join(worktree.dot_qi, "test-timings.json")
+
+
+class TestTimings(object):
+    """ A database test key -> estimated duration, stored in a json file
+
+    The estimate is an exponential moving average of the durations
+    of the previous runs.
+
+    """
+    version = 1
+
+    def __init__(self, json_path):
+        self.json_path = json_path
+        self.estimates = dict()
+        self._recorded = dict()
+        self.load()
+
+    def load(self):
+        """ Read the database from disk. Discard it if it is unreadable """
+        self.estimates = self._read()
+
+    def _read(self):
+        if not os.path.exists(self.json_path):
+            return dict()
+        try:
+            with open(self.json_path, "r") as fp:
+                data = json.load(fp)
+        except (IOError, ValueError):
+            return dict()
+        if not isinstance(data, dict) or data.get("version") != self.version:
+            return dict()
+        return data.get("estimates", dict())
+
+    def get(self, key):
+        """ The estimated duration of the test, or None if it never ran """
+        return self.estimates.get(key)
+
+    def record(self, key, elapsed):
+        """ Record the duration of a run of the test """
+        previous = self.estimates.get(key)
+        if previous is None:
+            estimate = elapsed
+        else:
+            estimate = SMOOTHING * elapsed + (1 - SMOOTHING) * previous
+        self.estimates[key] = estimate
+        self._recorded[key] = elapsed
+
+    def save(self):
+        """ Write the database to disk.
+
+        The file is read again first, so that the timings recorded by
+        other runs in the meantime are not lost.
+
+        """
+        if not self._recorded:
+            return
+        estimates = self._read()
+        for key, elapsed in self._recorded.iteritems():
+            previous = estimates.get(key)
+            if previous is None:
+                estimates[key] = self.estimates[key]
+            else:
+                estimates[key] = SMOOTHING * elapsed + \
+                                 (1 - SMOOTHING) * previous
+        to_write = self.json_path + ".tmp"
+        try:
+            with open(to_write, "w") as fp:
+                json.dump({"version": self.version, "estimates": estimates},
+                          fp, indent=2, sort_keys=True)
+            qisys.sh.mv(to_write, self.json_path)
+        except (IOError, OSError) as e:
+            ui.debug("Could not write test timings:", e)
+            return
+        self.estimates = estimates
+        self._recorded = dict()
+
+
+def predict_makespan(estimates, num_jobs):
+    """ The time needed to run tasks of the given durations, in this
+    order, each one being started as soon as one of the ``num_jobs``
+    workers is free
+
+    """
+    if not estimates:
+        return 0
+    workers = [0] * min(num_jobs, len(estimates))
+    for estimate in estimates:
+        free_at = heapq.heappop(workers)
+        heapq.heappush(workers, free_at + estimate)
+    return max(workers)
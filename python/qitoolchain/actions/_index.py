@@ -0,0 +1,20 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+# Generated by qisys.script.write_action_index(). Do not edit.
+
+ACTIONS = [
+    ('add_package', 'Add a new package to a toolchain'),
+    ('convert_package', 'Convert a binary archive into a qiBuild package.'),
+    ('create', 'Configure a worktree to use a toolchain.'),
+    ('extract_package', 'Extract a binary toolchain package'),
+    ('import_package', 'Convert a binary archive into a qiBuild package and add it to a toolchain.'),
+    ('info', 'Display a complete description of a toolchain'),
+    ('list', 'Display the toolchains names.'),
+    ('make_package', 'Create a package from a directory'),
+    ('remove', 'Uninstall a toolchain'),
+    ('remove_package', 'Remove a package from a toolchain'),
+    ('status', 'Display the toolchains status their names, and what projects they provide'),
+    ('update', 'Update every toolchain using the feed that was used to create them'),
+]
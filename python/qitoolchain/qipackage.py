@@ -31,13 +31,24 @@ class QiPackage(object):
         self.build_depends = set()
         self.run_depends = set()
         self.test_depends = set()
+        self._package_xml_stamp = None
 
     def load_deps(self):
-        """ Parse package.xml, set the dependencies """
+        """ Parse package.xml, set the dependencies
+
+        Nothing is done if package.xml did not change since the last call
+
+        """
         package_xml = os.path.join(self.path, "package.xml")
-        if os.path.exists(package_xml):
-            xml_root = qisys.qixml.read(package_xml)
-            qibuild.deps.read_deps_from_xml(self, xml_root)
+        if not os.path.exists(package_xml):
+            return
+        stat = os.stat(package_xml)
+        stamp = (stat.st_mtime, stat.st_size)
+        if stamp == self._package_xml_stamp:
+            return
+        xml_root = qisys.qixml.read(package_xml)
+        qibuild.deps.read_deps_from_xml(self, xml_root)
+        self._package_xml_stamp = stamp
 
     def install(self, destdir, components=None, release=True):
         """ Install the given components of the package to the given destination
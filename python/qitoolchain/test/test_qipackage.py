@@ -1,6 +1,8 @@
 ## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
 ## Use of this source code is governed by a BSD-style license that can be
 ## found in the COPYING file.
+import mock
+
 import qisys.archive
 import qitoolchain.qipackage
 
@@ -123,6 +125,27 @@ def test_load_deps(tmpdir):
     assert package.run_depends == set(["boost", "python"])
     assert package.test_depends == set(["gtest"])
 
+def test_load_deps_only_once(tmpdir):
+    libqi_path = tmpdir.mkdir("libqi")
+    package_xml = libqi_path.ensure("package.xml")
+    package_xml.write("""\
+<package name="libqi">
+  <depends runtime="true" names="boost" />
+</package>
+""")
+    package = qitoolchain.qipackage.QiPackage("libqi", path=libqi_path.strpath)
+    package.load_deps()
+    with mock.patch("qisys.qixml.read") as read_mock:
+        package.load_deps()
+        assert not read_mock.called
+    package_xml.write("""\
+<package name="libqi">
+  <depends runtime="true" names="boost python" />
+</package>
+""")
+    package.load_deps()
+    assert package.run_depends == set(["boost", "python"])
+
 def test_extract_legacy_bad_top_dir(tmpdir):
     src = tmpdir.mkdir("src")
     boost = src.mkdir("boost")
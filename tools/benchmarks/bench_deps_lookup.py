@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" Check that resolving the dependencies of every project of a
+synthetic worktree stays linear in the number of projects
+
+Usage: PYTHONPATH=python python tools/benchmarks/bench_deps_lookup.py [SIZES]
+
+"""
+
+import sys
+
+import qisys.worktree
+import qibuild.deps
+import qibuild.worktree
+
+from benchlib import temp_worktree_root, gen_deps, \
+                     create_build_worktree, timeit
+
+
+def bench(num_projects):
+    with temp_worktree_root() as root:
+        create_build_worktree(root, gen_deps(num_projects))
+        worktree = qisys.worktree.WorkTree(root, sanity_check=False)
+        build_worktree = qibuild.worktree.BuildWorkTree(worktree)
+        deps_solver = qibuild.deps.DepsSolver(build_worktree)
+        projects = build_worktree.build_projects
+        lookup_time, _ = timeit(
+            lambda: [build_worktree.get_build_project(x.name)
+                     for x in projects])
+        solve_time, res = timeit(deps_solver.get_dep_projects,
+                                 projects, ["build", "runtime"])
+        assert len(res) == num_projects
+        return lookup_time, solve_time
+
+
+def main():
+    sizes = [1000, 2500, 5000, 10000]
+    if len(sys.argv) > 1:
+        sizes = [int(x) for x in sys.argv[1:]]
+    print "%8s %12s %12s %14s" % ("projects", "lookups", "get_deps",
+                                  "get_deps/proj")
+    for size in sizes:
+        lookup_time, solve_time = bench(size)
+        print "%8d %11.3fs %11.3fs %12.1fus" % (size, lookup_time, solve_time,
+                                                solve_time / size * 1e6)
+
+
+if __name__ == "__main__":
+    main()
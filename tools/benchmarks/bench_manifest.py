@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" Check the time spent reading big manifests
+
+Measures parsing a manifest, looking up every repo of a group
+containing all of them, and reading the manifest of the manifest repo
+through WorkTreeSyncer twice in a row (the second time should hit
+the cache).
+
+Usage: PYTHONPATH=python python tools/benchmarks/bench_manifest.py [SIZES]
+
+"""
+
+import os
+import sys
+
+import qisys.worktree
+import qisrc.git
+import qisrc.manifest
+import qisrc.worktree
+
+from benchlib import temp_worktree_root, timeit
+
+
+def write_manifest(path, num_repos):
+    with open(path, "w") as fp:
+        fp.write("<manifest>\n")
+        fp.write('  <remote name="origin" url="git@example.com" />\n')
+        fp.write('  <remote name="gerrit" url="ssh://john@gerrit:29418" '
+                 'review="true" />\n')
+        for i in range(num_repos):
+            fp.write('  <repo project="lib/lib%05d.git" src="lib%05d" '
+                     'remotes="origin gerrit" />\n' % (i, i))
+        fp.write("  <groups>\n")
+        fp.write('    <group name="all">\n')
+        for i in range(num_repos):
+            fp.write('      <project name="lib/lib%05d.git" />\n' % i)
+        fp.write("    </group>\n")
+        fp.write("  </groups>\n")
+        fp.write("</manifest>\n")
+
+
+def bench(num_repos):
+    with temp_worktree_root() as root:
+        worktree = qisys.worktree.WorkTree(root)
+        git_worktree = qisrc.worktree.GitWorkTree(worktree)
+        syncer = git_worktree._syncer
+        # Do not ask for the gerrit username
+        syncer.manifest.review = False
+        manifest_repo = syncer.manifest_repo
+        manifest_xml = os.path.join(manifest_repo, "manifest.xml")
+        write_manifest(manifest_xml, num_repos)
+        git = qisrc.git.Git(manifest_repo)
+        git.commit("--quiet", "--all", "--message", "big manifest")
+
+        parse_time, manifest = timeit(qisrc.manifest.Manifest, manifest_xml,
+                                      review=False)
+        group_time, repos = timeit(manifest.get_repos, groups=["all"])
+        assert len(repos) == num_repos
+        first_time, _ = timeit(syncer.read_remote_manifest)
+        cached_time, repos = timeit(syncer.read_remote_manifest)
+        assert len(repos) == num_repos
+        return parse_time, group_time, first_time, cached_time
+
+
+def main():
+    sizes = [1000, 5000]
+    if len(sys.argv) > 1:
+        sizes = [int(x) for x in sys.argv[1:]]
+    print "%8s %10s %10s %10s %10s" % ("repos", "parse", "group",
+                                       "read", "cached")
+    for size in sizes:
+        times = bench(size)
+        print "%8d %9.3fs %9.3fs %9.3fs %9.3fs" % ((size,) + times)
+
+
+if __name__ == "__main__":
+    main()
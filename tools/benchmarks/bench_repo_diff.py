@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" Check that diffing two manifests and finding the git projects
+matching the repos of a manifest stay linear in the number of repos
+
+The new manifest moves 5% of the repos, changes the remote url of an
+other 5%, removes 2% and adds 2%.
+
+Usage: PYTHONPATH=python python tools/benchmarks/bench_repo_diff.py [SIZES]
+
+"""
+
+import collections
+import random
+import sys
+
+import qisrc.git_config
+import qisrc.manifest
+import qisrc.project
+import qisrc.sync
+import qisrc.worktree
+
+from benchlib import timeit
+
+WorkTreeProject = collections.namedtuple("WorkTreeProject", "src")
+
+
+def make_repo(name, src, server="origin"):
+    repo = qisrc.manifest.RepoConfig()
+    remote = qisrc.git_config.Remote()
+    remote.name = "origin"
+    remote.url = "git@%s:%s.git" % (server, name)
+    remote.default = True
+    repo.remotes.append(remote)
+    repo.project = name + ".git"
+    repo.src = src
+    repo.default_branch = "master"
+    return repo
+
+
+def gen_manifests(num_repos, seed=42):
+    """ Return (old_repos, new_repos, expected number of changes) """
+    rng = random.Random(seed)
+    names = ["lib%05d" % i for i in range(num_repos)]
+    old_repos = [make_repo(x, x) for x in names]
+    new_repos = list()
+    expected = {"add": 0, "move": 0, "rm": 0, "update": 0}
+    for name in names:
+        draw = rng.random()
+        if draw < 0.05:
+            new_repos.append(make_repo(name, "moved/" + name))
+            expected["move"] += 1
+        elif draw < 0.10:
+            new_repos.append(make_repo(name, name, server="gerrit"))
+            expected["update"] += 1
+        elif draw < 0.12:
+            expected["rm"] += 1
+        else:
+            new_repos.append(make_repo(name, name))
+    for i in range(num_repos / 50):
+        name = "new%05d" % i
+        new_repos.append(make_repo(name, name))
+        expected["add"] += 1
+    rng.shuffle(new_repos)
+    return old_repos, new_repos, expected
+
+
+def make_git_worktree(repos):
+    """ A GitWorkTree with one git project per repo, not backed by
+    anything on disk
+
+    """
+    # pylint: disable-msg=E1120
+    git_worktree = qisrc.worktree.GitWorkTree.__new__(qisrc.worktree.GitWorkTree)
+    git_worktree.git_projects = list()
+    for repo in repos:
+        git_project = qisrc.project.GitProject(git_worktree,
+                                               WorkTreeProject(repo.src))
+        git_project.remotes = list(repo.remotes)
+        git_worktree.git_projects.append(git_project)
+    return git_worktree
+
+
+def bench(num_repos):
+    old_repos, new_repos, expected = gen_manifests(num_repos)
+    diff_time, res = timeit(qisrc.sync.compute_repo_diff, old_repos, new_repos)
+    (to_add, to_move, to_rm, to_update) = res
+    assert len(to_add) == expected["add"]
+    assert len(to_move) == expected["move"]
+    assert len(to_rm) == expected["rm"]
+    assert len(to_update) == expected["update"]
+
+    git_worktree = make_git_worktree(old_repos)
+    def find_all():
+        projects_by_url = git_worktree.get_projects_by_url()
+        return [git_worktree.find_repo(x, projects_by_url=projects_by_url)
+                for x in new_repos]
+    find_time, found = timeit(find_all)
+    assert len([x for x in found if x]) == \
+        num_repos - expected["update"] - expected["rm"]
+    return diff_time, find_time
+
+
+def main():
+    sizes = [1000, 2500, 5000, 10000]
+    if len(sys.argv) > 1:
+        sizes = [int(x) for x in sys.argv[1:]]
+    print "%8s %12s %12s %14s" % ("repos", "diff", "find_repo",
+                                  "diff/repo")
+    for size in sizes:
+        diff_time, find_time = bench(size)
+        print "%8d %11.3fs %11.3fs %12.1fus" % (size, diff_time, find_time,
+                                                diff_time / size * 1e6)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" Measure the startup time of every entry point
+
+For each tool, time `<tool> --help` (which only reads the action index),
+and compare with the time needed to import every action of the tool,
+which is what used to happen on each invocation.
+
+Usage: PYTHONPATH=python python tools/benchmarks/bench_startup.py
+           [--runs N] [--max-ms MS] [TOOL ...]
+
+With --max-ms, exit with a non-zero code if the startup of a tool takes
+longer than MS milliseconds, so that it can be used to catch regressions.
+
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import qisys
+
+TOOLS = ["qibuild", "qidoc", "qilinguist", "qimvn", "qipkg", "qipy",
+         "qisrc", "qitest", "qitoolchain"]
+
+RUN_TOOL = """\
+import sys
+sys.argv = sys.argv[1:]
+import qisys.main
+qisys.main.main()
+"""
+
+IMPORT_ALL = """\
+import sys
+import qisys.script
+qisys.script.action_modules_from_package(sys.argv[1] + ".actions")
+"""
+
+
+def best_time(code, args, runs):
+    """ Best wall time of running ``python -c code args``, in seconds """
+    env = os.environ.copy()
+    python_dir = os.path.dirname(os.path.dirname(qisys.__file__))
+    env["PYTHONPATH"] = python_dir
+    cmd = [sys.executable, "-c", code] + args
+    res = None
+    with open(os.devnull, "w") as devnull:
+        for _ in range(runs):
+            before = time.time()
+            subprocess.call(cmd, stdout=devnull, stderr=devnull, env=env)
+            elapsed = time.time() - before
+            if res is None or elapsed < res:
+                res = elapsed
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float)
+    parser.add_argument("tools", nargs="*")
+    args = parser.parse_args()
+    tools = args.tools or TOOLS
+    baseline = best_time("pass", list(), args.runs)
+    print "python startup:  %6.1fms" % (baseline * 1000)
+    print "%-12s %12s %14s" % ("tool", "--help", "import all")
+    too_slow = list()
+    for tool in tools:
+        startup = best_time(RUN_TOOL, [tool, "--help"], args.runs)
+        import_all = best_time(IMPORT_ALL, [tool], args.runs)
+        print "%-12s %10.1fms %12.1fms" % (tool, startup * 1000,
+                                           import_all * 1000)
+        if args.max_ms and startup * 1000 > args.max_ms:
+            too_slow.append(tool)
+    if too_slow:
+        sys.exit("Startup too slow for: %s" % ", ".join(too_slow))
+
+
+if __name__ == "__main__":
+    main()
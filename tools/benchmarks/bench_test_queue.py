@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" Measure the overhead of running many trivial tests in parallel
+
+Runs ``true`` as N tests with ``qitest run -j J``, watching the
+processes with qisys.command.Supervisor, then with the previous
+implementation using two threads per process.
+
+Usage: PYTHONPATH=python python tools/benchmarks/bench_test_queue.py
+           [--tests N] [-j J]
+
+"""
+
+import argparse
+import json
+import os
+
+from qisys import ui
+import qisys.command
+import qibuild.test_runner
+import qitest.project
+
+from benchlib import temp_worktree_root, timeit
+
+
+def write_qitest_json(path, num_tests):
+    true = qisys.command.find_program("true", raises=True)
+    tests = list()
+    for i in range(num_tests):
+        tests.append({"name": "test_%05d" % i, "cmd": [true], "timeout": 20})
+    with open(path, "w") as fp:
+        json.dump(tests, fp)
+
+
+def run_tests(qitest_json, num_jobs):
+    test_project = qitest.project.TestProject(qitest_json)
+    test_runner = qibuild.test_runner.ProjectTestRunner(test_project)
+    test_runner.cwd = os.path.dirname(qitest_json)
+    test_runner.num_jobs = num_jobs
+    return test_runner.run()
+
+
+def with_threads(process, timeout=None, supervisor=None):
+    process._run_with_threads(timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tests", type=int, default=5000)
+    parser.add_argument("-j", dest="num_jobs", type=int, default=64)
+    args = parser.parse_args()
+    ui.CONFIG["quiet"] = True
+    print "%12s %10s %10s %14s" % ("engine", "wall", "tests/s",
+                                   "ms/test/job")
+    run = qisys.command.Process.run
+    for engine in ["supervisor", "threads"]:
+        if engine == "threads":
+            qisys.command.Process.run = with_threads
+        try:
+            with temp_worktree_root() as root:
+                qitest_json = os.path.join(root, "qitest.json")
+                write_qitest_json(qitest_json, args.tests)
+                elapsed, ok = timeit(run_tests, qitest_json, args.num_jobs)
+                assert ok
+        finally:
+            qisys.command.Process.run = run
+        print "%12s %9.2fs %10.0f %14.2f" % (
+            engine, elapsed, args.tests / elapsed,
+            1000 * elapsed * args.num_jobs / args.tests)
+
+
+if __name__ == "__main__":
+    main()
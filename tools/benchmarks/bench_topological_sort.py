@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" Time qisys.sort.topological_sort on generated DAGs
+
+Usage: PYTHONPATH=python python tools/benchmarks/bench_topological_sort.py [SIZES]
+
+"""
+
+import sys
+
+import qisys.sort
+
+from benchlib import gen_deps, timeit
+
+
+def main():
+    sizes = [1000, 5000, 10000, 25000, 50000]
+    if len(sys.argv) > 1:
+        sizes = [int(x) for x in sys.argv[1:]]
+    print "%8s %8s %10s %10s %12s" % ("nodes", "edges", "random", "chain",
+                                      "us/(V+E)")
+    for size in sizes:
+        deps = gen_deps(size)
+        data = dict((i, deps[i]) for i in range(size))
+        num_edges = sum(len(x) for x in deps)
+        random_time, res = timeit(qisys.sort.topological_sort,
+                                  data, range(size), allow_cycles=False)
+        assert len(res) == size
+        # A single chain, much deeper than the recursion limit
+        chain = dict((i, [i - 1]) for i in range(1, size))
+        chain_time, res = timeit(qisys.sort.topological_sort,
+                                 chain, [size - 1], allow_cycles=False)
+        assert len(res) == size
+        print "%8d %8d %9.3fs %9.3fs %12.2f" % (size, num_edges,
+            random_time, chain_time,
+            random_time / (size + num_edges) * 1e6)
+
+
+if __name__ == "__main__":
+    main()
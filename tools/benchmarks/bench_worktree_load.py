@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" Compare cold and warm loading times of a big worktree
+
+Usage: PYTHONPATH=python python tools/benchmarks/bench_worktree_load.py [NUM_PROJECTS]
+
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import qisys.sh
+import qisys.worktree
+
+
+def create_worktree(root, num_projects):
+    """ Create num_projects top-level projects, each of them
+    having one sub project
+
+    """
+    srcs = list()
+    for i in range(num_projects):
+        src = "lib/lib%05d" % i
+        path = os.path.join(root, src)
+        qisys.sh.mkdir(os.path.join(path, "tests"), recursive=True)
+        with open(os.path.join(path, "qiproject.xml"), "w") as fp:
+            fp.write("""\
+<project version="3">
+  <qibuild name="lib%05d" />
+  <project src="tests" />
+</project>
+""" % i)
+        with open(os.path.join(path, "tests", "qiproject.xml"), "w") as fp:
+            fp.write("""\
+<project version="3">
+  <qibuild name="test_lib%05d" />
+</project>
+""" % i)
+        srcs.append(src)
+    qisys.sh.mkdir(os.path.join(root, ".qi"))
+    with open(os.path.join(root, ".qi", "worktree.xml"), "w") as fp:
+        fp.write("<worktree>\n")
+        for src in srcs:
+            fp.write('  <project src="%s" />\n' % src)
+        fp.write("</worktree>\n")
+
+
+def time_load(root, use_cache):
+    before = time.time()
+    worktree = qisys.worktree.WorkTree(root, sanity_check=False,
+                                       use_cache=use_cache)
+    elapsed = time.time() - before
+    return elapsed, len(worktree.projects)
+
+
+def main():
+    num_projects = 1000
+    if len(sys.argv) > 1:
+        num_projects = int(sys.argv[1])
+    # Do not register the fake worktree in ~/.config/qi
+    qisys.worktree.WorkTree.register_self = lambda self: None
+    root = tempfile.mkdtemp(prefix="bench-worktree-")
+    try:
+        create_worktree(root, num_projects)
+        no_cache, count = time_load(root, use_cache=False)
+        cold, _ = time_load(root, use_cache=True)
+        warm, _ = time_load(root, use_cache=True)
+        os.utime(os.path.join(root, "lib", "lib00000", "qiproject.xml"), None)
+        one_changed, _ = time_load(root, use_cache=True)
+        print "projects:          %d" % count
+        print "--no-cache:        %.3fs" % no_cache
+        print "cold cache:        %.3fs" % cold
+        print "warm cache:        %.3fs" % warm
+        print "one file touched:  %.3fs" % one_changed
+    finally:
+        qisys.sh.rm(root)
+
+
+if __name__ == "__main__":
+    main()
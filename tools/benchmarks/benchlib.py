@@ -0,0 +1,84 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" Helpers shared by the benchmarks in this directory
+
+"""
+
+import contextlib
+import os
+import random
+import tempfile
+import time
+
+import qisys.sh
+import qisys.worktree
+
+
+@contextlib.contextmanager
+def temp_worktree_root(prefix="bench-"):
+    """ Yield a temporary directory, and make sure
+    nothing is written in the user's ~/.config/qi
+
+    """
+    root = tempfile.mkdtemp(prefix=prefix)
+    qisys.sh.set_home(os.path.join(root, "home"))
+    register_self = qisys.worktree.WorkTree.register_self
+    qisys.worktree.WorkTree.register_self = lambda self: None
+    try:
+        yield root
+    finally:
+        qisys.worktree.WorkTree.register_self = register_self
+        qisys.sh.rm(root)
+
+
+def gen_deps(num_projects, max_deps=4, seed=42):
+    """ Generate a random DAG: project i can only depend on
+    projects with a lower index
+
+    """
+    rng = random.Random(seed)
+    res = list()
+    for i in range(num_projects):
+        if i == 0:
+            res.append(list())
+            continue
+        count = rng.randint(0, min(i, max_deps))
+        res.append(sorted(set(rng.randint(0, i - 1) for _ in range(count))))
+    return res
+
+
+def create_build_worktree(root, deps):
+    """ Write a qiproject.xml for each project p<i> in
+    ``deps``, and register them in .qi/worktree.xml
+
+    """
+    srcs = list()
+    for i, dep_indexes in enumerate(deps):
+        name = "p%05d" % i
+        path = os.path.join(root, name)
+        qisys.sh.mkdir(path)
+        names = " ".join("p%05d" % x for x in dep_indexes)
+        with open(os.path.join(path, "qiproject.xml"), "w") as fp:
+            fp.write("""\
+<project version="3">
+  <qibuild name="%s">
+    <depends buildtime="true" runtime="true" names="%s" />
+  </qibuild>
+</project>
+""" % (name, names))
+        srcs.append(name)
+    qisys.sh.mkdir(os.path.join(root, ".qi"))
+    with open(os.path.join(root, ".qi", "worktree.xml"), "w") as fp:
+        fp.write("<worktree>\n")
+        for src in srcs:
+            fp.write('  <project src="%s" />\n' % src)
+        fp.write("</worktree>\n")
+
+
+def timeit(func, *args, **kwargs):
+    """ Return (elapsed time, result) """
+    before = time.time()
+    res = func(*args, **kwargs)
+    return time.time() - before, res
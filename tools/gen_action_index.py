@@ -0,0 +1,27 @@
+## Copyright (c) 2012-2015 Aldebaran Robotics. All rights reserved.
+## Use of this source code is governed by a BSD-style license that can be
+## found in the COPYING file.
+
+""" Generate the _index.py file of every package containing actions.
+
+Must be run each time an action is added, removed, or when the first
+line of its doc string changes:
+
+    PYTHONPATH=python python tools/gen_action_index.py
+
+"""
+
+import sys
+
+import qisys.script
+
+TOOLS = ["qibuild", "qidoc", "qilinguist", "qimvn", "qipkg", "qipy",
+         "qisrc", "qitest", "qitoolchain"]
+
+def main():
+    tools = sys.argv[1:] or TOOLS
+    for tool in tools:
+        print qisys.script.write_action_index("%s.actions" % tool)
+
+if __name__ == "__main__":
+    main()